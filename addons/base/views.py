@@ -264,7 +264,7 @@ def get_auth(auth, **kwargs):
         client = cas.get_client()
         try:
             access_token = cas.parse_auth_header(authorization)
-            cas_resp = client.profile(access_token)
+            cas_resp = client.cached_profile(access_token)
         except cas.CasError as err:
             sentry.log_exception()
             # NOTE: We assume that the request is an AJAX request
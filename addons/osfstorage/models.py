@@ -5,7 +5,10 @@ import logging
 from django.apps import apps
 from django.dispatch import receiver
 from django.db import models, connection
+from django.db.models import Value
+from django.db.models.functions import Concat
 from django.db.models.signals import post_save
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from psycopg2._psycopg import AsIs
 
@@ -15,9 +18,13 @@ from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.exceptions import InvalidTagError, NodeStateError, TagNotFoundError
 from framework.auth.core import Auth
 from osf.models.mixins import Loggable
-from osf.models import AbstractNode
-from osf.models.files import File, FileVersion, Folder, TrashedFileNode, BaseFileNode, BaseFileNodeManager
+from osf.models import AbstractNode, Guid
+from osf.models.files import (
+    File, FileVersion, Folder, TrashedFile, TrashedFileNode, TrashedFolder, BaseFileNode, BaseFileNodeManager
+)
 from osf.models.metaschema import FileMetadataSchema
+from osf.migrations.sql.osfstorage_materialized_paths import subtree_nodes, update_descendant_paths
+from osf.migrations.sql.osfstorage_version_summaries import update_version_summaries
 from osf.utils import permissions
 from website.files import exceptions
 from website.files import utils as files_utils
@@ -44,6 +51,14 @@ class OsfStorageFileNode(BaseFileNode):
 
     @property
     def materialized_path(self):
+        """The Unix-style path from the root folder, stored by ``save``. Nodes saved before the
+        path was stored compute it from their parents instead.
+        """
+        if self._materialized_path:
+            return self._materialized_path
+        return self._query_materialized_path()
+
+    def _query_materialized_path(self):
         sql = """
             WITH RECURSIVE materialized_path_cte(parent_id, GEN_PATH) AS (
               SELECT
@@ -75,6 +90,22 @@ class OsfStorageFileNode(BaseFileNode):
                 path = path + '/'
             return path
 
+    def _compute_materialized_path(self):
+        path = self.name
+        if self.parent is not None:
+            path = self.parent.materialized_path + path
+        return path if self.is_file else path + '/'
+
+    def get_subtree(self):
+        """The active files and folders below this folder. Found through parent_id rather than
+        the stored materialized paths, which are missing on rows older than the column until
+        update_osfstorage_materialized_paths has run.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(subtree_nodes, [self.id, self.id])
+            ids = [row[0] for row in cursor.fetchall()]
+        return OsfStorageFileNode.objects.filter(id__in=ids)
+
     @materialized_path.setter
     def materialized_path(self, val):
         # raise Exception('Cannot set materialized path on OSFStorage as it is computed.')
@@ -105,6 +136,12 @@ class OsfStorageFileNode(BaseFileNode):
         file_obj = cls.load(path)
         if not file_obj:
             file_obj = TrashedFileNode.load(path)
+        elif not file_obj.is_file:
+            files = file_obj.get_subtree().filter(type=OsfStorageFile._typedmodels_type)
+            return sorted(set(Guid.objects.filter(
+                content_type=ContentType.objects.get_for_model(BaseFileNode),
+                object_id__in=files.values('id'),
+            ).values_list('_id', flat=True)))
 
         # At this point, file_obj may be an OsfStorageFile, an OsfStorageFolder, or a
         # TrashedFileNode. TrashedFileNodes do not have *File and *Folder subclasses, since
@@ -164,7 +201,7 @@ class OsfStorageFileNode(BaseFileNode):
     def delete(self, user=None, **kwargs):
         self._path = self.path
         self._materialized_path = self.materialized_path
-        return super().delete(user=user) if self._check_delete_allowed() else None
+        return super().delete(user=user, **kwargs) if self._check_delete_allowed() else None
 
     def update_region_from_latest_version(self, destination_parent):
         raise NotImplementedError
@@ -227,12 +264,26 @@ class OsfStorageFileNode(BaseFileNode):
 
     def save(self):
         self._path = ''
-        self._materialized_path = ''
-        return super(OsfStorageFileNode, self).save()
+        adding = self.pk is None
+        old_materialized_path = self._materialized_path
+        self._materialized_path = self._compute_materialized_path()
+        ret = super(OsfStorageFileNode, self).save()
+        if not adding and not self.is_file and self._materialized_path != old_materialized_path:
+            # Renamed or moved, so are the files and folders below
+            with connection.cursor() as cursor:
+                cursor.execute(update_descendant_paths, [self.pk])
+        return ret
 
 
 class OsfStorageFile(OsfStorageFileNode, File):
 
+    # Summary of the versions, stored by update_version_summary so listing the children of a
+    # folder does not look up the versions of each file. Null until the file has a version (or
+    # until update_osfstorage_version_summaries has run, for files older than the columns).
+    _latest_version = models.ForeignKey('osf.FileVersion', null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    _version_count = models.PositiveIntegerField(null=True, blank=True)
+    _size = models.BigIntegerField(null=True, blank=True)
+
     @property
     def _hashes(self):
         last_version = self.versions.last()
@@ -314,6 +365,16 @@ class OsfStorageFile(OsfStorageFileNode, File):
 
         return version
 
+    def add_version(self, version, name=None):
+        ret = super(OsfStorageFile, self).add_version(version, name=name)
+        self.update_version_summary()
+        return ret
+
+    def update_version_summary(self):
+        with connection.cursor() as cursor:
+            cursor.execute(update_version_summaries, [[self.id]])
+        self.refresh_from_db(fields=['_latest_version', '_version_count', '_size'])
+
     def get_version(self, version=None, required=False):
         if version is None:
             if self.versions.exists():
@@ -406,45 +467,44 @@ class OsfStorageFolder(OsfStorageFileNode, Folder):
 
     @property
     def is_checked_out(self):
-        sql = """
-            WITH RECURSIVE is_checked_out_cte(id, parent_id, checkout_id) AS (
-              SELECT
-                T.id,
-                T.parent_id,
-                T.checkout_id
-              FROM %s AS T
-              WHERE T.id = %s
-              UNION ALL
-              SELECT
-                T.id,
-                T.parent_id,
-                T.checkout_id
-              FROM is_checked_out_cte AS R
-                JOIN %s AS T ON T.parent_id = R.id
-            )
-            SELECT N.checkout_id
-            FROM is_checked_out_cte as N
-            WHERE N.checkout_id IS NOT NULL
-            LIMIT 1;
-        """
-
-        with connection.cursor() as cursor:
-            cursor.execute(sql, [AsIs(self._meta.db_table), self.pk, AsIs(self._meta.db_table)])
-            row = cursor.fetchone()
-
-            if row and row[0]:
-                return True
-
-        return False
+        if self.checkout_id is not None:
+            return True
+        if self.pk is None:
+            return False
+        return self.get_subtree().filter(checkout__isnull=False).exists()
 
     @property
     def is_preprint_primary(self):
-        if hasattr(self.target, 'primary_file') and self.target.primary_file:
-            for child in self.children.all():
-                if getattr(child.target, 'primary_file', None):
-                    if child.is_preprint_primary:
-                        return True
-        return False
+        primary_file = getattr(self.target, 'primary_file', None)
+        if not primary_file or getattr(self.target, 'is_deleted', None):
+            return False
+        return self.get_subtree().filter(id=primary_file.id).exists()
+
+    def delete(self, user=None, **kwargs):
+        from website.search import search
+
+        self._check_delete_allowed()
+        deleted = kwargs.pop('deleted_on', None) or timezone.now()
+        # Trash everything below at once, rather than one file or folder at a time
+        nodes = list(self.get_subtree())
+        files = [node for node in nodes if node.is_file]
+        for file in files:
+            search.update_file(file, delete=True)
+        Comment = apps.get_model('osf.Comment')
+        Comment.objects.filter(root_target__in=Guid.objects.filter(
+            content_type=ContentType.objects.get_for_model(BaseFileNode),
+            object_id__in=[file.id for file in files],
+        )).update(root_target=None)
+        for kind, trashed_kind, path_suffix in ((OsfStorageFile, TrashedFile, ''), (OsfStorageFolder, TrashedFolder, '/')):
+            BaseFileNode.objects.filter(id__in=[node.id for node in nodes if isinstance(node, kind)]).update(
+                type=trashed_kind._typedmodels_type,
+                deleted_by=user,
+                deleted=deleted,
+                deleted_on=deleted,
+                _path=Concat(Value('/'), '_id', Value(path_suffix)),
+                modified=timezone.now(),
+            )
+        return super(OsfStorageFolder, self).delete(user=user, deleted_on=deleted, **kwargs)
 
     def serialize(self, include_full=False, version=None):
         # Versions just for compatibility
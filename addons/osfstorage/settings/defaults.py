@@ -25,6 +25,9 @@ WATERBUTLER_RESOURCE = 'folder'
 
 DISK_SAVING_MODE = settings.DISK_SAVING_MODE
 
+# Max number of children of a folder listed for WaterButler at once, when it asks for a page
+MAX_CHILDREN_PAGE_SIZE = 1000
+
 
 try:
     mod = importlib.import_module('.{}'.format(settings.MIGRATION_ENV), package='addons.osfstorage.settings')
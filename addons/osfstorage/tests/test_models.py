@@ -5,6 +5,8 @@ import unittest
 
 import pytest
 import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from nose.tools import *  # noqa
 
@@ -12,6 +14,8 @@ from framework.auth import Auth
 from addons.osfstorage.models import OsfStorageFile, OsfStorageFileNode, OsfStorageFolder
 from osf.models import BaseFileNode
 from osf.exceptions import ValidationError
+from osf.management.commands.update_osfstorage_materialized_paths import update_materialized_paths
+from osf.management.commands.update_osfstorage_version_summaries import update_summaries
 from osf.utils.permissions import WRITE, ADMIN
 
 from osf_tests.factories import ProjectFactory, UserFactory, PreprintFactory, RegionFactory, NodeFactory
@@ -309,6 +313,110 @@ class TestOsfstorageFileNode(StorageTestCase):
         child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
         assert_equals('/Cloud/Carp', child.materialized_path)
 
+    def test_materialized_path_is_stored(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        assert_equals('/Cloud/Carp', BaseFileNode.objects.get(id=child.id)._materialized_path)
+
+    def test_materialized_path_legacy(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        BaseFileNode.objects.filter(id=child.id).update(_materialized_path='')
+        assert_equals('/Cloud/Carp', OsfStorageFileNode.load(child._id).materialized_path)
+
+    def test_materialized_path_rename_folder(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        subfolder = folder.append_folder('Sky')
+        child = subfolder.append_file('Carp')
+
+        folder.name = 'Fog'
+        folder.save()
+
+        assert_equals('/Fog/', folder.materialized_path)
+        assert_equals('/Fog/Sky/', OsfStorageFileNode.load(subfolder._id).materialized_path)
+        assert_equals('/Fog/Sky/Carp', OsfStorageFileNode.load(child._id).materialized_path)
+
+    def test_materialized_path_move_folder(self):
+        root = self.node_settings.get_root()
+        move_to = root.append_folder('Sky')
+        to_move = root.append_folder('Cloud')
+        child = to_move.append_folder('Rain').append_file('Carp')
+
+        to_move.move_under(move_to, name='Cumulus')
+
+        assert_equals('/Sky/Cumulus/Rain/Carp', OsfStorageFileNode.load(child._id).materialized_path)
+        assert_equals(
+            [child.id],
+            list(move_to.get_subtree().filter(type='osf.osfstoragefile').values_list('id', flat=True))
+        )
+
+    def test_get_subtree(self):
+        root = self.node_settings.get_root()
+        folder = root.append_folder('Cloud')
+        inside = [folder.append_file('Carp'), folder.append_folder('Rain')]
+        inside.append(inside[1].append_file('Drop'))
+        root.append_file('Cloud')
+        root.append_folder('Cloudy').append_file('Carp')
+
+        assert_equals(
+            sorted(node.id for node in inside),
+            sorted(folder.get_subtree().values_list('id', flat=True))
+        )
+
+    def test_delete_folder_trashes_subtree(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        subfolder = folder.append_folder('Rain')
+        child = subfolder.append_file('Carp')
+
+        folder.delete()
+
+        trashed = models.TrashedFileNode.load(folder._id)
+        assert_equal(BaseFileNode.objects.get(id=subfolder.id).type, 'osf.trashedfolder')
+        trashed_child = BaseFileNode.objects.get(id=child.id)
+        assert_equal(trashed_child.type, 'osf.trashedfile')
+        assert_equal(trashed_child.deleted_on, trashed.deleted_on)
+        assert_equal(trashed_child.path, '/' + child._id)
+        assert_equal(trashed_child.materialized_path, '/Cloud/Rain/Carp')
+
+    def test_delete_folder_trashes_subtree_with_stale_paths(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        child = folder.append_folder('Rain').append_file('Carp')
+        BaseFileNode.objects.filter(id__in=[child.id, child.parent_id]).update(_materialized_path='')
+
+        folder.delete()
+
+        assert_equal(BaseFileNode.objects.get(id=child.parent_id).type, 'osf.trashedfolder')
+        assert_equal(BaseFileNode.objects.get(id=child.id).type, 'osf.trashedfile')
+
+    def test_subtree_with_stale_paths(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        child = folder.append_folder('Rain').append_file('Carp')
+        child.checkout = self.user
+        child.save()
+        child.get_guid(create=True)
+        BaseFileNode.objects.filter(id__in=[folder.id, child.id, child.parent_id]).update(_materialized_path='')
+        folder.refresh_from_db()
+
+        assert_equal(sorted(folder.get_subtree().values_list('id', flat=True)), sorted([child.id, child.parent_id]))
+        assert_true(folder.is_checked_out)
+        assert_equal(
+            OsfStorageFileNode.get_file_guids('/' + folder._id, 'osfstorage', target=self.node),
+            [child.get_guid()._id],
+        )
+
+    def test_update_materialized_paths(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        child = folder.append_folder('Rain').append_file('Carp')
+        other = ProjectFactory().get_addon('osfstorage').get_root().append_file('Drop')
+        BaseFileNode.objects.filter(id__in=[folder.id, child.id, other.id]).update(_materialized_path='')
+
+        assert_equal(update_materialized_paths(batch_size=1, dry_run=True), 3)
+        assert_equal(BaseFileNode.objects.get(id=child.id)._materialized_path, '')
+
+        assert_equal(update_materialized_paths(batch_size=1), 3)
+        assert_equal(BaseFileNode.objects.get(id=folder.id)._materialized_path, '/Cloud/')
+        assert_equal(BaseFileNode.objects.get(id=child.id)._materialized_path, '/Cloud/Rain/Carp')
+        assert_equal(BaseFileNode.objects.get(id=other.id)._materialized_path, '/Drop')
+        assert_equal(update_materialized_paths(batch_size=1, dry_run=True), 0)
+
     def test_copy(self):
         to_copy = self.node_settings.get_root().append_file('Carp')
         copy_to = self.node_settings.get_root().append_folder('Cloud')
@@ -384,6 +492,121 @@ class TestOsfstorageFileNode(StorageTestCase):
         assert versions.first().region == component_node_settings.region
         assert versions.last().region == self.node_settings.region
 
+    def test_version_summary(self):
+        child = self.node_settings.get_root().append_file('Test')
+        assert_is_none(child._version_count)
+        assert_is_none(child._latest_version)
+        first = child.add_version(factories.FileVersionFactory(size=10))
+        latest = child.add_version(factories.FileVersionFactory(size=20))
+        assert_equal(child._version_count, 2)
+        assert_equal(child._latest_version, latest)
+        assert_equal(child._size, 20)
+
+        first.update_metadata({'size': 15})
+        latest.update_metadata({'size': 25})
+        child.reload()
+        assert_equal(child._size, 25)
+
+    def test_update_version_summaries(self):
+        root = self.node_settings.get_root()
+        carp = root.append_file('Carp')
+        carp.add_version(factories.FileVersionFactory(size=10))
+        latest = carp.add_version(factories.FileVersionFactory(size=20))
+        drop = root.append_file('Drop')
+        drop.add_version(factories.FileVersionFactory(size=5))
+        unversioned = root.append_file('Rain')
+        BaseFileNode.objects.filter(id__in=[carp.id, drop.id]).update(_latest_version=None, _version_count=None, _size=None)
+
+        assert_equal(update_summaries(batch_size=1, dry_run=True), 2)
+        assert_is_none(BaseFileNode.objects.get(id=carp.id)._version_count)
+
+        assert_equal(update_summaries(batch_size=1), 2)
+        carp.reload()
+        assert_equal(carp._latest_version, latest)
+        assert_equal(carp._version_count, 2)
+        assert_equal(carp._size, 20)
+        assert_equal(BaseFileNode.objects.get(id=drop.id)._size, 5)
+        assert_is_none(BaseFileNode.objects.get(id=unversioned.id)._version_count)
+        assert_equal(update_summaries(batch_size=1, dry_run=True), 0)
+
+    def test_copy_folder_tree(self):
+        new_project = ProjectFactory()
+        copy_to = new_project.get_addon('osfstorage').get_root()
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        carp = folder.append_file('Carp')
+        carp.add_version(factories.FileVersionFactory(region=self.node_settings.region), name='Carp v1')
+        drop = folder.append_folder('Rain').append_file('Drop')
+        drop.add_version(factories.FileVersionFactory(region=self.node_settings.region))
+        record = carp.records.first()
+        record.metadata = {'title': 'A carp'}
+        record.save()
+
+        copied = folder.copy_under(copy_to, name='Fog')
+
+        assert_equal(copied.materialized_path, '/Fog/')
+        copies = {node.copied_from_id: node for node in copied.get_subtree()}
+        assert_equal(set(copies), {carp.id, drop.id, drop.parent_id})
+        copied_carp, copied_drop = copies[carp.id], copies[drop.id]
+        assert_equal(copied_carp.materialized_path, '/Fog/Carp')
+        assert_equal(copied_drop.materialized_path, '/Fog/Rain/Drop')
+        assert_equal(copied_drop.parent, copies[drop.parent_id])
+        assert_equal(copied_drop.target, new_project)
+        assert_not_equal(copied_drop._id, drop._id)
+        assert_equal(list(copied_carp.versions.all()), list(carp.versions.all()))
+        assert_equal(copied_carp._latest_version, carp.versions.first())
+        assert_equal(copied_carp._version_count, 1)
+        assert_equal(carp.versions.first().get_basefilenode_version(copied_carp).version_name, 'Carp v1')
+        assert_equal(drop.versions.first().get_basefilenode_version(copied_drop).version_name, 'Drop')
+        assert_equal(copied_carp.records.count(), carp.records.count())
+        assert_equal(copied_carp.records.get(schema=record.schema).metadata, {'title': 'A carp'})
+
+    def test_copy_folder_tree_with_stale_paths(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        drop = folder.append_folder('Rain').append_file('Drop')
+        # Saved by a server that did not store paths yet
+        BaseFileNode.objects.filter(id__in=[drop.id, drop.parent_id]).update(_materialized_path='')
+
+        copied = folder.copy_under(self.node_settings.get_root(), name='Fog')
+
+        copies = {node.copied_from_id: node for node in copied.get_subtree()}
+        assert_equal(set(copies), {drop.id, drop.parent_id})
+        assert_equal(copies[drop.id].materialized_path, '/Fog/Rain/Drop')
+        assert_equal(copies[drop.parent_id].materialized_path, '/Fog/Rain/')
+
+    def test_copy_folder_tree_between_regions(self):
+        canada = RegionFactory()
+        new_component = NodeFactory(parent=self.project)
+        component_node_settings = new_component.get_addon('osfstorage')
+        component_node_settings.region = canada
+        component_node_settings.save()
+        folder = self.node_settings.get_root().append_folder('Aaah')
+        child = folder.append_file('There it is')
+        for _ in range(2):
+            child.add_version(factories.FileVersionFactory(region=self.node_settings.region))
+
+        copied = folder.copy_under(component_node_settings.get_root())
+
+        copied_child = copied.get_subtree().get()
+        versions = copied_child.versions.order_by('-created')
+        assert_equal(versions.count(), 2)
+        assert_equal(versions.first().region, canada)
+        assert_not_in(versions.first(), child.versions.all())
+        assert_equal(versions.last(), child.versions.order_by('-created').last())
+
+    def test_copy_folder_tree_queries_do_not_grow(self):
+        def copy_queries(size):
+            folder = self.node_settings.get_root().append_folder('Cloud {}'.format(size))
+            subfolder = folder.append_folder('Rain')
+            for i in range(size):
+                folder.append_file('Carp {}'.format(i)).add_version(factories.FileVersionFactory())
+                subfolder.append_file('Drop {}'.format(i)).add_version(factories.FileVersionFactory())
+            with CaptureQueriesContext(connection) as ctx:
+                copied = folder.copy_under(self.node_settings.get_root(), name='Fog {}'.format(size))
+            assert_equal(copied.get_subtree().count(), 2 * size + 1)
+            return len(ctx.captured_queries)
+
+        assert_equal(copy_queries(2), copy_queries(6))
+
     def test_copy_rename(self):
         to_copy = self.node_settings.get_root().append_file('Carp')
         copy_to = self.node_settings.get_root().append_folder('Cloud')
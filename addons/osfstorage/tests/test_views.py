@@ -26,7 +26,7 @@ from website.util import rubeus, api_url_for
 from framework.auth import cas
 
 from osf import features
-from osf.models import Tag, QuickFilesNode
+from osf.models import FileVersionUserMetadata, PageCounter, Tag, QuickFilesNode
 from osf.models import files as models
 from addons.osfstorage.apps import osf_storage_root
 from addons.osfstorage import utils
@@ -172,6 +172,93 @@ class TestGetMetadataHook(HookTestCase):
         assert_equal(res_date_modified, expected_date_modified)
         assert_equal(res_date_created, expected_date_created)
 
+    def test_children_metadata_summary(self):
+        record = create_record_with_version('carp', self.node_settings, size=10)
+        latest = factories.FileVersionFactory(size=20)
+        record.add_version(latest)
+        FileVersionUserMetadata.objects.create(user=self.user, file_version=latest)
+        PageCounter.objects.create(
+            _id='download:{}:{}'.format(self.node._id, record._id),
+            resource=self.node.guids.first(),
+            file=record,
+            action='download',
+            total=7,
+        )
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': self.node_settings.get_root()._id, 'user_id': self.user._id},
+            {},
+            self.node
+        )
+        assert_equal(len(res.json), 1)
+        res_data = res.json[0]
+        assert_equal(res_data['version'], 2)
+        assert_equal(res_data['size'], 20)
+        assert_equal(res_data['downloads'], 7)
+        assert_equal(res_data['latestVersionSeen'], {'user': self.user._id, 'seen': True})
+
+        latest.update_metadata({'size': 30})
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': self.node_settings.get_root()._id, 'user_id': self.user._id},
+            {},
+            self.node
+        )
+        assert_equal(res.json[0]['size'], 30)
+
+    def test_children_metadata_without_summary(self):
+        record = create_record_with_version('carp', self.node_settings, size=10)
+        latest = factories.FileVersionFactory(size=20, content_type='text/plain', metadata={'md5': 'carp'})
+        record.add_version(latest)
+        FileVersionUserMetadata.objects.create(user=self.user, file_version=latest)
+        # A file whose summary was not stored yet
+        models.BaseFileNode.objects.filter(id=record.id).update(_latest_version=None, _version_count=None, _size=None)
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': self.node_settings.get_root()._id, 'user_id': self.user._id},
+            {},
+            self.node
+        )
+        res_data = res.json[0]
+        assert_equal(res_data['version'], 2)
+        assert_equal(res_data['size'], 20)
+        assert_equal(res_data['md5'], 'carp')
+        assert_equal(res_data['contentType'], 'text/plain')
+        assert_equal(res_data['latestVersionSeen'], {'user': self.user._id, 'seen': True})
+
+    def test_children_metadata_pages(self):
+        root = self.node_settings.get_root()
+        for name in ('a', 'b', 'c'):
+            root.append_file(name)
+        ids = sorted(root.children.values_list('_id', flat=True))
+
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': root._id, 'user_id': self.user._id, 'page_size': 2},
+            {},
+            self.node
+        )
+        assert_equal([child['id'] for child in res.json], ids[:2])
+
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': root._id, 'user_id': self.user._id, 'page_size': 2, 'after': ids[1]},
+            {},
+            self.node
+        )
+        assert_equal([child['id'] for child in res.json], ids[2:])
+
+    def test_children_metadata_invalid_page_size(self):
+        for page_size in (0, storage_settings.MAX_CHILDREN_PAGE_SIZE + 1, 'all'):
+            res = self.send_hook(
+                'osfstorage_get_children',
+                {'fid': self.node_settings.get_root()._id, 'user_id': self.user._id, 'page_size': page_size},
+                {},
+                self.node,
+                expect_errors=True,
+            )
+            assert_equal(res.status_code, 400)
+
     def test_osf_storage_root(self):
         auth = Auth(self.project.creator)
         result = osf_storage_root(self.node_settings.config, self.node_settings, auth)
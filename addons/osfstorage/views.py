@@ -16,6 +16,7 @@ from framework.exceptions import HTTPError
 from framework.auth.decorators import must_be_signed, must_be_logged_in
 
 from osf.exceptions import InvalidTagError, TagNotFoundError
+from osf.migrations.sql.osfstorage_version_summaries import latest_versions
 from osf.models import FileVersion, Node, OSFUser
 from osf.utils.permissions import WRITE
 from osf.utils.requests import check_select_for_update
@@ -189,13 +190,64 @@ def osfstorage_get_metadata(file_node, **kwargs):
 @must_be_signed
 @decorators.autoload_filenode(must_be='folder')
 def osfstorage_get_children(file_node, **kwargs):
+    """List the children of a folder, ordered by id.
+
+    Large folders can be listed a page at a time: ``page_size`` limits the number of children
+    returned (to at most ``MAX_CHILDREN_PAGE_SIZE``), and ``after`` is the id of the last child of
+    the previous page. Without ``page_size``, every child is listed.
+    """
     from django.contrib.contenttypes.models import ContentType
     user_id = request.args.get('user_id')
+    after = request.args.get('after')
+    page_size = request.args.get('page_size', type=int)
+    if 'page_size' in request.args and not (page_size and 0 < page_size <= osf_storage_settings.MAX_CHILDREN_PAGE_SIZE):
+        raise make_error(
+            http_status.HTTP_400_BAD_REQUEST,
+            message_long='page_size must be between 1 and {}'.format(osf_storage_settings.MAX_CHILDREN_PAGE_SIZE),
+        )
     user_content_type_id = ContentType.objects.get_for_model(OSFUser).id
     user_pk = OSFUser.objects.filter(guids___id=user_id, guids___id__isnull=False).values_list('pk', flat=True).first()
     with connection.cursor() as cursor:
-        # Read the documentation on FileVersion's fields before reading this code
+        # Read the documentation on FileVersion's fields before reading this code. The latest
+        # version, number of versions and size of files are stored on the files themselves (see
+        # OsfStorageFile.update_version_summary) and only looked up for files without a stored
+        # summary (SUMMARY); everything else is looked up for the whole page.
         cursor.execute("""
+            WITH PAGE AS (
+                SELECT * FROM osf_basefilenode AS F
+                WHERE F.parent_id = %s
+                AND (NOT F.type IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder'))
+                AND (%s::text IS NULL OR F._id > %s)
+                ORDER BY F._id
+                LIMIT %s
+            ), SUMMARY AS ({summary}
+            ), EARLIEST_VERSION AS (
+                SELECT osf_basefileversionsthrough.basefilenode_id AS id, MIN(osf_fileversion.created) AS created
+                FROM osf_fileversion
+                JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
+                WHERE osf_basefileversionsthrough.basefilenode_id IN (SELECT id FROM PAGE)
+                GROUP BY osf_basefileversionsthrough.basefilenode_id
+            ), CHECKOUT_GUID AS (
+                SELECT DISTINCT ON (object_id) object_id AS id, _id FROM osf_guid
+                WHERE object_id IN (SELECT checkout_id FROM PAGE)
+                AND content_type_id = %s
+                ORDER BY object_id
+            ), DOWNLOAD_COUNT AS (
+                SELECT DISTINCT ON (P.file_id) P.file_id AS id, P.total FROM osf_pagecounter AS P
+                WHERE P.resource_id = %s
+                AND P.file_id IN (SELECT id FROM PAGE)
+                AND P.action = 'download'
+                AND P.version ISNULL
+                ORDER BY P.file_id
+            ), SEEN_FILE AS (
+                SELECT F.id, bool_or(osf_fileversionusermetadata.file_version_id = COALESCE(F._latest_version_id, SUMMARY.latest_version_id)) AS latest
+                FROM osf_fileversionusermetadata
+                INNER JOIN osf_basefileversionsthrough ON osf_fileversionusermetadata.file_version_id = osf_basefileversionsthrough.fileversion_id
+                INNER JOIN PAGE AS F ON osf_basefileversionsthrough.basefilenode_id = F.id
+                LEFT JOIN SUMMARY ON SUMMARY.id = F.id
+                WHERE osf_fileversionusermetadata.user_id = %s
+                GROUP BY F.id
+            )
             SELECT json_agg(CASE
                 WHEN F.type = 'osf.osfstoragefile' THEN
                     json_build_object(
@@ -203,16 +255,19 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'path', '/' || F._id
                         , 'name', F.name
                         , 'kind', 'file'
-                        , 'size', LATEST_VERSION.size
-                        , 'downloads',  COALESCE(DOWNLOAD_COUNT, 0)
-                        , 'version', (SELECT COUNT(*) FROM osf_basefileversionsthrough WHERE osf_basefileversionsthrough.basefilenode_id = F.id)
+                        , 'size', CASE WHEN F._latest_version_id IS NULL THEN SUMMARY.size ELSE F._size END
+                        , 'downloads',  COALESCE(DOWNLOAD_COUNT.total, 0)
+                        , 'version', CASE WHEN F._latest_version_id IS NULL THEN COALESCE(SUMMARY.version_count, 0) ELSE F._version_count END
                         , 'contentType', LATEST_VERSION.content_type
                         , 'modified', LATEST_VERSION.created
                         , 'created', EARLIEST_VERSION.created
-                        , 'checkout', CHECKOUT_GUID
+                        , 'checkout', CHECKOUT_GUID._id
                         , 'md5', LATEST_VERSION.metadata ->> 'md5'
                         , 'sha256', LATEST_VERSION.metadata ->> 'sha256'
-                        , 'latestVersionSeen', SEEN_LATEST_VERSION.case
+                        , 'latestVersionSeen', CASE WHEN SEEN_FILE.id IS NULL
+                            THEN NULL
+                            ELSE json_build_object('user', %s, 'seen', SEEN_FILE.latest)
+                        END
                     )
                 ELSE
                     json_build_object(
@@ -222,74 +277,26 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'kind', 'folder'
                     )
                 END
+                ORDER BY F._id
             )
-            FROM osf_basefilenode AS F
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
-                WHERE osf_basefileversionsthrough.basefilenode_id = F.id
-                ORDER BY created DESC
-                LIMIT 1
-            ) LATEST_VERSION ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
-                WHERE osf_basefileversionsthrough.basefilenode_id = F.id
-                ORDER BY created ASC
-                LIMIT 1
-            ) EARLIEST_VERSION ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT _id from osf_guid
-                WHERE object_id = F.checkout_id
-                AND content_type_id = %s
-                LIMIT 1
-            ) CHECKOUT_GUID ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT P.total AS DOWNLOAD_COUNT FROM osf_pagecounter AS P
-                WHERE P.resource_id = %s
-                AND P.file_id = F.id
-                AND P.action = 'download'
-                AND P.version ISNULL
-                LIMIT 1
-            ) DOWNLOAD_COUNT ON TRUE
-            LEFT JOIN LATERAL (
-              SELECT EXISTS(
-                SELECT (1) FROM osf_fileversionusermetadata
-                  INNER JOIN osf_fileversion ON osf_fileversionusermetadata.file_version_id = osf_fileversion.id
-                  INNER JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
-                  WHERE osf_fileversionusermetadata.user_id = %s
-                  AND osf_basefileversionsthrough.basefilenode_id = F.id
-                LIMIT 1
-              )
-            ) SEEN_FILE ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT CASE WHEN SEEN_FILE.exists
-                THEN
-                    CASE WHEN EXISTS(
-                      SELECT (1) FROM osf_fileversionusermetadata
-                      WHERE osf_fileversionusermetadata.file_version_id = LATEST_VERSION.fileversion_id
-                      AND osf_fileversionusermetadata.user_id = %s
-                      LIMIT 1
-                    )
-                    THEN
-                      json_build_object('user', %s, 'seen', TRUE)
-                    ELSE
-                      json_build_object('user', %s, 'seen', FALSE)
-                    END
-                ELSE
-                  NULL
-                END
-            ) SEEN_LATEST_VERSION ON TRUE
-            WHERE parent_id = %s
-            AND (NOT F.type IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder'))
-        """, [
+            FROM PAGE AS F
+            LEFT JOIN SUMMARY ON SUMMARY.id = F.id
+            LEFT JOIN osf_fileversion AS LATEST_VERSION ON LATEST_VERSION.id = COALESCE(F._latest_version_id, SUMMARY.latest_version_id)
+            LEFT JOIN EARLIEST_VERSION ON EARLIEST_VERSION.id = F.id
+            LEFT JOIN CHECKOUT_GUID ON CHECKOUT_GUID.id = F.checkout_id
+            LEFT JOIN DOWNLOAD_COUNT ON DOWNLOAD_COUNT.id = F.id
+            LEFT JOIN SEEN_FILE ON SEEN_FILE.id = F.id
+        """.format(summary=latest_versions.format(
+            where="V.basefilenode_id IN (SELECT id FROM PAGE WHERE type = 'osf.osfstoragefile' AND _latest_version_id IS NULL)",
+        )), [
+            file_node.id,
+            after,
+            after,
+            page_size,
             user_content_type_id,
             file_node.target.guids.first().id,
             user_pk,
-            user_pk,
-            user_id,
             user_id,
-            file_node.id
         ])
         return cursor.fetchone()[0] or []
 
@@ -9,6 +9,7 @@ from django.db.models.expressions import F
 from django.db.models.aggregates import Max
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from framework import metrics
 from framework.auth.core import Auth
 from addons.base.models import BaseNodeSettings
 from bleach.callbacks import nofollow
@@ -48,6 +49,8 @@ SHAREJS_URL = '{}:{}'.format(SHAREJS_HOST, SHAREJS_PORT)
 SHAREJS_DB_NAME = 'sharejs'
 SHAREJS_DB_URL = 'mongodb://{}:{}/{}'.format(settings.DB_HOST, settings.DB_PORT, SHAREJS_DB_NAME)
 
+WIKI_SEARCH_TEXT_KEY = 'wiki_version_search_text:{}'
+
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.utcfromtimestamp(1423760098).replace(tzinfo=pytz.utc)
 
@@ -148,6 +151,34 @@ class WikiVersion(ObjectIDMixin, BaseModel):
 
         return sanitize(self.html(node), tags=[], strip=True)
 
+    @classmethod
+    def get_search_texts(cls, versions, node=None):
+        """Return the raw text of each version, keyed by version id. Versions are never edited
+        once saved, so the rendered text is cached by version id and only versions that have
+        not been indexed before are rendered.
+
+        :param versions: WikiVersions, ideally with ``wiki_page__node`` selected
+        :param node: Node to render all versions for; defaults to each version's own node
+        """
+        from api.caching.utils import wiki_search_text_cache
+
+        versions = list(versions)
+        keys = {version.id: WIKI_SEARCH_TEXT_KEY.format(version.id) for version in versions}
+        cached = wiki_search_text_cache.get_many(keys.values())
+        texts = {}
+        missed = {}
+        for version in versions:
+            key = keys[version.id]
+            if key in cached:
+                texts[version.id] = cached[key]
+            else:
+                texts[version.id] = missed[key] = version.raw_text(node or version.wiki_page.node)
+        if missed:
+            wiki_search_text_cache.set_many(missed, settings.WIKI_SEARCH_TEXT_CACHE_TIMEOUT)
+        metrics.incr('wiki.search_text.hit', len(versions) - len(missed))
+        metrics.incr('wiki.search_text.miss', len(missed))
+        return texts
+
     @property
     def rendered_before_update(self):
         return self.created < WIKI_CHANGE_DATE
@@ -176,7 +207,8 @@ class WikiVersion(ObjectIDMixin, BaseModel):
     def save(self, *args, **kwargs):
         rv = super(WikiVersion, self).save(*args, **kwargs)
         if self.wiki_page.node:
-            self.wiki_page.node.update_search()
+            # Wiki edits never affect the node's file documents
+            self.wiki_page.node.update_search(saved_fields=set())
         self.wiki_page.modified = self.created
         self.wiki_page.save()
         self.check_spam()
@@ -288,7 +320,7 @@ class WikiPage(GuidMixin, BaseModel):
     def save(self, *args, **kwargs):
         rv = super(WikiPage, self).save(*args, **kwargs)
         if self.node and self.node.is_public:
-            self.node.update_search()
+            self.node.update_search(saved_fields=set())
         return rv
 
     def update(self, user, content):
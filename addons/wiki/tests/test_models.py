@@ -1,3 +1,4 @@
+import mock
 import pytest
 import pytz
 import datetime
@@ -48,6 +49,23 @@ class TestWikiPageModel:
         page.save()
         assert ver1.is_current is False
 
+    def test_get_search_texts_renders_each_version_once(self):
+        user = UserFactory()
+        node = NodeFactory()
+        page = WikiPage(page_name='foo', node=node)
+        page.save()
+        ver1 = page.update(user=user, content='**draft1**')
+        texts = WikiVersion.get_search_texts([ver1], node=node)
+        assert texts == {ver1.id: 'draft1'}
+
+        ver2 = page.update(user=user, content='draft2')
+        with mock.patch.object(WikiVersion, 'raw_text', autospec=True, return_value='draft2') as mock_raw_text:
+            texts = WikiVersion.get_search_texts([ver1, ver2], node=node)
+        assert texts == {ver1.id: 'draft1', ver2.id: 'draft2'}
+        # Only the new version was rendered
+        assert mock_raw_text.call_count == 1
+        assert mock_raw_text.call_args[0][0] == ver2
+
 
 class TestWikiPage(OsfTestCase):
 
@@ -18,6 +18,7 @@ from django.db.models import QuerySet as DjangoQuerySet
 from django.db.models import Q
 from rest_framework import serializers as ser
 from rest_framework.filters import OrderingFilter
+from framework import metrics
 from osf.models import Subject, Preprint
 from osf.models.base import GuidMixin
 from functools import cmp_to_key
@@ -386,6 +387,10 @@ class ListFilterMixin(FilterMixin):
 
     Serializers that want to restrict which fields are used for filtering need to have a variable called
     filterable_fields which is a frozenset of strings representing the field names as they appear in the serialization.
+
+    Fields that are not model fields (e.g. SerializerMethodFields) can be filtered in the database by mapping
+    them to query expressions in a dict called filter_annotations. The queryset is annotated with the expressions
+    of the fields that are filtered on, and the filters compare the annotations.
     """
     FILTERS = {
         'eq': operator.eq,
@@ -417,6 +422,9 @@ class ListFilterMixin(FilterMixin):
         queryset = default_queryset
         query_parts = []
 
+        if filters and not isinstance(queryset, list):
+            queryset = self.annotate_filter_fields(queryset, filters)
+
         if filters:
             for key, field_names in filters.items():
 
@@ -445,6 +453,36 @@ class ListFilterMixin(FilterMixin):
 
         return queryset
 
+    def annotate_filter_fields(self, queryset, filters):
+        """Annotate the queryset with the filter_annotations of the serializer fields that are filtered on,
+        and point their filters at the annotations.
+        """
+        filter_annotations = getattr(self.serializer_class, 'filter_annotations', {})
+        annotations = {}
+        for field_names in filters.values():
+            for field_name, data in field_names.items():
+                if field_name not in filter_annotations:
+                    continue
+                expression = filter_annotations[field_name]
+                annotation_name = '_filter_{}'.format(field_name)
+                annotations[annotation_name] = expression
+                for operation in (data if isinstance(data, list) else [data]):
+                    operation['source_field_name'] = annotation_name
+                    operation['value'] = self.convert_annotation_value(operation['value'], expression)
+        if not annotations:
+            return queryset
+        return queryset.annotate(**annotations)
+
+    def convert_annotation_value(self, value, expression):
+        if value is None:
+            return value
+        if isinstance(value, list):
+            return [self.convert_annotation_value(item, expression) for item in value]
+        try:
+            return expression.output_field.to_python(value)
+        except ValidationError:
+            raise InvalidFilterValue(value=value)
+
     def build_query_from_field(self, field_name, operation):
         query_field_name = operation['source_field_name']
         if operation['op'] == 'ne':
@@ -502,6 +540,9 @@ class ListFilterMixin(FilterMixin):
         """filters default queryset based on the serializer field type"""
         field = self.serializer_class._declared_fields[field_name]
         source_field_name = params['source_field_name']
+        # Every object of the list is loaded to be filtered, so filtering like this should stay rare
+        endpoint = getattr(self, 'view_fqn', type(self).__name__).replace(':', '.')
+        metrics.incr('api.filters.in_python.{}.{}'.format(endpoint, field_name))
 
         if isinstance(field, ser.SerializerMethodField):
             return_val = [
@@ -1,8 +1,14 @@
+import base64
+import binascii
+import json
+
 from django.utils import six
 from collections import OrderedDict
 from django.urls import reverse
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
-from django.db.models import QuerySet
+from django.db import connections
+from django.db.models import Q, QuerySet
 
 from rest_framework import pagination
 from rest_framework.exceptions import NotFound
@@ -10,6 +16,8 @@ from rest_framework.response import Response
 from rest_framework.utils.urls import (
     replace_query_param, remove_query_param,
 )
+from api.base.exceptions import InvalidQueryStringError
+from api.base.filters import OSFOrderingFilter
 from api.base.serializers import is_anonymized
 from api.base.settings import MAX_PAGE_SIZE
 from api.base.utils import absolute_reverse
@@ -18,17 +26,66 @@ from osf.models import AbstractNode, Comment, Preprint, Guid, DraftRegistration
 from website.search.elastic_search import DOC_TYPE_TO_MODEL
 
 
+def estimate_count(queryset):
+    """The number of rows the Postgres planner expects ``queryset`` to return, which is
+    cheap to get but can be far off.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) {}'.format(sql), params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, six.string_types):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class CursorPage(object):
+    """A page of a queryset ordered by (field, pk), starting after (or, going backwards,
+    ending before) a position given by a cursor.
+    """
+
+    def __init__(self, field, descending, per_page):
+        self.field = field
+        self.descending = descending
+        self.per_page = per_page
+        self.results = []
+        # [field value, pk] of the first and last result, when there are pages before/after
+        self.previous_position = None
+        self.next_position = None
+        self.count = None
+        self.count_is_estimate = False
+
+    @property
+    def ordering(self):
+        return '{}{}'.format('-' if self.descending else '', self.field)
+
+    def encode_cursor(self, position, backwards):
+        cursor = json.dumps({'o': self.ordering, 'p': position, 'b': backwards})
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
 class JSONAPIPagination(pagination.PageNumberPagination):
     """
     Custom paginator that formats responses in a JSON-API compatible format.
 
     Properly handles pagination of embedded objects.
 
+    Passing ``page[cursor]`` switches to keyset pagination: pages are ordered by
+    (modified, created or last_logged, id) and each one is fetched by its position instead of
+    an offset, so deep pages are as fast as the first. ``page[cursor]=`` is the first page, the
+    next/prev links carry the cursors of the other pages, and there is no last link.
+    ``page[total]=estimate`` or ``page[total]=none`` replace the count of all results.
     """
 
     page_size_query_param = 'page[size]'
     max_page_size = MAX_PAGE_SIZE
 
+    cursor_query_param = 'page[cursor]'
+    total_query_param = 'page[total]'
+    # Fields cursor pages can be ordered by, with the primary key breaking ties
+    cursor_ordering_fields = ('modified', 'created', 'last_logged')
+    cursor_page = None
+
     def page_number_query(self, url, page_number):
         """
         Builds uri and adds page param.
@@ -41,33 +98,69 @@ class JSONAPIPagination(pagination.PageNumberPagination):
 
         return paginated_url
 
+    def cursor_query(self, cursor):
+        url = remove_query_param(self.request.build_absolute_uri(), '_')
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
     def get_self_real_link(self, url):
+        if self.cursor_page is not None:
+            return self.cursor_query(self.request.query_params[self.cursor_query_param])
         page_number = self.page.number
         return self.page_number_query(url, page_number)
 
     def get_first_real_link(self, url):
+        if self.cursor_page is not None:
+            if self.cursor_page.previous_position is None:
+                return None
+            return self.cursor_query('')
         if not self.page.has_previous():
             return None
         return self.page_number_query(url, 1)
 
     def get_last_real_link(self, url):
+        if self.cursor_page is not None:
+            # Reaching the last page would take counting everything before it
+            return None
         if not self.page.has_next():
             return None
         page_number = self.page.paginator.num_pages
         return self.page_number_query(url, page_number)
 
     def get_previous_real_link(self, url):
+        if self.cursor_page is not None:
+            if self.cursor_page.previous_position is None:
+                return None
+            return self.cursor_query(self.cursor_page.encode_cursor(self.cursor_page.previous_position, backwards=True))
         if not self.page.has_previous():
             return None
         page_number = self.page.previous_page_number()
         return self.page_number_query(url, page_number)
 
     def get_next_real_link(self, url):
+        if self.cursor_page is not None:
+            if self.cursor_page.next_position is None:
+                return None
+            return self.cursor_query(self.cursor_page.encode_cursor(self.cursor_page.next_position, backwards=False))
         if not self.page.has_next():
             return None
         page_number = self.page.next_page_number()
         return self.page_number_query(url, page_number)
 
+    def get_meta(self):
+        if self.cursor_page is not None:
+            meta = OrderedDict([
+                ('total', self.cursor_page.count),
+                ('per_page', self.cursor_page.per_page),
+            ])
+            if self.cursor_page.count_is_estimate:
+                meta['total_is_estimate'] = True
+            return meta
+        return OrderedDict([
+            ('total', self.page.paginator.count),
+            ('per_page', self.page.paginator.per_page),
+        ])
+
     def get_response_dict_deprecated(self, data, url):
         return OrderedDict([
             ('data', data),
@@ -77,12 +170,7 @@ class JSONAPIPagination(pagination.PageNumberPagination):
                     ('last', self.get_last_real_link(url)),
                     ('prev', self.get_previous_real_link(url)),
                     ('next', self.get_next_real_link(url)),
-                    (
-                        'meta', OrderedDict([
-                            ('total', self.page.paginator.count),
-                            ('per_page', self.page.paginator.per_page),
-                        ]),
-                    ),
+                    ('meta', self.get_meta()),
                 ]),
             ),
         ])
@@ -90,12 +178,7 @@ class JSONAPIPagination(pagination.PageNumberPagination):
     def get_response_dict(self, data, url):
         return OrderedDict([
             ('data', data),
-            (
-                'meta', OrderedDict([
-                    ('total', self.page.paginator.count),
-                    ('per_page', self.page.paginator.per_page),
-                ]),
-            ),
+            ('meta', self.get_meta()),
             (
                 'links', OrderedDict([
                     ('self', self.get_self_real_link(url)),
@@ -164,9 +247,130 @@ class JSONAPIPagination(pagination.PageNumberPagination):
             self.request = request
             return list(self.page)
 
+        elif self.cursor_query_param in request.query_params:
+            return self.paginate_queryset_by_cursor(queryset, request, view=view)
+
         else:
             return super(JSONAPIPagination, self).paginate_queryset(queryset, request, view=None)
 
+    def get_cursor_ordering(self, queryset, request, view=None):
+        """Return (field, descending) of the ordering of cursor pages of ``queryset``: the
+        requested sort, else the queryset's own ordering if that is by one of the
+        cursor_ordering_fields, else -created. Like OSFOrderingFilter, the sort may name a
+        serializer field (e.g. date_modified) instead of the model field it comes from.
+        """
+        sort = request.query_params.get('sort')
+        if sort:
+            ordering = sort.split(',')[0].strip()
+            field = ordering.lstrip('-')
+            if field not in self.cursor_ordering_fields and view is not None:
+                source = OSFOrderingFilter().get_serializer_source_field(view, request).get(field)
+                if source:
+                    ordering = ordering.replace(field, source, 1)
+            if ordering.lstrip('-') not in self.cursor_ordering_fields:
+                raise InvalidQueryStringError(
+                    detail='Cursor pagination only supports sorting by {}.'.format(', '.join(self.cursor_ordering_fields)),
+                    parameter='sort',
+                )
+        else:
+            ordering = (queryset.query.order_by or queryset.model._meta.ordering or [None])[0]
+            if not isinstance(ordering, six.string_types) or ordering.lstrip('-') not in self.cursor_ordering_fields:
+                ordering = '-created'
+        field = ordering.lstrip('-')
+        try:
+            queryset.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            raise InvalidQueryStringError(
+                detail='Cursor pagination is not supported by this endpoint.',
+                parameter=self.cursor_query_param,
+            )
+        return field, ordering.startswith('-')
+
+    def decode_cursor(self, cursor, queryset, ordering):
+        """Return (position, backwards) of a cursor, or (None, False) for the first page."""
+        if not cursor:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if cursor['o'] != ordering:
+                raise ValueError('Cursor of another ordering')
+            value, pk = cursor['p']
+            field = queryset.model._meta.get_field(ordering.lstrip('-'))
+            position = (field.to_python(value), queryset.model._meta.pk.to_python(pk))
+            return position, bool(cursor['b'])
+        except (binascii.Error, ValueError, TypeError, KeyError, FieldDoesNotExist, ValidationError):
+            raise InvalidQueryStringError(detail='Invalid cursor.', parameter=self.cursor_query_param)
+
+    def get_cursor_count(self, queryset, request):
+        """Return (count, whether it is an estimate) as requested by ``page[total]``."""
+        total = request.query_params.get(self.total_query_param, 'exact')
+        if total == 'exact':
+            return queryset.count(), False
+        if total == 'estimate':
+            return estimate_count(queryset), True
+        if total == 'none':
+            return None, False
+        raise InvalidQueryStringError(
+            detail='Must be one of exact, estimate or none.',
+            parameter=self.total_query_param,
+        )
+
+    def paginate_queryset_by_cursor(self, queryset, request, view=None):
+        if not isinstance(queryset, QuerySet):
+            raise InvalidQueryStringError(
+                detail='Cursor pagination is not supported by this endpoint.',
+                parameter=self.cursor_query_param,
+            )
+        self.request = request
+        page_size = self.get_page_size(request)
+        field, descending = self.get_cursor_ordering(queryset, request, view)
+        page = CursorPage(field, descending, page_size)
+        position, backwards = self.decode_cursor(request.query_params[self.cursor_query_param], queryset, page.ordering)
+        page.count, page.count_is_estimate = self.get_cursor_count(queryset, request)
+
+        # Going backwards, fetch the page in reverse and turn it around
+        reverse = descending != backwards
+        pk_name = queryset.model._meta.pk.name
+        if position is not None:
+            queryset = queryset.filter(self.get_cursor_filter(field, pk_name, position, reverse))
+        order = ['-' + field, '-' + pk_name] if reverse else [field, pk_name]
+        results = list(queryset.order_by(*order)[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if backwards:
+            results.reverse()
+
+        if backwards:
+            # There is a page after, the one the cursor came from
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = position is not None, has_more
+        if results and has_previous:
+            page.previous_position = self.get_position(results[0], field)
+        if results and has_next:
+            page.next_position = self.get_position(results[-1], field)
+        page.results = results
+        self.cursor_page = page
+        return results
+
+    def get_cursor_filter(self, field, pk_name, position, reverse):
+        """Return the filter for the results after ``position`` in (field, pk) order, or before it
+        when ``reverse``. Like Postgres, NULL values of ``field`` sort after all others.
+        """
+        value, pk = position
+        lookup = 'lt' if reverse else 'gt'
+        if value is None:
+            after = Q(**{'{}__isnull'.format(field): True, '{}__{}'.format(pk_name, lookup): pk})
+            return after | Q(**{'{}__isnull'.format(field): False}) if reverse else after
+        after = Q(**{'{}__{}'.format(field, lookup): value}) | Q(**{field: value, '{}__{}'.format(pk_name, lookup): pk})
+        return after if reverse else after | Q(**{'{}__isnull'.format(field): True})
+
+    def get_position(self, obj, field):
+        value = getattr(obj, field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return [value, obj.pk]
+
 
 class MaxSizePagination(JSONAPIPagination):
     page_size = 1000
@@ -220,8 +424,12 @@ class NodeContributorPagination(JSONAPIPagination):
         response = super(NodeContributorPagination, self).get_paginated_response(data)
         response_dict = response.data
         kwargs = self.request.parser_context['kwargs'].copy()
-        node = self.get_resource(kwargs)
-        total_bibliographic = node.visible_contributors.count()
+        contributors = self.page.paginator.object_list
+        if kwargs.get('is_embedded') and isinstance(contributors, list):
+            # Embedded pages are taken from every contributor of the resource, already fetched
+            total_bibliographic = sum(1 for contributor in contributors if contributor.visible)
+        else:
+            total_bibliographic = self.get_resource(kwargs).visible_contributors.count()
         if self.request.version < '2.1':
             response_dict['links']['meta']['total_bibliographic'] = total_bibliographic
         else:
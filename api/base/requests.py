@@ -10,13 +10,17 @@ class EmbeddedRequest(Request):
 
     Enforces that the request method is 'GET' and user is the
     authorized user from the original request.
+
+    ``parents`` holds the object embedding the resource, ``prefetched`` objects loaded
+    for a whole page of embeds (model => {lookup: object}).
     """
     def __init__(
         self, request, parsers=None, authenticators=None,
-        negotiator=None, parser_context=None, parents=None,
+        negotiator=None, parser_context=None, parents=None, prefetched=None,
     ):
         self.original_user = request.user
         self.parents = parents or {Node: {}, OSFUser: {}}
+        self.prefetched = prefetched if prefetched is not None else {}
         self.version = request.version
 
         super(EmbeddedRequest, self).__init__(
@@ -6,6 +6,7 @@ import furl
 import waffle
 from django.core.urlresolvers import resolve, reverse, NoReverseMatch
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
 from distutils.version import StrictVersion
 
 from rest_framework import exceptions, permissions
@@ -18,6 +19,7 @@ from api.base import utils
 from osf.utils import permissions as osf_permissions
 from osf.utils import sanitize
 from osf.utils import functional
+from osf.utils.permission_cache import get_permission_cache
 from api.base import exceptions as api_exceptions
 from api.base.settings import BULK_SETTINGS
 from framework.auth import core as auth_core
@@ -515,6 +517,19 @@ class AnonymizedRegexField(AuthorizedCharField):
 
         return value
 
+
+# Relationship URLs are built from a template per view and set of url kwargs, compiled by
+# reversing the view once with placeholders, instead of calling reverse() for every object.
+# (view name, url kwarg names, version kwarg, version query parameter, versioning class, format) => template,
+# or None if the view cannot be templated
+_relationship_url_templates = {}
+_URL_TEMPLATE_PLACEHOLDER = 'urltemplatekwarg{}z'
+# Values that need no quoting and match the url patterns of every templated kwarg (\w+ in practice)
+_URL_TEMPLATE_SAFE_VALUE = re.compile(r'^[a-z0-9]+$')
+# (view name, url kwarg names) => (view class, namespace) of the view, as resolve() finds them
+_relationship_views = {}
+
+
 class RelationshipField(ser.HyperlinkedIdentityField):
     """
     RelationshipField that permits the return of both self and related links, along with optional
@@ -742,8 +757,47 @@ class RelationshipField(ser.HyperlinkedIdentityField):
     def _handle_callable_view(self, obj, view):
         return view(getattr(obj, self.field_name))
 
+    def reverse_from_template(self, view, kwargs, request, format):
+        """Equivalent of ``self.reverse``, filled in from a URL template compiled once per view
+        when every url kwarg value is safe to substitute.
+        """
+        names = tuple(sorted(name for name in kwargs if name != 'version'))
+        versioning_class = type(getattr(request, 'versioning_scheme', None))
+        if versioning_class is type(None) or not all(
+            isinstance(kwargs[name], str) and _URL_TEMPLATE_SAFE_VALUE.match(kwargs[name]) for name in names
+        ):
+            return self.reverse(view, kwargs=kwargs, request=request, format=format)
+
+        # The versioning scheme adds the version query parameter of the request to the URL
+        query_version = request.query_params.get(request.versioning_scheme.version_param)
+        key = (view, names, kwargs.get('version'), query_version, versioning_class, format)
+        try:
+            template = _relationship_url_templates[key]
+        except KeyError:
+            template = _relationship_url_templates[key] = self.compile_url_template(view, names, kwargs, request, format)
+        if template is None:
+            return self.reverse(view, kwargs=kwargs, request=request, format=format)
+        return template.format(**{name: kwargs[name] for name in names})
+
+    def compile_url_template(self, view, names, kwargs, request, format):
+        placeholder_kwargs = {name: _URL_TEMPLATE_PLACEHOLDER.format(i) for i, name in enumerate(names)}
+        if 'version' in kwargs:
+            placeholder_kwargs['version'] = kwargs['version']
+        try:
+            url = self.reverse(view, kwargs=placeholder_kwargs, request=request, format=format)
+        except NoReverseMatch:
+            return None
+        template = url.replace('{', '{{').replace('}', '}}')
+        for i, name in enumerate(names):
+            placeholder = _URL_TEMPLATE_PLACEHOLDER.format(i)
+            if template.count(placeholder) != 1:
+                return None
+            template = template.replace(placeholder, '{' + name + '}')
+        return template
+
     # Overrides HyperlinkedIdentityField
     def get_url(self, obj, view_name, request, format):
+        self._related_view = None
         urls = {}
         for view_name, view in self.views.items():
             if view is None:
@@ -757,7 +811,9 @@ class RelationshipField(ser.HyperlinkedIdentityField):
                         view = self._handle_callable_view(obj, view)
                     if request.parser_context['kwargs'].get('version', False):
                         kwargs.update({'version': request.parser_context['kwargs']['version']})
-                    url = self.reverse(view, kwargs=kwargs, request=request, format=format)
+                    url = self.reverse_from_template(view, kwargs, request, format)
+                    if view_name == 'related':
+                        self._related_view = (view, kwargs)
                     if self.filter:
                         formatted_filters = self.format_filter(obj)
                         if formatted_filters:
@@ -871,38 +927,49 @@ class RelationshipField(ser.HyperlinkedIdentityField):
                 return {'data': None}
 
         related_url = url['related']
-        related_path = urlparse(related_url).path if related_url else None
         related_meta = self.get_meta_information(self.related_meta, value)
         self_url = url['self']
         self_meta = self.get_meta_information(self.self_meta, value)
         relationship = format_relationship_links(related_url, self_url, related_meta, self_meta)
         if related_url:
-            resolved_url = resolve(related_path)
-            related_class = resolved_url.func.view_class
+            view, kwargs = self._related_view
+            related_class, namespace = self.get_related_view(view, kwargs, related_url)
             if issubclass(related_class, RetrieveModelMixin):
                 try:
-                    related_type = resolved_url.namespace.split(':')[-1]
+                    related_type = namespace.split(':')[-1]
                     # TODO: change kwargs to preprint_provider_id and registration_id
                     if related_type in ('preprint_providers', 'preprint-providers', 'registration-providers'):
-                        related_id = resolved_url.kwargs['provider_id']
+                        related_id = kwargs['provider_id']
                     elif related_type in ('registrations', 'draft_nodes'):
-                        related_id = resolved_url.kwargs['node_id']
+                        related_id = kwargs['node_id']
                     elif related_type == 'schemas' and related_class.view_name == 'registration-schema-detail':
-                        related_id = resolved_url.kwargs['schema_id']
+                        related_id = kwargs['schema_id']
                         related_type = 'registration-schemas'
                     elif related_type == 'users' and related_class.view_name == 'user_settings':
-                        related_id = resolved_url.kwargs['user_id']
+                        related_id = kwargs['user_id']
                         related_type = 'user-settings'
                     elif related_type == 'institutions' and related_class.view_name == 'institution-summary-metrics':
-                        related_id = resolved_url.kwargs['institution_id']
+                        related_id = kwargs['institution_id']
                         related_type = 'institution-summary-metrics'
                     else:
-                        related_id = resolved_url.kwargs[related_type[:-1] + '_id']
+                        related_id = kwargs[related_type[:-1] + '_id']
                 except KeyError:
                     return relationship
-                relationship['data'] = {'id': related_id, 'type': related_type}
+                relationship['data'] = {'id': str(related_id), 'type': related_type}
         return relationship
 
+    def get_related_view(self, view, kwargs, related_url):
+        """Return the view class and namespace of the related view, resolving its URL only the
+        first time the view is seen with these url kwargs.
+        """
+        key = (view, tuple(sorted(name for name in kwargs if name != 'version')))
+        try:
+            return _relationship_views[key]
+        except KeyError:
+            resolved_url = resolve(urlparse(related_url).path)
+            _relationship_views[key] = resolved_url.func.view_class, resolved_url.namespace
+            return _relationship_views[key]
+
 
 class TypedRelationshipField(RelationshipField):
     """ Overrides get_url to inject a typed namespace.
@@ -1236,6 +1303,14 @@ class JSONAPIListSerializer(ser.ListSerializer):
         if isinstance(data, collections.Mapping):
             errors = data.get('errors', None)
             data = data.get('data', None)
+
+        permission_cache = get_permission_cache()
+        if permission_cache is not None and isinstance(data, (list, QuerySet)):
+            # Permission checks on any item of the page fetch the permissions of the whole page
+            permission_cache.add_objects(data)
+        if isinstance(self.child, JSONAPISerializer) and isinstance(data, (list, QuerySet)):
+            self.child.set_page(data)
+
         if enable_esi:
             ret = [
                 self.child.to_esi_representation(item, envelope=None) for item in data
@@ -1364,6 +1439,29 @@ class JSONAPISerializer(BaseAPISerializer):
         kwargs['child'] = cls(*args, **kwargs)
         return JSONAPIListSerializer(*args, **kwargs)
 
+    def set_page(self, objs):
+        """Set the objects of the page a list serializer is about to serialize with this serializer."""
+        self._page = list(objs)
+        self._page_pks = {item.pk for item in self._page}
+        self._related_counts = {}
+        for embed in self.context.get('embed', {}).values():
+            # Embedded views fetch their values for the whole page on the first embed
+            if hasattr(embed, 'set_page'):
+                embed.set_page(self._page)
+
+    def get_related_count(self, name, obj, count_page):
+        """Return the related count ``name`` of ``obj`` from a per-page map of counts.
+
+        :param function count_page: Given a list of objects, return {pk: count} for those with a
+            count other than 0. Called once with the whole page (or with just ``obj`` if it is not
+            on a page) instead of once per object.
+        """
+        if obj.pk not in getattr(self, '_page_pks', ()):
+            return count_page([obj]).get(obj.pk, 0)
+        if name not in self._related_counts:
+            self._related_counts[name] = count_page(self._page)
+        return self._related_counts[name].get(obj.pk, 0)
+
     def invalid_embeds(self, fields, embeds):
         fields_check = fields[:]
         for index, field in enumerate(fields_check):
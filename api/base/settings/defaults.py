@@ -322,6 +322,15 @@ ELASTICSEARCH_METRICS_DATE_FORMAT = '%Y'
 WAFFLE_CACHE_NAME = 'waffle_cache'
 STORAGE_USAGE_CACHE_NAME = 'storage_usage'
 STORAGE_USAGE_MAX_ENTRIES = 10000000
+WIKI_SEARCH_TEXT_CACHE_NAME = 'wiki_search_text'
+WIKI_SEARCH_TEXT_MAX_ENTRIES = 10000000
+SEARCH_RESULT_CACHE_NAME = 'search_results'
+SEARCH_RESULT_MAX_ENTRIES = 100000
+CAS_TOKEN_CACHE_NAME = 'cas_tokens'
+CAS_TOKEN_MAX_ENTRIES = 1000000
+SESSION_CACHE_NAME = 'sessions'
+PAGE_VISIT_CACHE_NAME = 'page_visits'
+PAGE_VISIT_MAX_ENTRIES = 1000000
 
 
 CACHES = {
@@ -338,6 +347,42 @@ CACHES = {
     WAFFLE_CACHE_NAME: {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     },
+    WIKI_SEARCH_TEXT_CACHE_NAME: {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'osf_wiki_search_text_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': WIKI_SEARCH_TEXT_MAX_ENTRIES,
+        },
+    },
+    SEARCH_RESULT_CACHE_NAME: {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'osf_search_result_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': SEARCH_RESULT_MAX_ENTRIES,
+        },
+    },
+    CAS_TOKEN_CACHE_NAME: {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'osf_cas_token_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': CAS_TOKEN_MAX_ENTRIES,
+        },
+    },
+    # Used when osf_settings.SESSION_BACKEND is 'cache'. The in-process cache is only a stand-in
+    # for developing with a single process; deployments point this at Redis in local.py.
+    SESSION_CACHE_NAME: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'osf_sessions',
+    },
+    # Which pages each session downloaded or viewed, for the unique counts of PageCounter. Like
+    # the session cache, deployments point this at Redis in local.py.
+    PAGE_VISIT_CACHE_NAME: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'osf_page_visits',
+        'OPTIONS': {
+            'MAX_ENTRIES': PAGE_VISIT_MAX_ENTRIES,
+        },
+    },
 }
 
 SLOAN_ID_COOKIE_NAME = 'sloan_id'
@@ -7,7 +7,7 @@ from hashids import Hashids
 
 from django.utils.http import urlquote
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import QuerySet, F
+from django.db.models import QuerySet, F, Exists, OuterRef, Value, BooleanField
 from rest_framework.exceptions import NotFound
 from rest_framework.reverse import reverse
 
@@ -17,7 +17,9 @@ from api.base.settings import HASHIDS_SALT
 from framework.auth import Auth
 from framework.auth.cas import CasResponse
 from framework.auth.oauth_scopes import ComposedScopes, normalize_scopes
-from osf.models import OSFUser, Node, Registration
+from osf.models import OSFUser, Node, Registration, Contributor, Preprint, PreprintContributor
+from osf.models.node import NodeGroupObjectPermission
+from osf.models.preprint import PreprintGroupObjectPermission
 from osf.models.base import GuidMixin
 from osf.utils.requests import check_select_for_update
 from website import settings as website_settings
@@ -162,6 +164,41 @@ def default_node_list_permission_queryset(user, model_cls):
     qs = default_node_permission_queryset(user, model_cls) & default_node_list_queryset(model_cls)
     return qs.annotate(region=F('addons_osfstorage_node_settings__region___id'))
 
+def annotate_user_permissions(queryset, user):
+    """
+    Annotate a queryset of nodes or preprints with the permissions ``user`` has on each of them,
+    so list serializers don't query the permissions of every object on the page.
+
+    ``has_read``, ``has_write`` and ``has_admin`` include permissions through OSF group membership,
+    ``user_is_contrib`` means the user is a traditional contributor. Implicit admin permissions
+    are not included.
+    """
+    if user is None or user.is_anonymous:
+        no_permission = Value(False, output_field=BooleanField())
+        return queryset.annotate(
+            user_is_contrib=no_permission,
+            has_read=no_permission,
+            has_write=no_permission,
+            has_admin=no_permission,
+        )
+
+    if issubclass(queryset.model, Preprint):
+        object_type = 'preprint'
+        contributors = PreprintContributor.objects.filter(preprint=OuterRef('pk'))
+        group_permissions = PreprintGroupObjectPermission.objects.all()
+    else:
+        object_type = 'node'
+        contributors = Contributor.objects.filter(node=OuterRef('pk'))
+        group_permissions = NodeGroupObjectPermission.objects.all()
+    # Joins osf_osfuser_groups, so group membership counts as much as contributorship
+    user_permissions = group_permissions.filter(content_object_id=OuterRef('pk'), group__user=user)
+    return queryset.annotate(
+        user_is_contrib=Exists(contributors.filter(user=user)),
+        has_read=Exists(user_permissions.filter(permission__codename='read_{}'.format(object_type))),
+        has_write=Exists(user_permissions.filter(permission__codename='write_{}'.format(object_type))),
+        has_admin=Exists(user_permissions.filter(permission__codename='admin_{}'.format(object_type))),
+    )
+
 def extend_querystring_params(url, params):
     scheme, netloc, path, query, _ = urlsplit(url)
     orig_params = parse_qs(query)
@@ -13,7 +13,7 @@ from rest_framework import generics
 from rest_framework import permissions as drf_permissions
 from rest_framework import status
 from rest_framework.decorators import api_view, throttle_classes
-from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.exceptions import APIException, ValidationError, NotFound
 from rest_framework.mixins import ListModelMixin
 from rest_framework.response import Response
 
@@ -46,98 +46,201 @@ from waffle.models import Flag, Switch, Sample
 from waffle import sample_is_active
 
 
-class JSONAPIBaseView(generics.GenericAPIView):
+class EmbedPartial(object):
+    """Fetches the values of an embedded field, one object of the response at a time.
 
-    def __init__(self, **kwargs):
-        assert getattr(self, 'view_name', None), 'Must specify view_name on view.'
-        assert getattr(self, 'view_category', None), 'Must specify view_category on view.'
-        self.view_fqn = ':'.join([self.view_category, self.view_name])
-        super(JSONAPIBaseView, self).__init__(**kwargs)
+    Each call builds and runs the embedded view for one object, as if it were requested on its
+    own. When a list serializer hands over its page first (``set_page``), the first call on an
+    object of the page asks the embedded view to fetch what it returns for the whole page at once.
+    The view of every object still runs its own permission checks and pagination, and reports its
+    own errors, on the prefetched results.
 
-    def _get_embed_partial(self, field_name, field):
-        """Create a partial function to fetch the values of an embedded field. A basic
-        example is to include a Node's children in a single response.
+    Embedded views opt in by implementing either of:
 
-        :param str field_name: Name of field of the view's serializer_class to load
-        results for
-        :return function object -> dict:
-        """
+    * ``get_embed_batch_queryset(parents)`` (list views): return ``(queryset, field)``, with the
+      queryset holding what the view lists for each of the ``parents`` before filtering and
+      ordering, and ``field`` the foreign key of its model to them; or None.
+    * ``get_embed_batch_objects(embeds)`` (detail views): given (embedding object, view kwargs)
+      pairs, return ``{model: {lookup: object}}`` for ``EmbeddedRequest.prefetched``, or None.
+    """
+
+    def __init__(self, view, field_name, field):
         if getattr(field, 'field', None):
             field = field.field
-
-        def partial(item):
+        self.view = view
+        self.field_name = field_name
+        self.field = field
+        self._page = {}
+        self._resolved = {}
+        # (type, pk) of an object of the page => what the embedded list view lists for it
+        self._prefetched_lists = {}
+        # model => {lookup: object} for embedded detail views, see EmbeddedRequest.prefetched
+        self._prefetched_objects = {}
+
+    @staticmethod
+    def _key(item):
+        return type(item), item.pk
+
+    def set_page(self, items):
+        self._page = {self._key(item): item for item in items}
+        self._prefetched_lists = {}
+        self._prefetched_objects = {}
+
+    def resolve(self, item):
+        key = self._key(item)
+        if key not in self._resolved:
             # resolve must be implemented on the field
-            v, view_args, view_kwargs = field.resolve(item, field_name, self.request)
-            if not v:
-                return None
+            self._resolved[key] = self.field.resolve(item, self.field_name, self.view.request)
+        v, view_args, view_kwargs = self._resolved[key]
+        return v, view_args, dict(view_kwargs) if view_kwargs is not None else None
 
-            request = EmbeddedRequest(self.request)
+    def build_view(self, item, v, view_args, view_kwargs):
+        request = EmbeddedRequest(self.view.request, prefetched=self._prefetched_objects)
+        request.parents.setdefault(type(item), {})[item._id] = item
 
-            if not hasattr(request._request, '_embed_cache'):
-                request._request._embed_cache = {}
-            cache = request._request._embed_cache
+        view_kwargs.update({
+            'request': request,
+            'is_embedded': True,
+        })
 
-            request.parents.setdefault(type(item), {})[item._id] = item
+        # Setup a view ourselves to avoid all the junk DRF throws in
+        # v is a function that hides everything v.cls is the actual view class
+        view = v.cls()
+        view.args = view_args
+        view.kwargs = view_kwargs
+        view.request = request
+        view.request.parser_context['kwargs'] = view_kwargs
+        view.format_kwarg = view.get_format_suffix(**view_kwargs)
+        return view
+
+    def prefetch(self):
+        """Fetch the embedded values of every object of the page, grouped by embedded view."""
+        embeds = defaultdict(list)
+        for item in self._page.values():
+            v, view_args, view_kwargs = self.resolve(item)
+            if v:
+                embeds[v.cls].append((item, v, view_args, view_kwargs))
+        self._page = {}
+
+        for view_embeds in embeds.values():
+            if len(view_embeds) < 2:
+                continue
+            view = self.build_view(*view_embeds[0])
+            try:
+                if isinstance(view, ListModelMixin):
+                    self._prefetch_lists(view, view_embeds)
+                elif hasattr(view, 'get_embed_batch_objects'):
+                    objects = view.get_embed_batch_objects([(item, view_kwargs) for item, _, _, view_kwargs in view_embeds])
+                    for model, objs in (objects or {}).items():
+                        self._prefetched_objects.setdefault(model, {}).update(objs)
+            except APIException:
+                # e.g. an invalid sort, which the view of every object reports on its own
+                continue
+
+    def _prefetch_lists(self, view, view_embeds):
+        # Only lists of the objects themselves (e.g. a node's contributors) are fetched
+        # together, so that results can be told apart by the object they belong to
+        parents = [item for item, _, _, view_kwargs in view_embeds if item._id in view_kwargs.values()]
+        get_batch = getattr(view, 'get_embed_batch_queryset', None)
+        batch = get_batch(parents) if get_batch and len(parents) > 1 else None
+        if batch is None:
+            return
+        queryset, parent_field = batch
+        queryset = view.filter_queryset(queryset)
+        if not queryset.ordered:
+            # As JSONAPIPagination does for embedded lists
+            queryset = queryset.order_by(queryset.model._meta.pk.name)
+        parent_field = queryset.model._meta.get_field(parent_field)
+        parents_by_pk = {parent.pk: parent for parent in parents}
+        lists = {pk: [] for pk in parents_by_pk}
+        for obj in queryset:
+            parent = parents_by_pk[getattr(obj, parent_field.attname)]
+            setattr(obj, parent_field.name, parent)
+            lists[parent.pk].append(obj)
+        for parent in parents:
+            self._prefetched_lists[self._key(parent)] = lists[parent.pk]
+
+    def __call__(self, item):
+        if self._key(item) in self._page:
+            self.prefetch()
+        prefetched_list = self._prefetched_lists.get(self._key(item))
+
+        v, view_args, view_kwargs = self.resolve(item)
+        if not v:
+            return None
+
+        view = self.build_view(item, v, view_args, view_kwargs)
+        request = view.request
+
+        if not hasattr(request._request, '_embed_cache'):
+            request._request._embed_cache = {}
+        cache = request._request._embed_cache
+
+        if not isinstance(view, ListModelMixin):
+            try:
+                item = view.get_object()
+            except Exception as e:
+                with transaction.atomic():
+                    ret = view.handle_exception(e).data
+                return ret
 
-            view_kwargs.update({
-                'request': request,
-                'is_embedded': True,
-            })
+        _cache_key = (v.cls, self.field_name, view.get_serializer_class(), (type(item), item.id))
+        if _cache_key in cache:
+            # We already have the result for this embed, return it
+            return cache[_cache_key]
 
-            # Setup a view ourselves to avoid all the junk DRF throws in
-            # v is a function that hides everything v.cls is the actual view class
-            view = v.cls()
-            view.args = view_args
-            view.kwargs = view_kwargs
-            view.request = request
-            view.request.parser_context['kwargs'] = view_kwargs
-            view.format_kwarg = view.get_format_suffix(**view_kwargs)
+        # Cache serializers. to_representation of a serializer should NOT augment it's fields so resetting the context
+        # should be sufficient for reuse
+        if not view.get_serializer_class() in cache:
+            cache[view.get_serializer_class()] = view.get_serializer_class()(many=isinstance(view, ListModelMixin), context=view.get_serializer_context())
+        ser = cache[view.get_serializer_class()]
 
-            if not isinstance(view, ListModelMixin):
-                try:
-                    item = view.get_object()
-                except Exception as e:
-                    with transaction.atomic():
-                        ret = view.handle_exception(e).data
-                    return ret
-
-            _cache_key = (v.cls, field_name, view.get_serializer_class(), (type(item), item.id))
-            if _cache_key in cache:
-                # We already have the result for this embed, return it
-                return cache[_cache_key]
-
-            # Cache serializers. to_representation of a serializer should NOT augment it's fields so resetting the context
-            # should be sufficient for reuse
-            if not view.get_serializer_class() in cache:
-                cache[view.get_serializer_class()] = view.get_serializer_class()(many=isinstance(view, ListModelMixin), context=view.get_serializer_context())
-            ser = cache[view.get_serializer_class()]
+        try:
+            ser._context = view.get_serializer_context()
 
-            try:
-                ser._context = view.get_serializer_context()
+            if not isinstance(view, ListModelMixin):
+                ret = ser.to_representation(item)
+            else:
+                # Still built, as that is where list views check permissions on their parent
+                queryset = view.filter_queryset(view.get_queryset())
+                if prefetched_list is not None:
+                    queryset = prefetched_list
+                page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
+
+                ret = ser.to_representation(page or queryset)
+
+                if page is not None:
+                    request.parser_context['view'] = view
+                    request.parser_context['kwargs'].pop('request')
+                    view.paginator.request = request
+                    ret = view.paginator.get_paginated_response(ret).data
+        except Exception as e:
+            with transaction.atomic():
+                ret = view.handle_exception(e).data
+
+        # Cache our final result
+        cache[_cache_key] = ret
 
-                if not isinstance(view, ListModelMixin):
-                    ret = ser.to_representation(item)
-                else:
-                    queryset = view.filter_queryset(view.get_queryset())
-                    page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
+        return ret
 
-                    ret = ser.to_representation(page or queryset)
 
-                    if page is not None:
-                        request.parser_context['view'] = view
-                        request.parser_context['kwargs'].pop('request')
-                        view.paginator.request = request
-                        ret = view.paginator.get_paginated_response(ret).data
-            except Exception as e:
-                with transaction.atomic():
-                    ret = view.handle_exception(e).data
+class JSONAPIBaseView(generics.GenericAPIView):
 
-            # Cache our final result
-            cache[_cache_key] = ret
+    def __init__(self, **kwargs):
+        assert getattr(self, 'view_name', None), 'Must specify view_name on view.'
+        assert getattr(self, 'view_category', None), 'Must specify view_category on view.'
+        self.view_fqn = ':'.join([self.view_category, self.view_name])
+        super(JSONAPIBaseView, self).__init__(**kwargs)
 
-            return ret
+    def _get_embed_partial(self, field_name, field):
+        """Create a partial function to fetch the values of an embedded field. A basic
+        example is to include a Node's children in a single response.
 
-        return partial
+        :param str field_name: Name of field of the view's serializer_class to load
+        results for
+        :return EmbedPartial object -> dict:
+        """
+        return EmbedPartial(self, field_name, field)
 
     def get_serializer_context(self):
         """Inject request into the serializer context. Additionally, inject partial functions
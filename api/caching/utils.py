@@ -2,3 +2,8 @@ from django.core.cache import caches
 from django.conf import settings
 
 storage_usage_cache = caches[settings.STORAGE_USAGE_CACHE_NAME]
+wiki_search_text_cache = caches[settings.WIKI_SEARCH_TEXT_CACHE_NAME]
+search_result_cache = caches[settings.SEARCH_RESULT_CACHE_NAME]
+cas_token_cache = caches[settings.CAS_TOKEN_CACHE_NAME]
+session_cache = caches[settings.SESSION_CACHE_NAME]
+page_visit_cache = caches[settings.PAGE_VISIT_CACHE_NAME]
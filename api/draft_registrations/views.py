@@ -177,6 +177,10 @@ class DraftContributorsList(NodeContributorsList, DraftRegistrationMixin):
         draft = self.get_draft()
         return draft.draftregistrationcontributor_set.all().include('user__guids')
 
+    # overrides NodeContributorsList
+    def get_embed_batch_queryset(self, parents):
+        return DraftRegistrationContributor.objects.filter(draft_registration__in=parents).include('user__guids'), 'draft_registration'
+
     # overrides NodeContributorsList
     def get_serializer_class(self):
         if self.request.method in ('PUT', 'PATCH', 'DELETE'):
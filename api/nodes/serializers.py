@@ -1,4 +1,3 @@
-from django.db import connection
 from distutils.version import StrictVersion
 
 from api.base.exceptions import (
@@ -22,6 +21,11 @@ from api.base.utils import (
     get_user_auth, is_truthy,
 )
 from api.base.versioning import get_kebab_snake_case_field
+from api.nodes.utils import (
+    count_contributors, count_draft_registrations, count_forks, count_linked_by_nodes,
+    count_linked_by_registrations, count_logs, count_node_links, count_unread_comments,
+    count_visible_children, count_visible_node_links, count_wiki_pages,
+)
 from api.taxonomies.serializers import TaxonomizableSerializerMixin
 from django.apps import apps
 from django.conf import settings
@@ -35,7 +39,7 @@ from addons.base.exceptions import InvalidAuthError, InvalidFolderError
 from addons.osfstorage.models import Region
 from osf.exceptions import NodeStateError
 from osf.models import (
-    Comment, DraftRegistration, ExternalAccount, Institution,
+    DraftRegistration, ExternalAccount, Institution,
     RegistrationSchema, AbstractNode, PrivateLink, Preprint,
     RegistrationProvider, OSFGroup, NodeLicense,
 )
@@ -570,7 +574,8 @@ class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
             user_perms = obj.get_permissions(user)[::-1]
 
         user_perms = user_perms or default_perm
-        if not user_perms and user in obj.parent_admin_users:
+        # Top-level nodes have no parent admins; parent_id is annotated on optimized querysets
+        if not user_perms and obj.parent_id and user in obj.parent_admin_users:
             user_perms = [osf_permissions.READ]
         return user_perms
 
@@ -626,7 +631,7 @@ class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
     # TODO: See if we can get the count filters into the filter rather than the serializer.
 
     def get_logs_count(self, obj):
-        return obj.logs.count()
+        return self.get_related_count('logs', obj, count_logs)
 
     def get_node_count(self, obj):
         """
@@ -634,60 +639,10 @@ class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
         Implict admin and group membership are factored in when determining perms.
         """
         auth = get_user_auth(self.context['request'])
-        user_id = getattr(auth.user, 'id', None)
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                WITH RECURSIVE parents AS (
-                  SELECT parent_id, child_id
-                  FROM osf_noderelation
-                  WHERE child_id = %s AND is_node_link IS FALSE
-                UNION ALL
-                  SELECT osf_noderelation.parent_id, parents.parent_id AS child_id
-                  FROM parents JOIN osf_noderelation ON parents.PARENT_ID = osf_noderelation.child_id
-                  WHERE osf_noderelation.is_node_link IS FALSE
-                ), has_admin AS (SELECT EXISTS(
-                    SELECT P.codename
-                    FROM auth_permission AS P
-                    INNER JOIN osf_nodegroupobjectpermission AS G ON (P.id = G.permission_id)
-                    INNER JOIN osf_osfuser_groups AS UG ON (G.group_id = UG.group_id)
-                    WHERE (P.codename = 'admin_node'
-                           AND (G.content_object_id IN (
-                                SELECT parent_id
-                                FROM parents
-                           ) OR G.content_object_id = %s)
-                           AND UG.osfuser_id = %s)
-                ))
-                SELECT COUNT(DISTINCT child_id)
-                FROM
-                  osf_noderelation
-                JOIN osf_abstractnode ON osf_noderelation.child_id = osf_abstractnode.id
-                LEFT JOIN osf_privatelink_nodes ON osf_abstractnode.id = osf_privatelink_nodes.abstractnode_id
-                LEFT JOIN osf_privatelink ON osf_privatelink_nodes.privatelink_id = osf_privatelink.id
-                WHERE parent_id = %s AND is_node_link IS FALSE
-                AND osf_abstractnode.is_deleted IS FALSE
-                AND (
-                  osf_abstractnode.is_public
-                  OR (SELECT exists from has_admin) = TRUE
-                  OR (SELECT EXISTS(
-                      SELECT P.codename
-                      FROM auth_permission AS P
-                      INNER JOIN osf_nodegroupobjectpermission AS G ON (P.id = G.permission_id)
-                      INNER JOIN osf_osfuser_groups AS UG ON (G.group_id = UG.group_id)
-                      WHERE (P.codename = 'read_node'
-                             AND G.content_object_id = osf_abstractnode.id
-                             AND UG.osfuser_id = %s)
-                      )
-                  )
-                  OR (osf_privatelink.key = %s AND osf_privatelink.is_deleted = FALSE)
-                );
-            """, [obj.id, obj.id, user_id, obj.id, user_id, auth.private_key],
-            )
-
-            return int(cursor.fetchone()[0])
+        return self.get_related_count('children', obj, lambda nodes: count_visible_children(nodes, auth))
 
     def get_contrib_count(self, obj):
-        return len(obj.contributors)
+        return self.get_related_count('contributors', obj, count_contributors)
 
     def get_registration_count(self, obj):
         auth = get_user_auth(self.context['request'])
@@ -697,36 +652,34 @@ class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
     def get_draft_registration_count(self, obj):
         auth = get_user_auth(self.context['request'])
         if obj.has_permission(auth.user, osf_permissions.ADMIN):
-            return obj.draft_registrations_active.count()
+            return self.get_related_count('draft_registrations', obj, count_draft_registrations)
 
     def get_pointers_count(self, obj):
-        return obj.linked_nodes.count()
+        return self.get_related_count('node_links', obj, count_node_links)
 
     def get_wiki_page_count(self, obj):
-        return obj.wikis.filter(deleted__isnull=True).count()
+        return self.get_related_count('wikis', obj, count_wiki_pages)
 
     def get_node_links_count(self, obj):
         auth = get_user_auth(self.context['request'])
-        linked_nodes = obj.linked_nodes.filter(is_deleted=False).exclude(type='osf.collection').exclude(type='osf.registration')
-        return linked_nodes.can_view(auth.user, auth.private_link).count()
+        return self.get_related_count('linked_nodes', obj, lambda nodes: count_visible_node_links(nodes, auth))
 
     def get_registration_links_count(self, obj):
         auth = get_user_auth(self.context['request'])
-        linked_registrations = obj.linked_nodes.filter(is_deleted=False, type='osf.registration').exclude(type='osf.collection')
-        return linked_registrations.can_view(auth.user, auth.private_link).count()
+        return self.get_related_count('linked_registrations', obj, lambda nodes: count_visible_node_links(nodes, auth, registrations=True))
 
     def get_linked_by_nodes_count(self, obj):
-        return obj._parents.filter(is_node_link=True, parent__is_deleted=False, parent__type='osf.node').count()
+        return self.get_related_count('linked_by_nodes', obj, count_linked_by_nodes)
 
     def get_linked_by_registrations_count(self, obj):
-        return obj._parents.filter(is_node_link=True, parent__type='osf.registration', parent__retraction__isnull=True).count()
+        return self.get_related_count('linked_by_registrations', obj, count_linked_by_registrations)
 
     def get_forks_count(self, obj):
-        return obj.forks.exclude(type='osf.registration').exclude(is_deleted=True).count()
+        return self.get_related_count('forks', obj, count_forks)
 
     def get_unread_comments_count(self, obj):
         user = get_user_auth(self.context['request']).user
-        node_comments = Comment.find_n_unread(user=user, node=obj, page='node')
+        node_comments = self.get_related_count('unread_comments', obj, lambda nodes: count_unread_comments(nodes, user))
 
         return {
             'node': node_comments,
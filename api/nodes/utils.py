@@ -1,21 +1,25 @@
 # -*- coding: utf-8 -*-
+import datetime
 from distutils.version import StrictVersion
-from django.apps import apps
-from django.db.models import Q, OuterRef, Exists, Subquery, CharField, Value, BooleanField
-from django.contrib.auth.models import Permission
+from functools import reduce
+from operator import or_
+
+import pytz
+from django.db import connection
+from django.db.models import Q, OuterRef, Exists, Subquery, CharField, Value, BooleanField, Count
 from django.contrib.contenttypes.models import ContentType
 from rest_framework.exceptions import PermissionDenied, NotFound
 from rest_framework.status import is_server_error
 import requests
 
 from addons.osfstorage.models import OsfStorageFile, OsfStorageFolder, NodeSettings, Region
-from addons.wiki.models import NodeSettings as WikiNodeSettings
-from osf.models import AbstractNode, Preprint, Guid, NodeRelation, Contributor
+from addons.wiki.models import NodeSettings as WikiNodeSettings, WikiPage
+from osf.models import AbstractNode, Comment, Contributor, DraftRegistration, NodeLog, Preprint, Guid, NodeRelation
 from osf.models.node import NodeGroupObjectPermission
-from osf.utils import permissions
+from osf.utils.permissions import READ_NODE
 
 from api.base.exceptions import ServiceUnavailableError
-from api.base.utils import get_object_or_error, waterbutler_api_url_for, get_user_auth, has_admin_scope
+from api.base.utils import get_object_or_error, waterbutler_api_url_for, get_user_auth, has_admin_scope, annotate_user_permissions
 
 def get_file_object(target, path, provider, request):
     # Don't bother going to waterbutler for osfstorage
@@ -81,8 +85,6 @@ class NodeOptimizationMixin(object):
     slow down the request significantly**
     """
     def optimize_node_queryset(self, queryset):
-        OSFUserGroup = apps.get_model('osf', 'osfuser_groups')
-
         auth = get_user_auth(self.request)
         admin_scope = has_admin_scope(self.request)
         abstract_node_contenttype_id = ContentType.objects.get_for_model(AbstractNode).id
@@ -93,21 +95,172 @@ class NodeOptimizationMixin(object):
         region = Region.objects.filter(id=OuterRef('region_id'))
         node_settings = NodeSettings.objects.annotate(region_abbrev=Subquery(region.values('_id')[:1])).filter(owner_id=OuterRef('pk'))
 
-        admin_permission = Permission.objects.get(codename=permissions.ADMIN_NODE)
-        write_permission = Permission.objects.get(codename=permissions.WRITE_NODE)
-        read_permission = Permission.objects.get(codename=permissions.READ_NODE)
-        contrib = Contributor.objects.filter(user=auth.user, node=OuterRef('pk'))
-        user_group = OSFUserGroup.objects.filter(osfuser_id=auth.user.id if auth.user else None, group_id=OuterRef('group_id'))
-        node_group = NodeGroupObjectPermission.objects.annotate(user_group=Subquery(user_group.values_list('group_id')[:1])).filter(user_group__isnull=False, content_object_id=OuterRef('pk'))
         # user_is_contrib means user is a traditional contributor, while has_read/write/admin are permissions the user has either through group membership or contributorship
+        queryset = annotate_user_permissions(queryset, auth.user)
         return queryset.prefetch_related('root').prefetch_related('subjects').annotate(
-            user_is_contrib=Exists(contrib),
-            has_read=Exists(node_group.filter(permission_id=read_permission.id)),
-            has_write=Exists(node_group.filter(permission_id=write_permission.id)),
-            has_admin=Exists(node_group.filter(permission_id=admin_permission.id)),
             has_wiki_addon=Exists(wiki_addon),
             annotated_parent_id=Subquery(parent.values('parent__id')[:1], output_field=CharField()),
             has_viewable_preprints=Exists(preprints),
             has_admin_scope=Value(admin_scope, output_field=BooleanField()),
             region=Subquery(node_settings.values('region_abbrev')[:1]),
         )
+
+
+# Related counts of a page of nodes, each computed with one grouped query. Every function
+# returns {node pk: count}, leaving out nodes with a count of 0.
+
+def _grouped_counts(queryset, group_by, count='id', distinct=False):
+    # order_by() drops default orderings, which would otherwise be added to the GROUP BY
+    rows = queryset.order_by().values(group_by).annotate(count=Count(count, distinct=distinct))
+    return {row[group_by]: row['count'] for row in rows}
+
+
+def count_contributors(nodes):
+    return _grouped_counts(Contributor.objects.filter(node__in=nodes), 'node_id')
+
+
+def count_logs(nodes):
+    return _grouped_counts(NodeLog.objects.filter(node__in=nodes), 'node_id')
+
+
+def count_forks(nodes):
+    forks = AbstractNode.objects.filter(forked_from__in=nodes).exclude(type='osf.registration').exclude(is_deleted=True)
+    return _grouped_counts(forks, 'forked_from_id')
+
+
+def count_wiki_pages(nodes):
+    return _grouped_counts(WikiPage.objects.filter(node__in=nodes, deleted__isnull=True), 'node_id')
+
+
+def count_node_links(nodes):
+    links = NodeRelation.objects.filter(parent__in=nodes, is_node_link=True)
+    return _grouped_counts(links, 'parent_id', count='child_id', distinct=True)
+
+
+def count_visible_node_links(nodes, auth, registrations=False):
+    """Number of linked nodes (or linked registrations) of each node that are visible to ``auth``."""
+    links = NodeRelation.objects.filter(parent__in=nodes, is_node_link=True)
+    linked = AbstractNode.objects.filter(id__in=links.values('child_id'), is_deleted=False).exclude(type='osf.collection')
+    if registrations:
+        linked = linked.filter(type='osf.registration')
+    else:
+        linked = linked.exclude(type='osf.registration')
+    visible = linked.can_view(auth.user, auth.private_link)
+    return _grouped_counts(links.filter(child__in=visible.values('id')), 'parent_id', count='child_id', distinct=True)
+
+
+def count_draft_registrations(nodes):
+    drafts = DraftRegistration.objects.filter(
+        Q(branched_from__in=nodes) &
+        Q(deleted__isnull=True) &
+        (Q(registered_node=None) | Q(registered_node__is_deleted=True)),
+    )
+    return _grouped_counts(drafts, 'branched_from_id')
+
+
+def count_linked_by_nodes(nodes):
+    links = NodeRelation.objects.filter(child__in=nodes, is_node_link=True, parent__is_deleted=False, parent__type='osf.node')
+    return _grouped_counts(links, 'child_id')
+
+
+def count_linked_by_registrations(nodes):
+    links = NodeRelation.objects.filter(child__in=nodes, is_node_link=True, parent__type='osf.registration', parent__retraction__isnull=True)
+    return _grouped_counts(links, 'child_id')
+
+
+def count_comments(nodes):
+    return _grouped_counts(Comment.objects.filter(node__in=nodes, page=Comment.OVERVIEW, is_deleted=False), 'node_id')
+
+
+def count_unread_comments(nodes, user):
+    """Number of comments on the overview page of each node that ``user`` has not seen yet,
+    like ``Comment.find_n_unread`` (only for nodes the user contributes to).
+    """
+    if not user:
+        return {}
+    # Like is_contributor_or_group_member, for every node at once
+    member_of = set(NodeGroupObjectPermission.objects.filter(
+        permission__codename=READ_NODE,
+        content_object_id__in=[node.pk for node in nodes],
+        group__user=user,
+    ).values_list('content_object_id', flat=True))
+    view_timestamps = user.comments_viewed_timestamp
+    default_timestamp = datetime.datetime(1970, 1, 1, 12, 0, 0, tzinfo=pytz.utc)
+    unread = []
+    for node in nodes:
+        if node.pk not in member_of:
+            continue
+        view_timestamp = view_timestamps.get(node._id, default_timestamp)
+        if not view_timestamp.tzinfo:
+            view_timestamp = view_timestamp.replace(tzinfo=pytz.utc)
+        unread.append(
+            Q(node_id=node.pk, root_target___id=node._id) &
+            (Q(created__gt=view_timestamp) | Q(modified__gt=view_timestamp)),
+        )
+    if not unread:
+        return {}
+    comments = Comment.objects.filter(reduce(or_, unread)).exclude(user=user).filter(is_deleted=False)
+    return _grouped_counts(comments, 'node_id')
+
+
+def count_visible_children(nodes, auth):
+    """Number of direct children of each node that are visible to ``auth``: public children,
+    children the user can read, children of nodes the user administers (directly or through an
+    ancestor), and children shared with the private link of ``auth``.
+    """
+    node_ids = [node.pk for node in nodes]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH RECURSIVE ancestors AS (
+              SELECT child_id AS node_id, parent_id
+              FROM osf_noderelation
+              WHERE child_id = ANY(%(node_ids)s) AND is_node_link IS FALSE
+            UNION ALL
+              SELECT ancestors.node_id, osf_noderelation.parent_id
+              FROM ancestors JOIN osf_noderelation ON ancestors.parent_id = osf_noderelation.child_id
+              WHERE osf_noderelation.is_node_link IS FALSE
+            ), admin_nodes AS (
+                SELECT G.content_object_id
+                FROM auth_permission AS P
+                INNER JOIN osf_nodegroupobjectpermission AS G ON (P.id = G.permission_id)
+                INNER JOIN osf_osfuser_groups AS UG ON (G.group_id = UG.group_id)
+                WHERE P.codename = 'admin_node' AND UG.osfuser_id = %(user_id)s
+            ), admin_parents AS (
+                SELECT node_id FROM unnest(%(node_ids)s) AS node_id
+                WHERE node_id IN (SELECT content_object_id FROM admin_nodes)
+              UNION
+                SELECT node_id FROM ancestors
+                WHERE parent_id IN (SELECT content_object_id FROM admin_nodes)
+            )
+            SELECT parent_id, COUNT(DISTINCT child_id)
+            FROM
+              osf_noderelation
+            JOIN osf_abstractnode ON osf_noderelation.child_id = osf_abstractnode.id
+            LEFT JOIN osf_privatelink_nodes ON osf_abstractnode.id = osf_privatelink_nodes.abstractnode_id
+            LEFT JOIN osf_privatelink ON osf_privatelink_nodes.privatelink_id = osf_privatelink.id
+            WHERE parent_id = ANY(%(node_ids)s) AND is_node_link IS FALSE
+            AND osf_abstractnode.is_deleted IS FALSE
+            AND (
+              osf_abstractnode.is_public
+              OR parent_id IN (SELECT node_id FROM admin_parents)
+              OR (SELECT EXISTS(
+                  SELECT P.codename
+                  FROM auth_permission AS P
+                  INNER JOIN osf_nodegroupobjectpermission AS G ON (P.id = G.permission_id)
+                  INNER JOIN osf_osfuser_groups AS UG ON (G.group_id = UG.group_id)
+                  WHERE (P.codename = 'read_node'
+                         AND G.content_object_id = osf_abstractnode.id
+                         AND UG.osfuser_id = %(user_id)s)
+                  )
+              )
+              OR (osf_privatelink.key = %(private_key)s AND osf_privatelink.is_deleted = FALSE)
+            )
+            GROUP BY parent_id;
+            """, {
+                'node_ids': node_ids,
+                'user_id': getattr(auth.user, 'id', None),
+                'private_key': auth.private_key,
+            },
+        )
+        return dict(cursor.fetchall())
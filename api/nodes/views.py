@@ -43,7 +43,7 @@ from api.base.throttling import (
     FilesBurstRateThrottle,
 )
 from api.base.utils import default_node_list_permission_queryset
-from api.base.utils import get_object_or_error, is_bulk_request, get_user_auth, is_truthy
+from api.base.utils import get_object_or_error, is_bulk_request, get_user_auth, is_truthy, annotate_user_permissions
 from api.base.versioning import DRAFT_REGISTRATION_SERIALIZERS_UPDATE_VERSION
 from api.base.views import JSONAPIBaseView
 from api.base.views import (
@@ -134,7 +134,7 @@ from framework.auth.oauth_scopes import CoreScopes
 from framework.sentry import log_exception
 from osf.features import OSF_GROUPS
 from osf.models import AbstractNode
-from osf.models import (Node, PrivateLink, Institution, Comment, DraftRegistration, Registration, )
+from osf.models import (Node, PrivateLink, Institution, Comment, Contributor, DraftRegistration, Registration, )
 from osf.models import OSFUser
 from osf.models import OSFGroup
 from osf.models import NodeRelation, Guid
@@ -167,6 +167,8 @@ class NodeMixin(object):
         if self.kwargs.get('is_embedded') is True:
             # If this is an embedded request, the node might be cached somewhere
             node = self.request.parents[Node].get(self.kwargs[self.node_lookup_url_kwarg])
+            if node is None:
+                node = self.request.prefetched.get(Node, {}).get(self.kwargs[self.node_lookup_url_kwarg])
 
         node_id = node_id or self.kwargs[self.node_lookup_url_kwarg]
         if node is None:
@@ -184,6 +186,19 @@ class NodeMixin(object):
             self.check_object_permissions(self.request, node)
         return node
 
+    # used by EmbedPartial
+    def get_embed_batch_objects(self, embeds):
+        node_ids = {
+            view_kwargs.get(self.node_lookup_url_kwarg) for item, view_kwargs in embeds
+            # Nodes embedding their own views are already on hand
+            if not (isinstance(item, Node) and item._id == view_kwargs.get(self.node_lookup_url_kwarg))
+        } - {None}
+        if len(node_ids) < 2:
+            return None
+        # Deleted nodes are left to get_node, which raises 410 Gone for them
+        nodes = Node.objects.filter(guids___id__in=node_ids, is_deleted=False).annotate(region=F('addons_osfstorage_node_settings__region___id')).exclude(region=None)
+        return {Node: {node._id: node for node in nodes}}
+
 
 class DraftMixin(object):
 
@@ -427,6 +442,10 @@ class NodeContributorsList(BaseContributorList, bulk_views.BulkUpdateJSONAPIView
     def get_resource(self):
         return self.get_node()
 
+    # used by EmbedPartial
+    def get_embed_batch_queryset(self, parents):
+        return Contributor.objects.filter(node__in=parents).include('user__guids'), 'node'
+
     # overrides ListBulkCreateJSONAPIView, BulkUpdateJSONAPIView, BulkDeleteJSONAPIView
     def get_serializer_class(self):
         """
@@ -2198,7 +2217,7 @@ class NodePreprintsList(JSONAPIBaseView, generics.ListAPIView, NodeMixin, Prepri
         return self.preprints_queryset(node.preprints.all(), auth_user)
 
     def get_queryset(self):
-        return self.get_queryset_from_request()
+        return annotate_user_permissions(self.get_queryset_from_request(), self.request.user)
 
 
 class NodeRequestListCreate(JSONAPIBaseView, generics.ListCreateAPIView, ListFilterMixin, NodeRequestMixin):
@@ -293,6 +293,15 @@ class PreprintSerializer(TaxonomizableSerializerMixin, MetricsSerializerMixin, J
         return 'https://doi.org/{}'.format(obj.article_doi) if obj.article_doi else None
 
     def get_current_user_permissions(self, obj):
+        if hasattr(obj, 'has_admin'):
+            # Annotated by list views, see api.base.utils.annotate_user_permissions
+            if obj.has_admin:
+                return [osf_permissions.ADMIN, osf_permissions.WRITE, osf_permissions.READ]
+            elif obj.has_write:
+                return [osf_permissions.WRITE, osf_permissions.READ]
+            elif obj.has_read:
+                return [osf_permissions.READ]
+            return []
         user = self.context['request'].user
         return obj.get_permissions(user)[::-1]
 
@@ -22,7 +22,7 @@ from api.base.parsers import (
     JSONAPIMultipleRelationshipsParser,
     JSONAPIMultipleRelationshipsParserForRegularJSON,
 )
-from api.base.utils import absolute_reverse, get_user_auth
+from api.base.utils import absolute_reverse, get_user_auth, annotate_user_permissions
 from api.base import permissions as base_permissions
 from api.citations.utils import render_citation
 from api.preprints.serializers import (
@@ -132,7 +132,7 @@ class PreprintList(MetricsViewMixin, JSONAPIBaseView, generics.ListCreateAPIView
 
     # overrides ListAPIView
     def get_queryset(self):
-        return self.get_queryset_from_request()
+        return annotate_user_permissions(self.get_queryset_from_request(), self.request.user)
 
     # overrides MetricsViewMixin
     def get_annotated_queryset_with_metrics(self, queryset, metric_class, metric_name, after):
@@ -357,6 +357,10 @@ class PreprintContributorsList(NodeContributorsList, PreprintMixin):
         preprint = self.get_preprint()
         return preprint.preprintcontributor_set.all().include('user__guids')
 
+    # overrides NodeContributorsList
+    def get_embed_batch_queryset(self, parents):
+        return PreprintContributor.objects.filter(preprint__in=parents).include('user__guids'), 'preprint'
+
     # overrides NodeContributorsList
     def get_serializer_class(self):
         """
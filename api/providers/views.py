@@ -13,7 +13,7 @@ from api.base.filters import PreprintFilterMixin, ListFilterMixin
 from api.base.views import JSONAPIBaseView, DeprecatedView
 from api.base.metrics import MetricsViewMixin
 from api.base.pagination import MaxSizePagination, IncreasedPageSizePagination
-from api.base.utils import get_object_or_error, get_user_auth, is_truthy
+from api.base.utils import get_object_or_error, get_user_auth, is_truthy, annotate_user_permissions
 from api.licenses.views import LicenseList
 from api.collections.permissions import CanSubmitToCollectionOrPublic
 from api.collections.serializers import CollectionSubmissionSerializer, CollectionSubmissionCreateSerializer
@@ -441,7 +441,7 @@ class PreprintProviderPreprintList(JSONAPIBaseView, generics.ListAPIView, Prepri
 
     # overrides ListAPIView
     def get_queryset(self):
-        return self.get_queryset_from_request()
+        return annotate_user_permissions(self.get_queryset_from_request(), self.request.user)
 
     # overrides APIView
     def get_renderer_context(self):
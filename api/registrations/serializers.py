@@ -13,6 +13,7 @@ from api.base.versioning import CREATE_REGISTRATION_FIELD_CHANGE_VERSION
 from website.project.model import NodeUpdateError
 
 from api.files.serializers import OsfStorageFileSerializer
+from api.nodes.utils import count_comments
 from api.nodes.serializers import (
     NodeSerializer,
     NodeStorageProviderSerializer,
@@ -406,7 +407,7 @@ class RegistrationSerializer(NodeSerializer):
         return obj.private_links.filter(is_deleted=False).count()
 
     def get_total_comments_count(self, obj):
-        return obj.comment_set.filter(page='node', is_deleted=False).count()
+        return self.get_related_count('comments', obj, count_comments)
 
     def get_files_count(self, obj):
         return obj.files_count or 0
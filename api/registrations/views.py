@@ -2,7 +2,7 @@ from rest_framework import generics, permissions as drf_permissions
 from rest_framework.exceptions import ValidationError, NotFound, PermissionDenied
 from framework.auth.oauth_scopes import CoreScopes
 
-from osf.models import AbstractNode, Registration, OSFUser, RegistrationProvider
+from osf.models import AbstractNode, Contributor, Registration, OSFUser, RegistrationProvider
 from osf.utils.permissions import WRITE_NODE
 from api.base import permissions as base_permissions
 from api.base import generic_bulk_views as bulk_views
@@ -23,6 +23,7 @@ from api.base.exceptions import Conflict
 from api.base.parsers import JSONAPIRelationshipParser, JSONAPIMultipleRelationshipsParser
 from api.base.parsers import JSONAPIRelationshipParserForRegularJSON, JSONAPIMultipleRelationshipsParserForRegularJSON
 from api.base.utils import (
+    annotate_user_permissions,
     get_user_auth,
     default_node_list_permission_queryset,
     is_bulk_request,
@@ -169,6 +170,7 @@ class RegistrationList(JSONAPIBaseView, generics.ListCreateAPIView, bulk_views.B
         if blacklisted:
             registrations = registrations.exclude(retraction__isnull=False)
 
+        registrations = annotate_user_permissions(registrations, self.request.user)
         return registrations.select_related(
             'root',
             'root__embargo',
@@ -261,6 +263,10 @@ class RegistrationContributorsList(BaseContributorList, RegistrationMixin, UserM
         node = self.get_node(check_object_permissions=False)
         return node.contributor_set.all().include('user__guids')
 
+    # used by EmbedPartial
+    def get_embed_batch_queryset(self, parents):
+        return Contributor.objects.filter(node__in=parents).include('user__guids'), 'node'
+
 
 class RegistrationContributorDetail(BaseContributorDetail, RegistrationMixin, UserMixin):
     """The documentation for this endpoint can be found [here](https://developer.osf.io/#operation/registrations_contributors_read).
@@ -18,6 +18,7 @@ from api.base.parsers import (
 )
 from api.base.serializers import get_meta_type, AddonAccountSerializer
 from api.base.utils import (
+    annotate_user_permissions,
     default_node_list_permission_queryset,
     get_object_or_error,
     get_user_auth,
@@ -425,7 +426,7 @@ class UserPreprints(JSONAPIBaseView, generics.ListAPIView, UserMixin, PreprintFi
         return self.preprints_queryset(default_qs, auth_user, allow_contribs=False)
 
     def get_queryset(self):
-        return self.get_queryset_from_request()
+        return annotate_user_permissions(self.get_queryset_from_request(), self.request.user)
 
 
 class UserInstitutions(JSONAPIBaseView, generics.ListAPIView, UserMixin):
@@ -482,7 +483,8 @@ class UserRegistrations(JSONAPIBaseView, generics.ListAPIView, UserMixin, NodesF
 
     # overrides ListAPIView
     def get_queryset(self):
-        return self.get_queryset_from_request().select_related('node_license').include('contributor__user__guids', 'root__guids', limit_includes=10)
+        queryset = annotate_user_permissions(self.get_queryset_from_request(), self.request.user)
+        return queryset.select_related('node_license').include('contributor__user__guids', 'root__guids', limit_includes=10)
 
 class UserDraftRegistrations(JSONAPIBaseView, generics.ListAPIView, UserMixin):
     permission_classes = (
@@ -9,13 +9,20 @@ from nose.tools import *  # noqa:
 from django.middleware import csrf
 from waffle.testutils import override_switch
 
+from framework import metrics
 from framework.auth import cas
 from website.util import api_v2_url
 from addons.twofactor.tests import _valid_code
 from website.settings import API_DOMAIN, COOKIE_NAME
 
 from tests.base import ApiTestCase
-from osf_tests.factories import AuthUserFactory, ProjectFactory, UserFactory
+from osf_tests.factories import (
+    ApiOAuth2ApplicationFactory,
+    ApiOAuth2PersonalTokenFactory,
+    AuthUserFactory,
+    ProjectFactory,
+    UserFactory,
+)
 
 from api.base.settings import API_BASE, CSRF_COOKIE_NAME
 
@@ -230,6 +237,76 @@ class TestOAuthValidation(ApiTestCase):
         assert_equal(res.status_code, 403, msg=res.json)
 
 
+@pytest.mark.django_db
+class TestOAuthTokenCache:
+
+    @pytest.fixture()
+    def user(self):
+        return UserFactory()
+
+    @pytest.fixture()
+    def url(self):
+        return '/{}users/me/'.format(API_BASE)
+
+    def test_token_validated_once(self, app, mock_cas, user, url):
+        token = mock_cas.issue_token(user, ['osf.full_read'])
+        metrics.reset()
+        for _ in range(3):
+            res = app.get(url, auth=token, auth_type='jwt')
+            assert res.status_code == 200
+            assert res.json['data']['id'] == user._id
+        assert mock_cas.profile_requests == 1
+        assert metrics.get_counter('cas.token_cache.miss') == 1
+        assert metrics.get_counter('cas.token_cache.hit') == 2
+
+    def test_scopes_are_cached(self, app, mock_cas, user):
+        token = mock_cas.issue_token(user, ['osf.users.profile_read'])
+        url = '/{}users/{}/'.format(API_BASE, user._id)
+        assert app.get(url, auth=token, auth_type='jwt').status_code == 200
+        res = app.patch_json_api(url, {
+            'data': {'id': user._id, 'type': 'users', 'attributes': {'family_name': 'Cached'}}
+        }, auth=token, auth_type='jwt', expect_errors=True)
+        assert res.status_code == 403
+        assert mock_cas.profile_requests == 1
+
+    def test_invalid_token_not_cached(self, app, mock_cas, url):
+        for _ in range(2):
+            res = app.get(url, auth='invalid_token', auth_type='jwt', expect_errors=True)
+            assert res.status_code == 401
+        assert mock_cas.profile_requests == 2
+
+    def test_personal_token_deactivation_invalidates_token(self, app, mock_cas, user, url):
+        personal_token = ApiOAuth2PersonalTokenFactory(owner=user)
+        token = mock_cas.issue_token(user, ['osf.full_read'], token=personal_token.token_id)
+        assert app.get(url, auth=token, auth_type='jwt').status_code == 200
+
+        personal_token.deactivate(save=True)
+        res = app.get(url, auth=token, auth_type='jwt', expect_errors=True)
+        assert res.status_code == 401
+        assert mock_cas.profile_requests == 2
+
+    def test_application_deactivation_invalidates_tokens(self, app, mock_cas, user, url):
+        application = ApiOAuth2ApplicationFactory(owner=user)
+        token = mock_cas.issue_token(user, ['osf.full_read'], client_id=application.client_id)
+        other_token = mock_cas.issue_token(user, ['osf.full_read'])
+        assert app.get(url, auth=token, auth_type='jwt').status_code == 200
+        assert app.get(url, auth=other_token, auth_type='jwt').status_code == 200
+
+        application.deactivate(save=True)
+        res = app.get(url, auth=token, auth_type='jwt', expect_errors=True)
+        assert res.status_code == 401
+        # Every cached token is forgotten, valid ones are simply validated again
+        assert app.get(url, auth=other_token, auth_type='jwt').status_code == 200
+        assert mock_cas.profile_requests == 4
+
+    def test_cache_disabled(self, app, mock_cas, user, url):
+        token = mock_cas.issue_token(user, ['osf.full_read'])
+        with mock.patch('framework.auth.cas.settings.CAS_TOKEN_CACHE_TIMEOUT', 0):
+            for _ in range(2):
+                assert app.get(url, auth=token, auth_type='jwt').status_code == 200
+        assert mock_cas.profile_requests == 2
+
+
 @pytest.mark.enable_quickfiles_creation
 class TestOAuthScopedAccess(ApiTestCase):
     """Verify that OAuth2 scopes restrict APIv2 access for a few sample views. These tests cover basic mechanics,
@@ -17,6 +17,7 @@ from tests.base import ApiTestCase
 
 from api.base.filters import ListFilterMixin
 import api.base.filters as filters
+from framework import metrics
 from api.base.exceptions import (
     InvalidFilterError,
     InvalidFilterOperator,
@@ -400,6 +401,16 @@ class TestListFilterMixin(ApiTestCase):
         assert_equal(parsed_field['value'], False)
         assert_equal(parsed_field['op'], 'eq')
 
+    def test_get_filtered_queryset_counts_filtering_in_python(self):
+        metrics.reset()
+        params = {
+            'value': 'foo',
+            'op': 'icontains',
+            'source_field_name': 'string_field'
+        }
+        self.view.get_filtered_queryset('string_field', params, [FakeRecord()])
+        assert_equal(metrics.get_counter('api.filters.in_python.FakeListView.string_field'), 1)
+
 @pytest.mark.django_db
 class TestOSFOrderingFilter(ApiTestCase):
     class query:
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
+from future.moves.urllib.parse import urlparse
 from nose.tools import *  # noqa:
 
+from osf.models import AbstractNode
 from osf_tests import factories
 from tests.base import ApiTestCase
 
@@ -54,3 +56,97 @@ class TestJSONAPIPagination(ApiTestCase):
         assert_not_in('meta', links)
         assert_in('total', meta)
         assert_in('per_page', meta)
+
+
+class TestCursorPagination(ApiTestCase):
+
+    def setUp(self):
+        super(TestCursorPagination, self).setUp()
+        self.user = factories.AuthUserFactory()
+        self.nodes = [factories.ProjectFactory(creator=self.user) for _ in range(11)]
+        self.url = '/{}nodes/?version=2.1&page[size]=4&page[cursor]='.format(settings.API_BASE)
+
+    def get(self, url, **kwargs):
+        parsed = urlparse(url)
+        path = '{}?{}'.format(parsed.path, parsed.query) if parsed.query else parsed.path
+        return self.app.get(path, auth=self.user.auth, **kwargs)
+
+    def test_next_links_visit_every_node_once(self):
+        res = self.get(self.url)
+        assert_equal(res.status_code, 200)
+        assert_equal(res.json['meta']['total'], 11)
+        assert_is_none(res.json['links']['first'])
+        assert_is_none(res.json['links']['prev'])
+        assert_is_none(res.json['links']['last'])
+
+        pages = [[node['id'] for node in res.json['data']]]
+        while res.json['links']['next']:
+            res = self.get(res.json['links']['next'])
+            pages.append([node['id'] for node in res.json['data']])
+        assert_equal([len(page) for page in pages], [4, 4, 3])
+
+        ids = sum(pages, [])
+        expected = sorted(self.nodes, key=lambda node: (node.modified, node.id), reverse=True)
+        assert_equal(ids, [node._id for node in expected])
+
+    def test_prev_link_returns_previous_page(self):
+        first = self.get(self.url)
+        second = self.get(first.json['links']['next'])
+        assert_is_not_none(second.json['links']['first'])
+
+        previous = self.get(second.json['links']['prev'])
+        assert_equal(
+            [node['id'] for node in previous.json['data']],
+            [node['id'] for node in first.json['data']],
+        )
+        assert_is_none(previous.json['links']['prev'])
+        assert_equal(previous.json['links']['next'], first.json['links']['next'])
+
+    def test_total_can_be_skipped_or_estimated(self):
+        res = self.get(self.url + '&page[total]=none')
+        assert_is_none(res.json['meta']['total'])
+
+        res = self.get(self.url + '&page[total]=estimate')
+        assert_is_instance(res.json['meta']['total'], int)
+        assert_true(res.json['meta']['total_is_estimate'])
+
+        res = self.get(self.url + '&page[total]=maybe', expect_errors=True)
+        assert_equal(res.status_code, 400)
+
+    def test_sorting_by_other_fields_is_not_supported(self):
+        res = self.get(self.url + '&sort=title', expect_errors=True)
+        assert_equal(res.status_code, 400)
+        assert_equal(res.json['errors'][0]['source']['parameter'], 'sort')
+
+        res = self.get(self.url + '&sort=created')
+        assert_equal(res.status_code, 200)
+        assert_equal(res.json['data'][0]['id'], self.nodes[0]._id)
+
+    def test_sorting_by_serializer_fields(self):
+        res = self.get(self.url + '&sort=-date_modified')
+        assert_equal(res.status_code, 200)
+        pages = [[node['id'] for node in res.json['data']]]
+        while res.json['links']['next']:
+            res = self.get(res.json['links']['next'])
+            pages.append([node['id'] for node in res.json['data']])
+        expected = AbstractNode.objects.filter(id__in=[node.id for node in self.nodes]).order_by('-last_logged', '-id')
+        assert_equal(sum(pages, []), [node._id for node in expected])
+
+        res = self.get(self.url + '&sort=date_created')
+        assert_equal(res.status_code, 200)
+        assert_equal(res.json['data'][0]['id'], self.nodes[0]._id)
+
+    def test_sorting_by_field_with_null_values(self):
+        AbstractNode.objects.filter(id__in=[node.id for node in self.nodes[:3]]).update(last_logged=None)
+        for sort in ('-date_modified', 'date_modified'):
+            res = self.get(self.url + '&sort=' + sort)
+            ids = [node['id'] for node in res.json['data']]
+            while res.json['links']['next']:
+                res = self.get(res.json['links']['next'])
+                ids.extend(node['id'] for node in res.json['data'])
+            assert_equal(sorted(ids), sorted(node._id for node in self.nodes))
+
+    def test_invalid_cursor(self):
+        res = self.get(self.url + 'notacursor', expect_errors=True)
+        assert_equal(res.status_code, 400)
+        assert_equal(res.json['errors'][0]['source']['parameter'], 'page[cursor]')
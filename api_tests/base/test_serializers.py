@@ -3,6 +3,7 @@ from rest_framework import status as http_status
 import importlib
 import pkgutil
 
+import mock
 import pytest
 from pytz import utc
 from datetime import datetime
@@ -574,6 +575,46 @@ class TestRelationshipField:
         assert_in('/v2/nodes/{}/'.format(node._id), field['related']['href'])
 
 
+@pytest.mark.django_db
+class TestRelationshipFieldUrlTemplates:
+
+    @pytest.fixture(autouse=True)
+    def clear_compiled_views(self):
+        base_serializers._relationship_url_templates.clear()
+        base_serializers._relationship_views.clear()
+
+    @pytest.fixture()
+    def user(self):
+        return factories.AuthUserFactory()
+
+    @pytest.fixture()
+    def project(self, user):
+        return factories.ProjectFactory(creator=user)
+
+    @pytest.fixture()
+    def url(self, user, project):
+        component = factories.NodeFactory(parent=project, creator=user)
+        return '/{}nodes/{}/?version=2.9'.format(API_BASE, component._id)
+
+    def test_templated_links_match_reversed_links(self, app, user, url):
+        templated = app.get(url, auth=user.auth).json['data']['relationships']
+        assert base_serializers._relationship_url_templates
+
+        # A pattern no value matches makes every field call reverse()
+        with mock.patch.object(base_serializers, '_URL_TEMPLATE_SAFE_VALUE', re.compile(r'(?!)')):
+            reversed_links = app.get(url, auth=user.auth).json['data']['relationships']
+        assert templated == reversed_links
+
+    def test_related_views_are_resolved_once(self, app, user, project, url):
+        app.get(url, auth=user.auth)
+        with mock.patch.object(base_serializers, 'resolve', wraps=base_serializers.resolve) as mock_resolve:
+            res = app.get(url, auth=user.auth)
+        assert not mock_resolve.called
+        relationships = res.json['data']['relationships']
+        assert relationships['parent']['data'] == {'id': project._id, 'type': 'nodes'}
+        assert relationships['root']['data'] == {'id': project._id, 'type': 'nodes'}
+
+
 class TestShowIfVersion(ApiTestCase):
 
     def setUp(self):
@@ -119,6 +119,17 @@ class TestRegistrationIdentifierList:
         total = new_res.json['links']['meta']['total']
         assert total == carpid_total
 
+    def test_identifier_filter_by_category_matches_serialized_category(
+            self, app, registration, url_registration_identifiers
+    ):
+        IdentifierFactory(referent=registration, category='legacy_doi')
+        IdentifierFactory(referent=registration, category='doi')
+        IdentifierFactory(referent=registration, category='ark')
+
+        res = app.get('{}?filter[category]=doi'.format(url_registration_identifiers))
+        categories = [identifier['attributes']['category'] for identifier in res.json['data']]
+        assert categories == ['doi', 'doi']
+
     def test_node_identifier_not_returned_from_registration_endpoint(
             self, identifier_node, identifier_registration,
             res_registration_identifiers,
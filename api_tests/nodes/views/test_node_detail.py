@@ -2,6 +2,9 @@
 import mock
 import pytest
 from future.moves.urllib.parse import urlparse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from guardian.shortcuts import get_group_perms
 from nose.tools import *  # noqa:
 
 
@@ -631,6 +634,20 @@ class TestNodeDetail:
         assert res.json['data']['attributes']['current_user_is_contributor_or_group_member'] is False
         assert res.json['data']['attributes']['current_user_is_contributor'] is False
 
+    def test_permission_checks_are_cached_per_request(self, app, user, url_private):
+        with mock.patch('osf.utils.permission_cache.get_group_perms', wraps=get_group_perms) as mock_get_group_perms:
+            with CaptureQueriesContext(connection) as cached:
+                res = app.get(url_private, auth=user.auth)
+        assert res.status_code == 200
+        # The permission class and every serializer field share the one lookup
+        assert mock_get_group_perms.call_count == 1
+
+        with mock.patch('osf.utils.permission_cache.SAFE_METHODS', ()):
+            with CaptureQueriesContext(connection) as uncached:
+                res = app.get(url_private, auth=user.auth)
+        assert res.status_code == 200
+        assert len(cached.captured_queries) < len(uncached.captured_queries)
+
 
 @pytest.mark.django_db
 class NodeCRUDTestCase:
@@ -588,6 +588,19 @@ class TestNodeFilesListFiltering(ApiTestCase):
         assert_equal(res.status_code, 400)
         assert_equal(len(res.json['errors']), 1)
 
+    def test_node_files_osfstorage_are_filterable_by_size(self):
+        api_utils.create_test_file(self.project, self.user, filename='small', size=42)
+        api_utils.create_test_file(self.project, self.user, filename='large', size=1337)
+
+        url = '/{}nodes/{}/files/osfstorage/?filter[size]=42'.format(API_BASE, self.project._id)
+        res = self.app.get(url, auth=self.user.auth)
+        assert_equal(res.status_code, 200)
+        assert_equal([item['attributes']['name'] for item in res.json['data']], ['small'])
+
+        url = '/{}nodes/{}/files/osfstorage/?filter[size]=large'.format(API_BASE, self.project._id)
+        res = self.app.get(url, auth=self.user.auth, expect_errors=True)
+        assert_equal(res.status_code, 400)
+
 
 class TestNodeFilesListPagination(ApiTestCase):
     def setUp(self):
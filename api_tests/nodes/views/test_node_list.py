@@ -1,6 +1,8 @@
 import pytest
 from nose.tools import *  # noqa:
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from api.base.settings.defaults import API_BASE, MAX_PAGE_SIZE
 from api.base.utils import default_node_permission_queryset
@@ -25,6 +27,8 @@ from osf_tests.factories import (
     RegionFactory,
     OSFGroupFactory,
     DraftNodeFactory,
+    ForkFactory,
+    CommentFactory,
 )
 from addons.osfstorage.settings import DEFAULT_REGION_ID
 from rest_framework import exceptions
@@ -323,6 +327,135 @@ class TestNodeList:
         assert res.json['data'][0]['attributes']['current_user_is_contributor'] is False
         assert res.json['data'][0]['attributes']['current_user_is_contributor_or_group_member'] is False
 
+    def test_permission_queries_do_not_grow_with_page_size(self, app, user, private_project, url):
+        def permission_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                res = app.get(url, auth=user.auth)
+            assert res.status_code == 200
+            return len(res.json['data']), len([
+                query for query in ctx.captured_queries if 'osf_nodegroupobjectpermission' in query['sql']
+            ])
+
+        small_page, small_page_queries = permission_queries()
+        for _ in range(4):
+            ProjectFactory(is_public=False, creator=user)
+        large_page, large_page_queries = permission_queries()
+        assert large_page == small_page + 4
+        assert large_page_queries == small_page_queries
+
+    def test_related_counts_queries_do_not_grow_with_page_size(self, app, user, private_project, url):
+        # Every count but registrations, which checks can_view on each registration
+        related_counts = ','.join([
+            'children', 'comments', 'contributors', 'draft_registrations', 'forks', 'linked_by_nodes',
+            'linked_by_registrations', 'linked_nodes', 'linked_registrations', 'logs', 'wikis',
+        ])
+
+        def related_counts_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                res = app.get(url, auth=user.auth)
+            with CaptureQueriesContext(connection) as counts_ctx:
+                counts_res = app.get('{}?related_counts={}'.format(url, related_counts), auth=user.auth)
+            assert len(counts_res.json['data']) == len(res.json['data'])
+            return len(res.json['data']), len(counts_ctx.captured_queries) - len(ctx.captured_queries)
+
+        # Warm up caches (waffle, content types) so both pages are measured alike
+        app.get(url, auth=user.auth)
+        small_page, small_page_queries = related_counts_queries()
+        for _ in range(4):
+            ProjectFactory(is_public=False, creator=user)
+        large_page, large_page_queries = related_counts_queries()
+        assert large_page == small_page + 4
+        assert large_page_queries == small_page_queries
+
+    def test_related_counts_unread_comments(self, app, user, private_project, url):
+        commenter = AuthUserFactory()
+        private_project.add_contributor(commenter, auth=Auth(user), save=True)
+        CommentFactory(node=private_project, user=commenter)
+        seen_project = ProjectFactory(is_public=False, creator=user)
+        seen_project.add_contributor(commenter, auth=Auth(user), save=True)
+        CommentFactory(node=seen_project, user=commenter)
+        user.comments_viewed_timestamp[seen_project._id] = timezone.now()
+        user.save()
+        other_project = ProjectFactory(is_public=True, creator=commenter)
+        CommentFactory(node=other_project, user=commenter)
+
+        res = app.get('{}?related_counts=comments'.format(url), auth=user.auth)
+        unread = {
+            node['id']: node['relationships']['comments']['links']['related']['meta']['unread']['node']
+            for node in res.json['data']
+        }
+        assert unread[private_project._id] == 1
+        assert unread[seen_project._id] == 0
+        assert unread[other_project._id] == 0
+
+    def test_related_counts_match_detail(self, app, user, private_project, url):
+        NodeFactory(parent=private_project, creator=user)
+        NodeFactory(parent=private_project, is_deleted=True)
+        private_project.add_contributor(AuthUserFactory(), auth=Auth(user), save=True)
+        ForkFactory(project=private_project, user=user)
+        private_project.add_node_link(ProjectFactory(creator=user), auth=Auth(user), save=True)
+
+        res = app.get('{}?related_counts=true'.format(url), auth=user.auth)
+        listed = next(node for node in res.json['data'] if node['id'] == private_project._id)
+        detail = app.get('/{}nodes/{}/?related_counts=true'.format(API_BASE, private_project._id), auth=user.auth).json['data']
+
+        def counts(data):
+            return {
+                name: relationship['links']['related']['meta'].get('count')
+                for name, relationship in data['relationships'].items()
+                if 'related' in relationship.get('links', {})
+            }
+        assert counts(listed) == counts(detail)
+        assert counts(listed)['children'] == 1
+        assert counts(listed)['contributors'] == 2
+        assert counts(listed)['forks'] == 1
+        assert counts(listed)['linked_nodes'] == 1
+
+    def test_embedded_contributors_queries_do_not_grow_with_page_size(self, app, user, private_project, url):
+        def contributor_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                res = app.get('{}?embed=contributors'.format(url), auth=user.auth)
+            assert res.status_code == 200
+            return len(res.json['data']), len([
+                query for query in ctx.captured_queries if 'FROM "osf_contributor"' in query['sql']
+            ])
+
+        small_page, small_page_queries = contributor_queries()
+        for _ in range(4):
+            ProjectFactory(is_public=False, creator=user)
+        large_page, large_page_queries = contributor_queries()
+        assert large_page == small_page + 4
+        assert large_page_queries == small_page_queries
+
+    def test_embedded_contributors_match_contributors_list(self, app, user, private_project, url):
+        ProjectFactory(is_public=False, creator=user)
+        private_project.add_contributor(AuthUserFactory(), auth=Auth(user), visible=False, save=True)
+        private_project.add_contributor(AuthUserFactory(), auth=Auth(user), save=True)
+
+        res = app.get('{}?embed=contributors'.format(url), auth=user.auth)
+        for node in res.json['data']:
+            embedded = node['embeds']['contributors']
+            listed = app.get('/{}nodes/{}/contributors/'.format(API_BASE, node['id']), auth=user.auth).json
+            assert [contrib['id'] for contrib in embedded['data']] == [contrib['id'] for contrib in listed['data']]
+            assert embedded['links']['meta'] == listed['links']['meta']
+        embedded = next(node for node in res.json['data'] if node['id'] == private_project._id)['embeds']['contributors']
+        assert embedded['links']['meta']['total'] == 3
+        assert embedded['links']['meta']['total_bibliographic'] == 2
+
+    def test_embedded_deleted_forked_from_is_gone(self, app, user, url):
+        forks = []
+        for _ in range(2):
+            project = ProjectFactory(is_public=False, creator=user)
+            forks.append(ForkFactory(project=project, user=user))
+            project.is_deleted = True
+            project.save()
+
+        res = app.get('{}?embed=forked_from'.format(url), auth=user.auth)
+        assert res.status_code == 200
+        embeds = {node['id']: node['embeds']['forked_from'] for node in res.json['data']}
+        for fork in forks:
+            assert embeds[fork._id]['errors'][0]['detail'] == 'The requested node is no longer available.'
+
 
 @pytest.mark.django_db
 @pytest.mark.enable_quickfiles_creation
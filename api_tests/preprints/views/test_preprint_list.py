@@ -3,6 +3,8 @@ import datetime as dt
 
 from nose.tools import *  # noqa:
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from waffle.testutils import override_switch
 
@@ -235,6 +237,39 @@ class TestPreprintList(ApiTestCase):
         assert_in(self.preprint._id, ids)
         assert_not_in(self.project._id, ids)
 
+    def test_current_user_permissions(self):
+        write_contrib = AuthUserFactory()
+        self.preprint.add_contributor(write_contrib, permissions.WRITE, save=True)
+        other_preprint = PreprintFactory(creator=AuthUserFactory())
+
+        res = self.app.get(self.url, auth=write_contrib.auth)
+        user_permissions = {each['id']: each['attributes']['current_user_permissions'] for each in res.json['data']}
+        assert user_permissions[self.preprint._id] == [permissions.WRITE, permissions.READ]
+        assert user_permissions[other_preprint._id] == []
+
+        res = self.app.get(self.url, auth=self.user.auth)
+        user_permissions = {each['id']: each['attributes']['current_user_permissions'] for each in res.json['data']}
+        assert user_permissions[self.preprint._id] == [permissions.ADMIN, permissions.WRITE, permissions.READ]
+
+        res = self.app.get(self.url)
+        assert all(each['attributes']['current_user_permissions'] == [] for each in res.json['data'])
+
+    def test_permission_queries_do_not_grow_with_page_size(self):
+        def permission_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.app.get(self.url, auth=self.user.auth)
+            assert_equal(res.status_code, 200)
+            return len(res.json['data']), len([
+                query for query in ctx.captured_queries if 'osf_preprintgroupobjectpermission' in query['sql']
+            ])
+
+        small_page, small_page_queries = permission_queries()
+        for _ in range(4):
+            PreprintFactory(creator=self.user)
+        large_page, large_page_queries = permission_queries()
+        assert_equal(large_page, small_page + 4)
+        assert_equal(large_page_queries, small_page_queries)
+
     def test_withdrawn_preprints_list(self):
         pp = PreprintFactory(provider__reviews_workflow='pre-moderation', is_published=False, creator=self.user)
         pp.machine_state = 'pending'
@@ -121,6 +121,21 @@ class TestRegistrationList(ApiTestCase):
         assert_not_in(self.public_project._id, ids)
         assert_not_in(self.project._id, ids)
 
+    def test_current_user_permissions(self):
+        url = '{}?version=2.11'.format(self.url)
+        res = self.app.get(url, auth=self.user.auth)
+        for registration in res.json['data']:
+            assert_equal(
+                registration['attributes']['current_user_permissions'],
+                [permissions.ADMIN, permissions.WRITE, permissions.READ]
+            )
+
+        res = self.app.get(url, auth=self.user_two.auth)
+        assert_equal(res.json['data'][0]['attributes']['current_user_permissions'], [])
+
+        res = self.app.get(self.url, auth=self.user_two.auth)
+        assert_equal(res.json['data'][0]['attributes']['current_user_permissions'], [permissions.READ])
+
 @pytest.mark.enable_quickfiles_creation
 class TestSparseRegistrationList(ApiTestCase):
 
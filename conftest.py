@@ -4,10 +4,13 @@ import os
 import logging
 
 import re
+import json
+import uuid
 import mock
 import responses
 import pytest
 from faker import Factory
+from future.moves.urllib.parse import parse_qs
 from website import settings as website_settings
 
 from framework.celery_tasks import app as celery_app
@@ -56,6 +59,12 @@ def override_settings():
     website_settings.BCRYPT_LOG_ROUNDS = 1
     # Make sure we don't accidentally send any emails
     website_settings.SENDGRID_API_KEY = None
+    # Tests mock CAS with the same token for different users, so don't remember tokens
+    website_settings.CAS_TOKEN_CACHE_TIMEOUT = 0
+    # Tests read download counts from the database right after counting them
+    website_settings.PAGE_COUNTER_FLUSH_INTERVAL = 0
+    # Tests search for documents right after writing them one at a time
+    website_settings.SEARCH_RESULT_CACHE_TIMEOUT = 0
     # Set this here instead of in SILENT_LOGGERS, in case developers
     # call setLevel in local.py
     logging.getLogger('website.mails.mails').setLevel(logging.CRITICAL)
@@ -248,6 +257,57 @@ def mock_pigeon():
                     )
                     yield rsps
 
+class LocalCas(object):
+    """Stands in for the OAuth2 endpoints of CAS that OSF calls: token profile and revocation."""
+
+    def __init__(self):
+        self.tokens = {}
+        self.profile_requests = 0
+
+    def issue_token(self, user, scopes, token=None, client_id=None):
+        token = token or uuid.uuid4().hex
+        self.tokens[token] = {'user': user._id, 'scopes': list(scopes), 'client_id': client_id}
+        return token
+
+    def profile(self, request):
+        self.profile_requests += 1
+        token = request.headers['Authorization'].split()[-1]
+        if token not in self.tokens:
+            return (401, {}, json.dumps({'error': 'invalid_token'}))
+        data = self.tokens[token]
+        return (200, {}, json.dumps({'id': data['user'], 'attributes': {}, 'scope': data['scopes']}))
+
+    def revoke(self, request):
+        payload = parse_qs(request.body)
+        if 'token' in payload:
+            if self.tokens.pop(payload['token'][0], None) is None:
+                return (400, {}, '')
+        else:
+            client_id = payload['client_id'][0]
+            self.tokens = {token: data for token, data in self.tokens.items() if data['client_id'] != client_id}
+        return (204, {}, '')
+
+
+@pytest.fixture
+def mock_cas():
+    """
+    This should be used to validate and revoke bearer tokens without a CAS server, with the
+    token cache enabled.
+    Relevant endpoints:
+    f'{CAS_SERVER_URL}/oauth2/profile'
+    f'{CAS_SERVER_URL}/oauth2/revoke'
+    """
+    from framework.auth import cas
+
+    local_cas = LocalCas()
+    client = cas.get_client()
+    with mock.patch.object(website_settings, 'CAS_TOKEN_CACHE_TIMEOUT', 60):
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            rsps.add_callback(responses.GET, client.get_profile_url(), callback=local_cas.profile)
+            rsps.add_callback(responses.POST, client.get_auth_token_revocation_url(), callback=local_cas.revoke)
+            yield local_cas
+
+
 @pytest.fixture
 def mock_celery():
     """
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Buffered download and view counts.
+
+``PageCounter.update_counter`` does not write to the database. It adds its increments to a
+buffer kept by each process, which sums up the increments of the same counter and day. A
+background thread writes them in one batch once ``PAGE_COUNTER_FLUSH_INTERVAL`` seconds passed
+since the last batch or once ``PAGE_COUNTER_BUFFER_SIZE`` counter days are pending, and the
+remaining counts are written when the process exits. The batch is written on the thread's own
+connection, never inside the transaction of the request that counted, and counts whose batch
+could not be written go back into the buffer. Counts read from the database lag behind by about
+the interval at most (0 writes every increment right away, in the caller, without buffering).
+Counts still buffered when a process is killed without exiting normally (SIGKILL, uWSGI
+harakiri) are lost.
+
+A batch increments the running totals of ``osf_pagecounter`` in place and upserts the per-day
+counts into ``osf_pagecounterdaily``, so no row stays locked for longer than one statement.
+
+Whether a session already downloaded or viewed a page (overall, and on a day) is remembered in
+the cache named ``PAGE_VISIT_CACHE_NAME`` (Redis in production, an in-process cache when
+developing) rather than in the session's data, so counting does not save the session.
+"""
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.apps import apps
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+PAGE_VISITED_KEY = 'page_visited:{}:{}'
+PAGE_VISITED_ON_KEY = 'page_visited_on:{}:{}:{}'
+
+UPSERT_DAILY_SQL = """
+    INSERT INTO {table} (page_counter_id, date, total, "unique")
+    VALUES {values}
+    ON CONFLICT (page_counter_id, date) DO UPDATE
+    SET total = {table}.total + EXCLUDED.total,
+        "unique" = {table}."unique" + EXCLUDED."unique";
+"""
+
+# A PageCounter row, identified by its _id (the cleaned page) like PageCounter.update_counter does
+Counter = namedtuple('Counter', ['page', 'resource_id', 'file_id', 'action', 'version'])
+
+
+def first_visit(session_id, page, date=None):
+    """Return whether this is the first time the session visits the page (on the given day),
+    remembering that it did.
+    """
+    from api.caching.utils import page_visit_cache
+    if date is None:
+        return page_visit_cache.add(PAGE_VISITED_KEY.format(session_id, page), True, settings.OSF_SESSION_TIMEOUT)
+    key = PAGE_VISITED_ON_KEY.format(session_id, date.strftime('%Y/%m/%d'), page)
+    return page_visit_cache.add(key, True, datetime.timedelta(days=1).total_seconds())
+
+
+def write_counts(totals, daily):
+    """Add the summed increments to the database.
+
+    :param dict totals: Counter => [total, unique] to add to the PageCounter
+    :param dict daily: (Counter, date) => [total, unique] to add to its PageCounterDaily
+    """
+    PageCounter = apps.get_model('osf.PageCounter')
+    with transaction.atomic():
+        ids = dict(PageCounter.objects.filter(_id__in=[counter.page for counter in totals]).values_list('_id', 'id'))
+        for counter in totals:
+            if counter.page not in ids:
+                page_counter, _ = PageCounter.objects.get_or_create(
+                    _id=counter.page,
+                    defaults={
+                        'resource_id': counter.resource_id,
+                        'file_id': counter.file_id,
+                        'action': counter.action,
+                        'version': counter.version,
+                    },
+                )
+                ids[counter.page] = page_counter.id
+
+        # Always update rows in the same order, so concurrent batches cannot deadlock
+        for counter, (total, unique) in sorted(totals.items(), key=lambda item: ids[item[0].page]):
+            if total or unique:
+                PageCounter.objects.filter(id=ids[counter.page]).update(
+                    total=F('total') + total,
+                    unique=F('unique') + unique,
+                )
+
+        add_daily_counts(sorted(
+            (ids[counter.page], date, total, unique) for (counter, date), (total, unique) in daily.items()
+        ))
+
+
+def add_daily_counts(rows):
+    """Add (page counter id, date, total, unique) rows to the PageCounterDaily of that day,
+    creating the ones that don't exist yet.
+    """
+    if not rows:
+        return
+    PageCounterDaily = apps.get_model('osf.PageCounterDaily')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_DAILY_SQL.format(
+                table=PageCounterDaily._meta.db_table,
+                values=', '.join(['(%s, %s, %s, %s)'] * len(rows)),
+            ),
+            [value for row in rows for value in row],
+        )
+
+
+class PageCounterBuffer(object):
+    """A thread-safe sum of the increments that were not written to the database yet."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Set to wake the flushing thread up before the interval passed, when the buffer is full
+        self._full = threading.Event()
+        self._last_flush = time.time()
+        # The process the flushing thread was started in, as it does not survive a fork
+        self._flusher_pid = None
+        self._totals = defaultdict(lambda: [0, 0])
+        self._daily = defaultdict(lambda: [0, 0])
+
+    def add(self, counter, date, total, unique, daily_unique):
+        """Count one download or view on the given date. ``total`` and ``unique`` (0 or 1) are
+        added to the counter's running totals, which leave out contributors.
+        """
+        if not settings.PAGE_COUNTER_FLUSH_INTERVAL:
+            write_counts({counter: [total, unique]}, {(counter, date): [1, daily_unique]})
+            return
+        self.merge({counter: [total, unique]}, {(counter, date): [1, daily_unique]})
+        if len(self._daily) >= settings.PAGE_COUNTER_BUFFER_SIZE:
+            self._full.set()
+        self._start_flusher()
+
+    def merge(self, totals, daily):
+        """Add summed increments, as returned by ``take``, to the buffer."""
+        with self._lock:
+            for counter, (total, unique) in totals.items():
+                self._totals[counter][0] += total
+                self._totals[counter][1] += unique
+            for key, (total, unique) in daily.items():
+                self._daily[key][0] += total
+                self._daily[key][1] += unique
+
+    def _start_flusher(self):
+        """Start the thread that writes the counts of this process when it stops counting."""
+        pid = os.getpid()
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._flush_periodically, name='page-counter-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            self._full.wait(max(settings.PAGE_COUNTER_FLUSH_INTERVAL, 1))
+            self._full.clear()
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Write the pending counts if the last batch is older than the flush interval or the
+        buffer is full.
+        """
+        due = (
+            len(self._daily) >= settings.PAGE_COUNTER_BUFFER_SIZE or
+            time.time() - self._last_flush >= settings.PAGE_COUNTER_FLUSH_INTERVAL
+        )
+        if self._daily and due:
+            # The thread's connection may have been idle for long
+            close_old_connections()
+            self.flush()
+
+    def take(self):
+        """Empty the buffer, returning what it held."""
+        with self._lock:
+            totals, daily = self._totals, self._daily
+            self._totals = defaultdict(lambda: [0, 0])
+            self._daily = defaultdict(lambda: [0, 0])
+            self._last_flush = time.time()
+        return totals, daily
+
+    def flush(self):
+        totals, daily = self.take()
+        if not daily:
+            return
+        try:
+            write_counts(totals, daily)
+        except Exception:
+            # Keep the counts for the next batch
+            self.merge(totals, daily)
+            logger.exception('Could not write {} buffered page counts'.format(len(daily)))
+
+
+buffer = PageCounterBuffer()
+atexit.register(buffer.flush)
@@ -1,4 +1,6 @@
+import hashlib
 import logging
+import uuid
 
 import furl
 from django.utils import timezone
@@ -9,6 +11,7 @@ from future.moves.urllib.parse import quote
 from lxml import etree
 import requests
 
+from framework import metrics
 from framework.auth import authenticate, external_first_login_authenticate
 from framework.auth.core import get_user, generate_verification_key
 from framework.flask import redirect
@@ -17,6 +20,9 @@ from website import settings
 
 logger = logging.getLogger(__name__)
 
+CAS_TOKEN_GENERATION_KEY = 'cas_token_generation'
+CAS_TOKEN_KEY = 'cas_token:{generation}:{digest}'
+
 
 class CasError(HTTPError):
     """General CAS-related error."""
@@ -142,6 +148,35 @@ class CasClient(object):
         else:
             self._handle_error(resp)
 
+    def cached_profile(self, access_token):
+        """
+        Same as `profile`, but a token CAS authenticated is trusted for `CAS_TOKEN_CACHE_TIMEOUT`
+        seconds without asking CAS again, unless it is revoked in the meantime.
+
+        :param str access_token: CAS access_token.
+        :rtype: CasResponse
+        :raises: CasError if an unexpected response is returned.
+        """
+        from api.caching.utils import cas_token_cache
+        if not settings.CAS_TOKEN_CACHE_TIMEOUT:
+            return self.profile(access_token)
+
+        key = get_token_cache_key(access_token)
+        cached = cas_token_cache.get(key)
+        if cached is not None:
+            metrics.incr('cas.token_cache.hit')
+            resp = CasResponse(authenticated=True, user=cached['user'], attributes=cached['attributes'])
+            resp.attributes['accessToken'] = access_token
+            return resp
+
+        metrics.incr('cas.token_cache.miss')
+        resp = self.profile(access_token)
+        if resp.authenticated:
+            # Never store the token itself, only its digest in the key
+            attributes = {k: v for k, v in resp.attributes.items() if k != 'accessToken'}
+            cas_token_cache.set(key, {'user': resp.user, 'attributes': attributes}, settings.CAS_TOKEN_CACHE_TIMEOUT)
+        return resp
+
     def _handle_error(self, response, message='Unexpected response from CAS server'):
         """Handle an error response from CAS."""
         raise CasHTTPError(
@@ -187,6 +222,11 @@ class CasClient(object):
 
         resp = requests.post(url, data=payload)
         if resp.status_code == 204:
+            if 'token' in payload:
+                invalidate_cached_token(payload['token'])
+            else:
+                # Which cached tokens belong to an application is only known to CAS
+                invalidate_cached_tokens()
             return True
         else:
             self._handle_error(resp)
@@ -215,6 +255,38 @@ def get_client():
     return CasClient(settings.CAS_SERVER_URL)
 
 
+def get_token_cache_generation():
+    """The current generation of cached tokens. Cached tokens are keyed on it, so that bumping
+    it invalidates all of them at once.
+    """
+    from api.caching.utils import cas_token_cache
+    generation = cas_token_cache.get(CAS_TOKEN_GENERATION_KEY)
+    if generation is None:
+        # A random value rather than a counter, so a lost key can never resurrect revoked tokens
+        cas_token_cache.add(CAS_TOKEN_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cas_token_cache.get(CAS_TOKEN_GENERATION_KEY)
+    return generation
+
+
+def get_token_cache_key(access_token):
+    return CAS_TOKEN_KEY.format(
+        generation=get_token_cache_generation(),
+        digest=hashlib.sha256(access_token.encode('utf-8')).hexdigest(),
+    )
+
+
+def invalidate_cached_token(access_token):
+    """Forget that CAS authenticated ``access_token``, so it is validated again on its next use."""
+    from api.caching.utils import cas_token_cache
+    cas_token_cache.delete(get_token_cache_key(access_token))
+
+
+def invalidate_cached_tokens():
+    """Forget every token CAS authenticated."""
+    from api.caching.utils import cas_token_cache
+    cas_token_cache.set(CAS_TOKEN_GENERATION_KEY, uuid.uuid4().hex, None)
+
+
 def get_login_url(*args, **kwargs):
     """
     Convenience function for getting a login URL for a service.
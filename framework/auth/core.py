@@ -90,7 +90,7 @@ def _get_current_user():
         auth_token = cas.parse_auth_header(header_token)
 
         try:
-            cas_auth_response = client.profile(auth_token)
+            cas_auth_response = client.cached_profile(auth_token)
         except cas.CasHTTPError:
             return None
 
@@ -51,6 +51,10 @@ def get_task_from_queue(name, predicate):
     return False
 
 
+def in_request_context():
+    return context_stack.top is not None or getattr(api_globals, 'request', None) is not None
+
+
 # Wrapper function allows enqueue_task to be
 # mock patched in a single location
 def enqueue_task(signature):
@@ -62,10 +66,7 @@ def _enqueue_task(signature):
     queue to run after request is complete; else run signature immediately.
     :param signature: Celery task signature
     """
-    if (
-        context_stack.top is None and
-        getattr(api_globals, 'request', None) is None
-    ):  # Not in a request context
+    if not in_request_context():
         signature()
     else:
         if signature not in queue():
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Lightweight in-process operational counters and timers.
+
+This is meant for cheap, high-volume instrumentation (cache hit rates, query counts, latencies)
+that would be too expensive to record as individual elasticsearch-metrics documents. Values are
+aggregated per process, and every ``METRICS_LOG_INTERVAL`` seconds (and when the process exits)
+what was recorded since the previous summary is logged at INFO to the ``osf.metrics`` logger,
+which goes to the root handler set up by ``framework.logging`` like every other log line. Each
+summary is one JSON document::
+
+    [osf.metrics]  INFO: {"counters": {"search.result_cache.hit": 12, ...}, "pid": 17,
+    "seconds": 60.2, "timers": {"search.search": {"count": 3, "max": 41.2, "total": 80.5}, ...}}
+
+Counters are the sum of the increments, timers the number, total and maximum of the recorded
+durations in milliseconds, all for that process and window. To chart them, have the log pipeline
+parse the lines of the ``osf.metrics`` logger and sum the values over processes.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from website import settings
+
+metrics_logger = logging.getLogger('osf.metrics')
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timers = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+# What was recorded since the last summary was logged
+_window_start = time.time()
+_window_counters = defaultdict(int)
+_window_timers = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+
+
+def _add_timing(timer, milliseconds):
+    timer['count'] += 1
+    timer['total'] += milliseconds
+    timer['max'] = max(timer['max'], milliseconds)
+
+
+def incr(name, value=1):
+    """Increment the counter ``name`` by ``value``."""
+    with _lock:
+        _counters[name] += value
+        _window_counters[name] += value
+    emit_if_due()
+
+
+def timing(name, milliseconds):
+    """Record that the operation ``name`` took ``milliseconds``."""
+    with _lock:
+        _add_timing(_timers[name], milliseconds)
+        _add_timing(_window_timers[name], milliseconds)
+    emit_if_due()
+
+
+def emit_if_due():
+    """Log the summary of the current window if it is older than ``METRICS_LOG_INTERVAL``."""
+    if settings.METRICS_LOG_INTERVAL and time.time() - _window_start >= settings.METRICS_LOG_INTERVAL:
+        emit()
+
+
+def emit():
+    """Log what was recorded since the previous summary, and start a new window."""
+    global _window_start
+    with _lock:
+        now = time.time()
+        summary = {
+            'pid': os.getpid(),
+            'seconds': round(now - _window_start, 1),
+            'counters': dict(_window_counters),
+            'timers': {name: dict(timer) for name, timer in _window_timers.items()},
+        }
+        _window_start = now
+        _window_counters.clear()
+        _window_timers.clear()
+    if summary['counters'] or summary['timers']:
+        metrics_logger.info(json.dumps(summary, sort_keys=True))
+
+
+def timed(name):
+    """Decorator that records the duration of each call under ``name``."""
+    def wrapper(func):
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing(name, (time.time() - start) * 1000)
+        return wrapped
+    return wrapper
+
+
+def get_counter(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def get_timer(name):
+    with _lock:
+        return dict(_timers[name]) if name in _timers else None
+
+
+def snapshot():
+    """Return a copy of every counter and timer recorded by this process."""
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timers': {name: dict(timer) for name, timer in _timers.items()},
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _window_counters.clear()
+        _window_timers.clear()
+
+
+atexit.register(emit)
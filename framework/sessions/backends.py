@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Where session data is stored.
+
+The session cookie only carries a signed session id. With ``SESSION_BACKEND = 'database'`` the
+data behind it lives in the ``osf_session`` table; with ``'cache'`` it lives in the Django cache
+named ``SESSION_CACHE_NAME`` (Redis in production, an in-process cache when developing) and
+expires on its own after ``OSF_SESSION_TIMEOUT``.
+
+While moving from the table to the cache, ``SESSION_BACKEND_DATABASE_FALLBACK`` loads sessions
+that are not in the cache yet from the table and copies them over, so existing cookies keep
+working. The ``migrate_sessions_to_cache`` management command copies them ahead of time.
+
+Either way, each process can keep the sessions it recently loaded in a small LRU for
+``SESSION_LRU_TIMEOUT`` seconds (off by default). Changes made by this process are applied to it
+immediately; changes made by other processes (e.g. logging out elsewhere) take up to that long to
+be seen.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.apps import apps
+from django.utils import timezone
+
+from framework import metrics
+from website import settings
+
+SESSION_KEY = 'session:{}'
+# When all sessions of a user were last removed. Cached sessions of the user that were not
+# saved since are no longer valid, which saves keeping a list of the sessions of every user.
+SESSION_USER_REVOKED_KEY = 'session_user_revoked:{}'
+# The id of the session of a user that was saved last, like the latest row of osf_session
+SESSION_USER_LATEST_KEY = 'session_user_latest:{}'
+
+
+class SessionLRU(object):
+    """A thread-safe, size-bounded map of session id => (session fields, time loaded)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, session_id):
+        if not settings.SESSION_LRU_TIMEOUT:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            fields, loaded = entry
+            if time.time() - loaded > settings.SESSION_LRU_TIMEOUT:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+        # Callers modify session.data in place, which must not leak into the entry
+        return copy.deepcopy(fields)
+
+    def set(self, session_id, fields):
+        if not settings.SESSION_LRU_TIMEOUT:
+            return
+        fields = copy.deepcopy(fields)
+        with self._lock:
+            self._entries[session_id] = (fields, time.time())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > settings.SESSION_LRU_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for session_id, (fields, _) in list(self._entries.items()):
+                if fields['data'].get('auth_user_id') == user_id:
+                    del self._entries[session_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+lru = SessionLRU()
+
+
+def to_fields(session):
+    return {
+        'id': session.id,
+        '_id': session._id,
+        'data': session.data,
+        'created': session.created,
+        'modified': session.modified,
+    }
+
+
+def from_fields(fields):
+    Session = apps.get_model('osf.Session')
+    session = Session(**fields)
+    if session.id is not None:
+        # A row of osf_session, so saving it must update the row rather than insert another
+        session._state.adding = False
+        session._state.db = 'default'
+    return session
+
+
+class DatabaseSessionStore(object):
+    """Sessions are rows of the ``osf_session`` table."""
+
+    in_database = True
+
+    def load(self, session_id):
+        Session = apps.get_model('osf.Session')
+        try:
+            return Session.objects.get(_id=session_id)
+        except Session.DoesNotExist:
+            return None
+
+    def load_latest_for_user(self, user_id):
+        """The session of the user that was saved last, or None."""
+        Session = apps.get_model('osf.Session')
+        return Session.objects.filter(data__auth_user_id=user_id).order_by('-modified').first()
+
+    def delete(self, session):
+        Session = apps.get_model('osf.Session')
+        Session.objects.filter(id=session.id).delete()
+
+    def delete_for_user(self, user_id):
+        Session = apps.get_model('osf.Session')
+        Session.objects.filter(data__auth_user_id=user_id).delete()
+
+
+class CacheSessionStore(object):
+    """Sessions are entries of the session cache, which expire ``OSF_SESSION_TIMEOUT`` after
+    they were last saved.
+    """
+
+    in_database = False
+
+    def __init__(self, database_fallback=False):
+        self.database_fallback = database_fallback
+        self.database = DatabaseSessionStore()
+
+    @property
+    def cache(self):
+        from api.caching.utils import session_cache
+        return session_cache
+
+    def load(self, session_id):
+        fields = self.cache.get(SESSION_KEY.format(session_id))
+        if fields is None:
+            if not self.database_fallback:
+                return None
+            session = self.database.load(session_id)
+            if session is None:
+                return None
+            metrics.incr('sessions.database_fallback')
+            fields = to_fields(session)
+            self.cache.set(SESSION_KEY.format(session_id), fields, settings.OSF_SESSION_TIMEOUT)
+        user_id = fields['data'].get('auth_user_id')
+        if user_id:
+            revoked = self.cache.get(SESSION_USER_REVOKED_KEY.format(user_id))
+            if revoked and fields['modified'] <= revoked:
+                return None
+        return from_fields(fields)
+
+    def load_latest_for_user(self, user_id):
+        """The session of the user that was saved last, or None."""
+        session_id = self.cache.get(SESSION_USER_LATEST_KEY.format(user_id))
+        session = self.load(session_id) if session_id else None
+        if session is not None and session.data.get('auth_user_id') == user_id:
+            return session
+        if self.database_fallback:
+            return self.database.load_latest_for_user(user_id)
+        return None
+
+    def save(self, session):
+        now = timezone.now()
+        if session.created is None:
+            session.created = now
+        session.modified = now
+        self.cache.set(SESSION_KEY.format(session._id), to_fields(session), settings.OSF_SESSION_TIMEOUT)
+        user_id = session.data.get('auth_user_id')
+        if user_id:
+            self.cache.set(SESSION_USER_LATEST_KEY.format(user_id), session._id, settings.OSF_SESSION_TIMEOUT)
+
+    def delete(self, session):
+        self.cache.delete(SESSION_KEY.format(session._id))
+        if self.database_fallback:
+            self.database.delete(session)
+
+    def delete_for_user(self, user_id):
+        self.cache.set(SESSION_USER_REVOKED_KEY.format(user_id), timezone.now(), settings.OSF_SESSION_TIMEOUT)
+        if self.database_fallback:
+            self.database.delete_for_user(user_id)
+
+
+def get_session_store():
+    if settings.SESSION_BACKEND == 'cache':
+        return CacheSessionStore(database_fallback=settings.SESSION_BACKEND_DATABASE_FALLBACK)
+    return DatabaseSessionStore()
+
+
+def load_session(session_id):
+    """Load the session with the given id, or return None if it does not exist (anymore)."""
+    fields = lru.get(session_id)
+    if fields is not None:
+        metrics.incr('sessions.lru.hit')
+        return from_fields(fields)
+    metrics.incr('sessions.lru.miss')
+    session = get_session_store().load(session_id)
+    if session is not None:
+        lru.set(session_id, to_fields(session))
+    return session
+
+
+def delete_session(session):
+    lru.discard(session._id)
+    get_session_store().delete(session)
+
+
+def delete_sessions_for_user(user_id):
+    lru.discard_user(user_id)
+    get_session_store().delete_for_user(user_id)
@@ -1,25 +1,23 @@
 # -*- coding: utf-8 -*-
+from framework.sessions.backends import delete_session, delete_sessions_for_user
 
 
 def remove_sessions_for_user(user):
     """
-    Permanently remove all stored sessions for the user from the DB.
+    Permanently remove all stored sessions for the user.
 
     :param user: User
     :return:
     """
-    from osf.models import Session
-
     if user._id:
-        Session.objects.filter(data__auth_user_id=user._id).delete()
+        delete_sessions_for_user(user._id)
 
 
 def remove_session(session):
     """
-    Remove a session from database
+    Remove a session from the session backend
 
     :param session: Session
     :return:
     """
-    from osf.models import Session
-    Session.objects.filter(id=session.id).delete()
+    delete_session(session)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Measure how long copying a large OSF Storage folder to another project takes.
+
+    python manage.py benchmark_copy_files --files 100000 --per-folder 100
+
+Creates a project with a folder holding the given number of files (each with one version), spread
+over subfolders of ``--per-folder`` files each, copies the folder to a second project with
+``website.files.utils.copy_files`` and reports the time and the number of statements the copy
+took. With ``--one-at-a-time``, the folder is also copied the way it was before folders were
+copied with set-based statements, one file or folder at a time, for comparison. Everything the
+benchmark creates is rolled back when it finishes.
+"""
+from __future__ import division
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from addons.osfstorage.models import OsfStorageFile, OsfStorageFolder
+from osf.models import BaseFileVersionsThrough, FileVersion
+from osf_tests.factories import ProjectFactory
+from website.files.utils import copy_files
+
+logger = logging.getLogger(__name__)
+
+
+def create_tree(project, n_files, per_folder):
+    """Create a folder with ``n_files`` files below the project's root folder, in bulk."""
+    root = project.get_addon('osfstorage').get_root()
+    folder = root.append_folder('Benchmark')
+    region = project.osfstorage_region
+    fields = {
+        'provider': 'osfstorage',
+        'target_content_type_id': folder.target_content_type_id,
+        'target_object_id': folder.target_object_id,
+    }
+    subfolders = OsfStorageFolder.objects.bulk_create([
+        OsfStorageFolder(
+            name='folder {}'.format(i),
+            parent=folder,
+            _materialized_path='/Benchmark/folder {}/'.format(i),
+            **fields
+        )
+        for i in range(0, n_files, per_folder)
+    ])
+    files = OsfStorageFile.objects.bulk_create([
+        OsfStorageFile(
+            name='file {}'.format(i),
+            parent=subfolders[i // per_folder],
+            _materialized_path='{}file {}'.format(subfolders[i // per_folder]._materialized_path, i),
+            **fields
+        )
+        for i in range(n_files)
+    ])
+    versions = FileVersion.objects.bulk_create([
+        FileVersion(identifier='1', location={'object': 'benchmark'}, metadata={}, region=region)
+        for _ in files
+    ])
+    BaseFileVersionsThrough.objects.bulk_create([
+        BaseFileVersionsThrough(basefilenode=file, fileversion=version, version_name=file.name)
+        for file, version in zip(files, versions)
+    ])
+    return folder
+
+
+def copy_one_at_a_time(src, target, parent):
+    """Copy ``src`` below ``parent`` the way folders were copied before, one node at a time."""
+    if src.is_file:
+        return copy_files(src, target, parent=parent)
+    cloned = src.clone()
+    cloned.parent = parent
+    cloned.target = target
+    cloned.copied_from = src
+    cloned.save()
+    for child in src.children:
+        copy_one_at_a_time(child, target, cloned)
+    return cloned
+
+
+def measure(copy, *args):
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.time()
+        copy(*args)
+        seconds = time.time() - start
+    return seconds, len(ctx.captured_queries)
+
+
+def benchmark(n_files, per_folder, one_at_a_time):
+    src = create_tree(ProjectFactory(), n_files, per_folder)
+    results = {}
+    destination = ProjectFactory()
+    results['set-based'] = measure(copy_files, src, destination, destination.get_addon('osfstorage').get_root())
+    if one_at_a_time:
+        destination = ProjectFactory()
+        results['one at a time'] = measure(copy_one_at_a_time, src, destination, destination.get_addon('osfstorage').get_root())
+    return results
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark copying a large OSF Storage folder to another project'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--files',
+            type=int,
+            default=100000,
+            help='Number of files in the copied folder',
+        )
+        parser.add_argument(
+            '--per-folder',
+            type=int,
+            default=100,
+            help='Number of files in each subfolder of the copied folder',
+        )
+        parser.add_argument(
+            '--one-at-a-time',
+            action='store_true',
+            dest='one_at_a_time',
+            help='Also copy the folder one file or folder at a time, for comparison',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                results = benchmark(options['files'], options['per_folder'], options['one_at_a_time'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        for name, (seconds, queries) in results.items():
+            logger.info('{}: copied {} files in {:.2f}s ({:.0f} files/s) with {} statements'.format(
+                name,
+                options['files'],
+                seconds,
+                options['files'] / seconds if seconds else 0,
+                queries,
+            ))
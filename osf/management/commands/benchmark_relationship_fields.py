@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Measure how much of serializing a page of nodes is spent rendering relationship fields.
+
+    python manage.py benchmark_relationship_fields --nodes 100 --repeat 5
+
+Creates a user with the given number of public projects, requests their nodes list
+(``/v2/users/<id>/nodes/``) as a single page, and reports the time of each request next to the
+time spent in ``RelationshipField.to_representation``. The first request is reported separately,
+because it compiles the URL templates and resolves the related views of every relationship
+field. Everything the benchmark creates is rolled back when it finishes.
+"""
+from __future__ import division
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from api.base import serializers as base_serializers
+from api.users.views import UserNodes
+from osf_tests.factories import ProjectFactory, UserFactory
+
+logger = logging.getLogger(__name__)
+
+
+class RelationshipTimer(object):
+    """Wraps RelationshipField.to_representation, timing only the outermost call of nested
+    (subclass to superclass) calls.
+    """
+
+    def __init__(self, to_representation):
+        self.seconds = 0.0
+        self.calls = 0
+        self._depth = 0
+        self._to_representation = to_representation
+
+    def __call__(self, field, value):
+        self._depth += 1
+        start = time.time()
+        try:
+            return self._to_representation(field, value)
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                self.seconds += time.time() - start
+                self.calls += 1
+
+
+def request_page(user, page_size):
+    request = RequestFactory().get(
+        '/v2/users/{}/nodes/'.format(user._id),
+        {'page[size]': page_size},
+        HTTP_HOST='api.osf.io',
+    )
+    response = UserNodes.as_view()(request, version='v2', user_id=user._id)
+    response.render()
+    assert response.status_code == 200, response.content
+    return response
+
+
+def benchmark(n_nodes, repeat):
+    user = UserFactory()
+    for _ in range(n_nodes):
+        ProjectFactory(creator=user, is_public=True)
+
+    base_serializers._relationship_url_templates.clear()
+    base_serializers._relationship_views.clear()
+    results = []
+    to_representation = base_serializers.RelationshipField.to_representation
+    try:
+        for _ in range(repeat + 1):
+            timer = RelationshipTimer(to_representation)
+            base_serializers.RelationshipField.to_representation = lambda field, value: timer(field, value)
+            start = time.time()
+            request_page(user, n_nodes)
+            results.append({
+                'request_ms': (time.time() - start) * 1000,
+                'relationship_ms': timer.seconds * 1000,
+                'relationships': timer.calls,
+            })
+    finally:
+        base_serializers.RelationshipField.to_representation = to_representation
+    return results
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the rendering of relationship fields on a page of nodes'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--nodes',
+            type=int,
+            default=100,
+            help='Number of nodes on the page (at most the maximum page size, 100)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of requests measured after the first one',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                results = benchmark(options['nodes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        first, warm = results[0], results[1:]
+        logger.info('First request: {request_ms:.1f}ms, {relationship_ms:.1f}ms rendering {relationships} relationships'.format(**first))
+        if warm:
+            request_ms = sum(result['request_ms'] for result in warm) / len(warm)
+            relationship_ms = sum(result['relationship_ms'] for result in warm) / len(warm)
+            relationships = warm[0]['relationships']
+            logger.info('Later requests: mean {:.1f}ms, {:.1f}ms ({:.0%}) rendering {} relationships, {:.1f}us per relationship'.format(
+                request_ms,
+                relationship_ms,
+                relationship_ms / request_ms if request_ms else 0,
+                relationships,
+                relationship_ms * 1000 / relationships if relationships else 0,
+            ))
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Benchmark search indexing against the database, with elasticsearch stubbed out.
+
+    python manage.py benchmark_search_indexing --projects 5 --files 20 --contributors 5 --wikis 3
+
+Builds synthetic public projects with the given number of files, contributors and wiki pages
+(each project is also collected into a collection), then indexes them with ``update_node``,
+``update_file``, ``update_user`` and ``serialize_cgm`` and reports the latency and number of
+SQL queries of each. Requests that would go to elasticsearch are acknowledged by a stub
+client, so only the OSF side of indexing is measured. Everything the benchmark creates is
+rolled back when it finishes.
+"""
+from __future__ import division
+import logging
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from elasticsearch2.serializer import JSONSerializer
+
+from framework import metrics
+from framework.auth import Auth
+from osf_tests.factories import CollectionFactory, CollectionProviderFactory, ProjectFactory, UserFactory
+from addons.wiki.models import WikiPage
+from website.search import elastic_search
+
+logger = logging.getLogger(__name__)
+
+
+class StubIndices(object):
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: {'acknowledged': True}
+
+
+class StubElasticsearch(object):
+    """Acknowledges every write the indexing code makes without talking to a server."""
+
+    def __init__(self):
+        self.serializer = JSONSerializer()
+        self.transport = self
+        self.indices = StubIndices()
+        self.requests = defaultdict(int)
+
+    def index(self, **kwargs):
+        self.requests['index'] += 1
+        return {'created': True}
+
+    def delete(self, **kwargs):
+        self.requests['delete'] += 1
+        return {'found': True}
+
+    def bulk(self, body, **kwargs):
+        # Mirrors elasticsearch2.helpers: an action line, followed by a source line unless deleting
+        self.requests['bulk'] += 1
+        lines = iter(line for line in body.splitlines() if line)
+        items = []
+        for line in lines:
+            op_type, action = self.serializer.loads(line).popitem()
+            if op_type != 'delete':
+                next(lines)
+            action['status'] = 200
+            items.append({op_type: action})
+        return {'took': 0, 'errors': False, 'items': items}
+
+
+class Timings(object):
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.queries = defaultdict(int)
+
+    def measure(self, name, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.time()
+            func(*args, **kwargs)
+            self.timings[name].append((time.time() - start) * 1000)
+        self.queries[name] += len(ctx.captured_queries)
+
+    def report(self):
+        for name, timings in sorted(self.timings.items()):
+            timings = sorted(timings)
+            logger.info('{name}: {calls} calls, mean {mean:.1f}ms, p95 {p95:.1f}ms, max {max:.1f}ms, {queries:.1f} queries/call'.format(
+                name=name,
+                calls=len(timings),
+                mean=sum(timings) / len(timings),
+                p95=timings[int(len(timings) * 0.95)],
+                max=timings[-1],
+                queries=self.queries[name] / len(timings),
+            ))
+
+
+def create_project(creator, n_contributors, n_files, n_wikis, collection):
+    auth = Auth(creator)
+    project = ProjectFactory(creator=creator, is_public=True)
+    for _ in range(n_contributors):
+        project.add_contributor(UserFactory(), auth=auth, save=False)
+    project.save()
+    root = project.get_addon('osfstorage').get_root()
+    for i in range(n_files):
+        root.append_file('file{}.txt'.format(i))
+    for i in range(n_wikis):
+        WikiPage.objects.create_for_node(project, 'page{}'.format(i), '**wiki** content {}'.format(i), auth)
+    collection.collect_object(project, creator)
+    return project
+
+
+def benchmark(n_projects, n_contributors, n_files, n_wikis, repeat):
+    timings = Timings()
+    creator = UserFactory()
+    collection = CollectionFactory(creator=creator, is_public=True, provider=CollectionProviderFactory())
+    projects = [create_project(creator, n_contributors, n_files, n_wikis, collection) for _ in range(n_projects)]
+
+    # Only the indexing below is of interest, not the hooks that ran while building the projects
+    metrics.reset()
+    for _ in range(repeat):
+        for project in projects:
+            timings.measure('update_node', elastic_search.update_node, project, reindex_files=False)
+            for file_ in project.files.all():
+                timings.measure('update_file', elastic_search.update_file, file_)
+            for user in project.contributors:
+                timings.measure('update_user', elastic_search.update_user, user)
+            for cgm in project.guids.first().collectionsubmission_set.all():
+                timings.measure('serialize_cgm', elastic_search.serialize_cgm, cgm)
+    return timings
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark search indexing with elasticsearch stubbed out'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--projects',
+            type=int,
+            default=5,
+            help='Number of projects to build',
+        )
+        parser.add_argument(
+            '--contributors',
+            type=int,
+            default=5,
+            help='Contributors per project, besides the creator',
+        )
+        parser.add_argument(
+            '--files',
+            type=int,
+            default=20,
+            help='Files per project',
+        )
+        parser.add_argument(
+            '--wikis',
+            type=int,
+            default=3,
+            help='Wiki pages per project',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of times every object is indexed',
+        )
+
+    def handle(self, *args, **options):
+        stub = StubElasticsearch()
+        client = elastic_search.CLIENT
+        elastic_search.CLIENT = stub
+        try:
+            with transaction.atomic():
+                timings = benchmark(
+                    options['projects'],
+                    options['contributors'],
+                    options['files'],
+                    options['wikis'],
+                    options['repeat'],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            elastic_search.CLIENT = client
+
+        timings.report()
+        logger.info('Elasticsearch requests: {}'.format(dict(stub.requests)))
+        logger.info('Timings reported by search operations:')
+        for name, timer in sorted(metrics.snapshot()['timers'].items()):
+            logger.info('    {}: {count} calls, {total:.1f}ms total, {max:.1f}ms max'.format(name, **timer))
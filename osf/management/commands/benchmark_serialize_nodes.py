@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Compare the throughput of per-node ``serialize_node`` with batched ``serialize_nodes``.
+
+    python manage.py benchmark_serialize_nodes --limit 2000 --batch-size 500
+
+Both paths serialize the same public, non-deleted nodes; the command reports docs/sec and
+queries/doc for each, and fails loudly if the two produce different documents.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from osf.models import AbstractNode
+from website.search.elastic_search import get_doctype_from_node, serialize_node, serialize_nodes
+
+logger = logging.getLogger(__name__)
+
+
+def benchmark_serialize_nodes(limit=1000, batch_size=500):
+    node_ids = list(
+        AbstractNode.objects.filter(is_public=True, is_deleted=False)
+        .exclude(type='osf.quickfilesnode')
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+    batches = [node_ids[i:i + batch_size] for i in range(0, len(node_ids), batch_size)]
+
+    single_docs = {}
+    with CaptureQueriesContext(connection) as single_queries:
+        start = time.time()
+        for batch in batches:
+            for node in AbstractNode.objects.filter(id__in=batch):
+                single_docs[node.id] = serialize_node(node, get_doctype_from_node(node))
+        single_seconds = time.time() - start
+
+    bulk_docs = {}
+    with CaptureQueriesContext(connection) as bulk_queries:
+        start = time.time()
+        for batch in batches:
+            bulk_docs.update(serialize_nodes(AbstractNode.objects.filter(id__in=batch)))
+        bulk_seconds = time.time() - start
+
+    mismatched = [node_id for node_id, doc in single_docs.items() if bulk_docs.get(node_id) != doc]
+    count = len(node_ids) or 1
+    return {
+        'nodes': len(node_ids),
+        'serialize_node': {
+            'seconds': single_seconds,
+            'docs_per_second': len(node_ids) / single_seconds if single_seconds else None,
+            'queries_per_doc': len(single_queries.captured_queries) / float(count),
+        },
+        'serialize_nodes': {
+            'seconds': bulk_seconds,
+            'docs_per_second': len(node_ids) / bulk_seconds if bulk_seconds else None,
+            'queries_per_doc': len(bulk_queries.captured_queries) / float(count),
+        },
+        'mismatched': mismatched,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-node vs batched search serialization of nodes'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=1000,
+            help='Number of public nodes to serialize',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of nodes serialized per serialize_nodes call',
+        )
+
+    def handle(self, *args, **options):
+        results = benchmark_serialize_nodes(limit=options['limit'], batch_size=options['batch_size'])
+        logger.info('Serialized {} nodes'.format(results['nodes']))
+        for path in ('serialize_node', 'serialize_nodes'):
+            logger.info('{path}: {seconds:.2f}s, {docs_per_second} docs/sec, {queries_per_doc:.1f} queries/doc'.format(path=path, **results[path]))
+        if results['mismatched']:
+            logger.error('Documents differ for node ids: {}'.format(results['mismatched']))
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Verify (and optionally repair) the materialized node read permissions in
+osf_nodeeffectivereadpermission against the permission tables they are derived from.
+
+    python manage.py check_node_read_permissions
+    python manage.py check_node_read_permissions --user abc12 --fix
+    python manage.py check_node_read_permissions --rebuild
+"""
+import logging
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from osf.management.commands.populate_node_read_permissions import populate_read_permissions
+from osf.migrations.sql.node_read_permissions import find_inconsistent_read_permissions
+from osf.models import OSFUser
+
+logger = logging.getLogger(__name__)
+
+
+def find_inconsistencies(user_ids=None):
+    """
+    :param list user_ids: Primary keys of the users to check, or None to check everyone
+    :return list: (user_id, node_id, expected explicit, stored explicit) for every pair that is
+        missing (stored is None), should not be there (expected is None), or has the wrong flag
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(find_inconsistent_read_permissions, {'user_ids': user_ids})
+        return cursor.fetchall()
+
+
+def fix_inconsistencies(inconsistencies):
+    node_ids_by_user = defaultdict(set)
+    for user_id, node_id, _, _ in inconsistencies:
+        node_ids_by_user[user_id].add(node_id)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for user_id, node_ids in node_ids_by_user.items():
+            cursor.execute('SELECT osf_refresh_node_read_permissions(%s, %s)', [[user_id], list(node_ids)])
+    return len(node_ids_by_user)
+
+
+class Command(BaseCommand):
+    help = 'Check the materialized node read permissions for consistency, and fix or rebuild them'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--user',
+            dest='users',
+            action='append',
+            default=None,
+            help='Guid of a user to check (may be repeated); defaults to every user',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Recompute the read permissions that are inconsistent',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every read permission from scratch, in batches, without checking first',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            populate_read_permissions()
+            logger.info('Rebuilt all node read permissions')
+            return
+
+        user_ids = None
+        if options['users']:
+            user_ids = list(OSFUser.objects.filter(guids___id__in=options['users']).values_list('id', flat=True))
+        inconsistencies = find_inconsistencies(user_ids)
+        for user_id, node_id, expected, stored in inconsistencies:
+            logger.warning('User {} on node {}: expected {}, stored {}'.format(user_id, node_id, expected, stored))
+        logger.info('Found {} inconsistent node read permissions'.format(len(inconsistencies)))
+
+        if inconsistencies and options['fix']:
+            users_fixed = fix_inconsistencies(inconsistencies)
+            logger.info('Recomputed node read permissions of {} users'.format(users_fixed))
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Move the per-day counts kept in the ``date`` JSON of osf_pagecounter into
+osf_pagecounterdaily, where PageCounter.update_counter counts them now. The counts of each page
+counter are added to its daily rows and removed from its JSON in the same transaction, so the
+command can be stopped and run again at any time.
+
+    python manage.py migrate_page_counter_dates --dry
+"""
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from framework.analytics.counters import add_daily_counts
+from osf.models import PageCounter
+
+logger = logging.getLogger(__name__)
+
+
+def daily_rows(page_counter):
+    for date_string, counts in page_counter.date.items():
+        date = datetime.datetime.strptime(date_string, '%Y/%m/%d').date()
+        yield page_counter.id, date, counts.get('total', 0), counts.get('unique', 0)
+
+
+def migrate_page_counter_dates(batch_size=1000, dry_run=False):
+    page_counters = PageCounter.objects.exclude(date={}).order_by('id')
+    migrated = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Lock the rows against servers that still update the JSON while deploying
+            batch = list(page_counters.filter(id__gt=last_id).select_for_update()[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            migrated += len(batch)
+            if dry_run:
+                continue
+            add_daily_counts(sorted(row for page_counter in batch for row in daily_rows(page_counter)))
+            PageCounter.objects.filter(id__in=[page_counter.id for page_counter in batch]).update(date={})
+    return migrated
+
+
+class Command(BaseCommand):
+    help = 'Move the per-day counts of page counters from their date JSON into osf_pagecounterdaily'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of page counters to move at a time',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Count the page counters that would be moved without moving them',
+        )
+
+    def handle(self, *args, **options):
+        migrated = migrate_page_counter_dates(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        logger.info('{} the per-day counts of {} page counters'.format(
+            'Would have moved' if options['dry_run'] else 'Moved', migrated))
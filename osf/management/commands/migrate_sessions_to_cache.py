@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Copy the unexpired sessions of the osf_session table into the session cache, before (or
+while) switching SESSION_BACKEND to 'cache'. Sessions that are already cached are left alone.
+
+    python manage.py migrate_sessions_to_cache --dry
+"""
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.caching.utils import session_cache
+from framework.sessions.backends import SESSION_KEY, to_fields
+from osf.models import Session
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_sessions(batch_size=1000, dry_run=False):
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.OSF_SESSION_TIMEOUT)
+    sessions = Session.objects.filter(modified__gt=cutoff).order_by('id')
+    copied = 0
+    last_id = 0
+    while True:
+        batch = list(sessions.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        keys = {SESSION_KEY.format(session._id): session for session in batch}
+        cached = session_cache.get_many(list(keys))
+        missing = {key: to_fields(session) for key, session in keys.items() if key not in cached}
+        if missing and not dry_run:
+            session_cache.set_many(missing, settings.OSF_SESSION_TIMEOUT)
+        copied += len(missing)
+    return copied
+
+
+class Command(BaseCommand):
+    help = 'Copy unexpired sessions from the osf_session table into the session cache'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of sessions to copy at a time',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Count the sessions that would be copied without copying them',
+        )
+
+    def handle(self, *args, **options):
+        copied = migrate_sessions(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        logger.info('{} {} sessions into the session cache'.format(
+            'Would have copied' if options['dry_run'] else 'Copied', copied))
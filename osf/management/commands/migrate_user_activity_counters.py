@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Move the per-action and per-day counts kept in the ``action`` and ``date`` JSON of
+osf_useractivitycounter into osf_useractivitydaily, where UserActivityCounter.increment counts
+them now. The totals are not changed. The counts of each user are added to the daily rows and
+removed from the JSON in the same transaction, so the command can be stopped and run again at
+any time.
+
+    python manage.py migrate_user_activity_counters --dry
+"""
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from osf.models import UserActivityCounter
+from osf.models.analytics import UPSERT_USER_ACTIVITY_DAILY_SQL
+
+logger = logging.getLogger(__name__)
+
+
+def daily_rows(counter):
+    for action, counts in counter.action.items():
+        for date_string, count in counts.get('date', {}).items():
+            date = datetime.datetime.strptime(date_string, '%Y/%m/%d').date()
+            yield counter.id, action, date, count
+
+
+def migrate_user_activity_counters(batch_size=1000, dry_run=False):
+    counters = UserActivityCounter.objects.exclude(action={}, date={}).order_by('id')
+    migrated = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Lock the rows against workers that still update the JSON while deploying
+            batch = list(counters.filter(id__gt=last_id).select_for_update()[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            migrated += len(batch)
+            if dry_run:
+                continue
+            rows = sorted(row for counter in batch for row in daily_rows(counter))
+            if rows:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        UPSERT_USER_ACTIVITY_DAILY_SQL.format(values=', '.join(['(%s, %s, %s, %s)'] * len(rows))),
+                        [value for row in rows for value in row],
+                    )
+            UserActivityCounter.objects.filter(id__in=[counter.id for counter in batch]).update(action={}, date={})
+    return migrated
+
+
+class Command(BaseCommand):
+    help = 'Move the per-action and per-day counts of user activity counters from their JSON into osf_useractivitydaily'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users to move at a time',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Count the users that would be moved without moving them',
+        )
+
+    def handle(self, *args, **options):
+        migrated = migrate_user_activity_counters(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        logger.info('{} the activity counts of {} users'.format(
+            'Would have moved' if options['dry_run'] else 'Moved', migrated))
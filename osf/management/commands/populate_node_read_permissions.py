@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Store the read permissions of every node in osf_nodeeffectivereadpermission, replacing the
+ones already stored. Migration 0239 only installs the triggers that keep the table up to date;
+run this once afterwards, before turning on USE_NODE_READ_PERMISSION_TABLE. Runs in batches of
+nodes, committing after each batch.
+
+    python manage.py populate_node_read_permissions --batch-size 1000 --dry
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from osf.migrations.sql.node_read_permissions import (
+    count_node_read_permissions,
+    next_nodes,
+    refresh_node_read_permissions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def populate_read_permissions(batch_size=1000, dry_run=False):
+    stored = 0
+    last_node = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(next_nodes, [last_node, batch_size])
+            nodes = [row[0] for row in cursor.fetchall()]
+            if not nodes:
+                return stored
+            if dry_run:
+                cursor.execute(count_node_read_permissions, {'node_ids': nodes})
+                batch_stored = cursor.fetchone()[0]
+            else:
+                cursor.execute(refresh_node_read_permissions, {'node_ids': nodes})
+                batch_stored = cursor.rowcount
+        stored += batch_stored
+        last_node = nodes[-1]
+        logger.info('{} {} read permissions on {} nodes (up to id {})'.format(
+            'Would have stored' if dry_run else 'Stored', batch_stored, len(nodes), last_node))
+
+
+class Command(BaseCommand):
+    help = 'Store the read permissions of every node in osf_nodeeffectivereadpermission'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of nodes whose read permissions are stored per transaction',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Count the read permissions that would be stored without storing them',
+        )
+
+    def handle(self, *args, **options):
+        stored = populate_read_permissions(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        logger.info('{} {} node read permissions'.format(
+            'Would have stored' if options['dry_run'] else 'Stored', stored))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Store the materialized path of every OSF Storage file and folder whose stored path is missing
+or out of date, e.g. because it was saved before the column was maintained or by a server that
+did not maintain it yet. Runs in batches of root folders, committing after each batch.
+
+    python manage.py update_osfstorage_materialized_paths --batch-size 1000 --dry
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from osf.migrations.sql.osfstorage_materialized_paths import count_stale_paths, next_roots, update_paths
+
+logger = logging.getLogger(__name__)
+
+
+def update_materialized_paths(batch_size=1000, dry_run=False):
+    updated = 0
+    last_root = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(next_roots, [last_root, batch_size])
+            roots = [row[0] for row in cursor.fetchall()]
+            if not roots:
+                return updated
+            if dry_run:
+                cursor.execute(count_stale_paths, [roots])
+                batch_updated = cursor.fetchone()[0]
+            else:
+                cursor.execute(update_paths, [roots])
+                batch_updated = cursor.rowcount
+        updated += batch_updated
+        last_root = roots[-1]
+        logger.info('{} {} paths below {} root folders (up to id {})'.format(
+            'Would have updated' if dry_run else 'Updated', batch_updated, len(roots), last_root))
+
+
+class Command(BaseCommand):
+    help = 'Store the materialized paths of OSF Storage files and folders that are missing or out of date'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of root folders whose files and folders are updated per transaction',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Count the paths that would be updated without updating them',
+        )
+
+    def handle(self, *args, **options):
+        updated = update_materialized_paths(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        logger.info('{} the materialized paths of {} OSF Storage files and folders'.format(
+            'Would have updated' if options['dry_run'] else 'Updated', updated))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Store the summary of the versions (latest version, number of versions and size) of every OSF
+Storage file whose stored summary is missing or out of date, e.g. because the file was created
+before the columns existed or a version was added by a server that did not maintain them yet.
+Runs in batches of files, committing after each batch.
+
+    python manage.py update_osfstorage_version_summaries --batch-size 10000 --dry
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from osf.migrations.sql.osfstorage_version_summaries import count_stale_summaries, next_files, update_version_summaries
+
+logger = logging.getLogger(__name__)
+
+
+def update_summaries(batch_size=10000, dry_run=False):
+    updated = 0
+    last_file = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(next_files, [last_file, batch_size])
+            files = [row[0] for row in cursor.fetchall()]
+            if not files:
+                return updated
+            if dry_run:
+                cursor.execute(count_stale_summaries, [files])
+                batch_updated = cursor.fetchone()[0]
+            else:
+                cursor.execute(update_version_summaries, [files])
+                batch_updated = cursor.rowcount
+        updated += batch_updated
+        last_file = files[-1]
+        logger.info('{} {} summaries of {} files (up to id {})'.format(
+            'Would have updated' if dry_run else 'Updated', batch_updated, len(files), last_file))
+
+
+class Command(BaseCommand):
+    help = 'Store the version summaries of OSF Storage files that are missing or out of date'
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of files whose summaries are updated per transaction',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Count the summaries that would be updated without updating them',
+        )
+
+    def handle(self, *args, **options):
+        updated = update_summaries(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        logger.info('{} the version summaries of {} OSF Storage files'.format(
+            'Would have updated' if options['dry_run'] else 'Updated', updated))
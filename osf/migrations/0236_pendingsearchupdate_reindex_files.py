@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.28 on 2021-06-23 15:41
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0235_pendingsearchupdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsearchupdate',
+            name='reindex_files',
+            field=models.BooleanField(default=False),
+        ),
+    ]
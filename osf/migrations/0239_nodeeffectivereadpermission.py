@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from osf.migrations.sql.node_read_permissions import (
+    create_read_permissions_function,
+    drop_read_permissions_function,
+    create_read_permissions_triggers,
+    drop_read_permissions_triggers,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0238_create_search_result_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeEffectiveReadPermission',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('explicit', models.BooleanField(default=False)),
+                ('node', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='osf.AbstractNode')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='osf.OSFUser')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='nodeeffectivereadpermission',
+            unique_together=set([('user', 'node')]),
+        ),
+        migrations.RunSQL(create_read_permissions_function, drop_read_permissions_function),
+        # The triggers keep the pairs of nodes whose permissions change from now on up to date;
+        # the other ones are stored by populate_node_read_permissions, which runs in batches
+        migrations.RunSQL(create_read_permissions_triggers, drop_read_permissions_triggers),
+    ]
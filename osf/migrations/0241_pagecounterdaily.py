@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0240_create_cas_token_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageCounterDaily',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('unique', models.PositiveIntegerField(default=0)),
+                ('page_counter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='osf.PageCounter')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='pagecounterdaily',
+            unique_together=set([('page_counter', 'date')]),
+        ),
+    ]
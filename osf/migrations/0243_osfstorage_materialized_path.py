@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from osf.migrations.sql.osfstorage_materialized_paths import (
+    create_materialized_path_index,
+    drop_materialized_path_index,
+)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY cannot be run in a txn
+
+    dependencies = [
+        ('osf', '0242_useractivitydaily'),
+    ]
+
+    operations = [
+        # OSF Storage used to store '' and compute the path on every read. The stored paths are
+        # filled in, in batches, by the update_osfstorage_materialized_paths management command.
+        migrations.RunSQL(create_materialized_path_index, drop_materialized_path_index),
+    ]
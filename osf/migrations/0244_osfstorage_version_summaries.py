@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0243_osfstorage_materialized_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basefilenode',
+            name='_latest_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='osf.FileVersion'),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='_version_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        # The summaries of existing files are stored by update_osfstorage_version_summaries,
+        # which runs in batches; until then, listing a folder looks them up.
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from osf.migrations.sql.node_read_permissions import create_read_permissions_function
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0244_osfstorage_version_summaries'),
+    ]
+
+    operations = [
+        # Serialize refreshes of the same node (CREATE OR REPLACE, so there is nothing to undo)
+        migrations.RunSQL(create_read_permissions_function, migrations.RunSQL.noop),
+    ]
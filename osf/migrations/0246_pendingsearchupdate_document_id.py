@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0245_node_read_permissions_lock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsearchupdate',
+            name='document_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
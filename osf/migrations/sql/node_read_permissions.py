@@ -0,0 +1,257 @@
+# Raw SQL for the materialized user -> node read permissions (osf_nodeeffectivereadpermission),
+# shared by migrations 0239 and 0245 and the populate_node_read_permissions and
+# check_node_read_permissions management commands.
+
+# Every (user, node) pair where the user can read the node, optionally restricted to some users
+# and nodes (NULL means all). Mirrors AbstractNodeQuerySet.can_view: a read permission given to
+# one of the user's groups (contributors and OSF group members) or to the user directly, or
+# admin on a project above the node. `explicit` marks the pairs get_nodes_for_user returns,
+# i.e. a read permission through one of the user's groups.
+create_read_permissions_function = """
+    CREATE OR REPLACE FUNCTION osf_node_read_permissions(user_ids integer[], node_ids integer[])
+    RETURNS TABLE (user_id integer, node_id integer, explicit boolean) AS $$
+        WITH RECURSIVE ancestors (node_id, ancestor_id) AS (
+            SELECT N.id, N.id
+            FROM osf_abstractnode AS N
+            WHERE node_ids IS NULL OR N.id = ANY(node_ids)
+        UNION
+            SELECT A.node_id, R.parent_id
+            FROM ancestors AS A
+            JOIN osf_noderelation AS R ON R.child_id = A.ancestor_id
+            WHERE R.is_node_link IS FALSE
+        ), reads (user_id, node_id, explicit) AS (
+            SELECT UG.osfuser_id, G.content_object_id, TRUE
+            FROM osf_nodegroupobjectpermission AS G
+            JOIN auth_permission AS P ON P.id = G.permission_id AND P.codename = 'read_node'
+            JOIN osf_osfuser_groups AS UG ON UG.group_id = G.group_id
+            WHERE (node_ids IS NULL OR G.content_object_id = ANY(node_ids))
+            AND (user_ids IS NULL OR UG.osfuser_id = ANY(user_ids))
+        UNION ALL
+            SELECT U.user_id, U.content_object_id, FALSE
+            FROM osf_nodeuserobjectpermission AS U
+            JOIN auth_permission AS P ON P.id = U.permission_id AND P.codename = 'read_node'
+            WHERE (node_ids IS NULL OR U.content_object_id = ANY(node_ids))
+            AND (user_ids IS NULL OR U.user_id = ANY(user_ids))
+        UNION ALL
+            SELECT UG.osfuser_id, A.node_id, FALSE
+            FROM ancestors AS A
+            JOIN osf_abstractnode AS N ON N.id = A.ancestor_id AND N.type = 'osf.node'
+            JOIN osf_nodegroupobjectpermission AS G ON G.content_object_id = A.ancestor_id
+            JOIN auth_permission AS P ON P.id = G.permission_id AND P.codename = 'admin_node'
+            JOIN osf_osfuser_groups AS UG ON UG.group_id = G.group_id
+            WHERE user_ids IS NULL OR UG.osfuser_id = ANY(user_ids)
+        )
+        SELECT reads.user_id, reads.node_id, bool_or(reads.explicit)
+        FROM reads
+        GROUP BY reads.user_id, reads.node_id;
+    $$ LANGUAGE sql STABLE;
+
+    CREATE OR REPLACE FUNCTION osf_node_subtree(node_ids integer[]) RETURNS integer[] AS $$
+        WITH RECURSIVE subtree (node_id) AS (
+            SELECT unnest(node_ids)
+        UNION
+            SELECT R.child_id
+            FROM subtree AS S
+            JOIN osf_noderelation AS R ON R.parent_id = S.node_id
+            WHERE R.is_node_link IS FALSE
+        )
+        SELECT coalesce(array_agg(subtree.node_id), '{}') FROM subtree;
+    $$ LANGUAGE sql STABLE;
+
+    CREATE OR REPLACE FUNCTION osf_node_ancestors(node_ids integer[]) RETURNS integer[] AS $$
+        WITH RECURSIVE ancestors (node_id) AS (
+            SELECT unnest(node_ids)
+        UNION
+            SELECT R.parent_id
+            FROM ancestors AS A
+            JOIN osf_noderelation AS R ON R.child_id = A.node_id
+            WHERE R.is_node_link IS FALSE
+        )
+        SELECT coalesce(array_agg(ancestors.node_id), '{}') FROM ancestors;
+    $$ LANGUAGE sql STABLE;
+
+    -- Recompute the stored read permissions of the given users on the given nodes. Refreshes of
+    -- the same node are serialized with a lock held until the end of the transaction, so the one
+    -- that runs second sees what the first committed instead of computing from a snapshot that
+    -- misses it. Nodes are locked in id order so concurrent refreshes cannot deadlock.
+    CREATE OR REPLACE FUNCTION osf_refresh_node_read_permissions(user_ids integer[], node_ids integer[])
+    RETURNS void AS $$
+    BEGIN
+        IF cardinality(user_ids) = 0 OR cardinality(node_ids) = 0 THEN
+            RETURN;
+        END IF;
+        PERFORM pg_advisory_xact_lock(hashtext('osf_nodeeffectivereadpermission'), N.node_id)
+        FROM (SELECT DISTINCT unnest(node_ids) AS node_id ORDER BY 1) AS N;
+        DELETE FROM osf_nodeeffectivereadpermission AS E
+        WHERE E.user_id = ANY(user_ids) AND E.node_id = ANY(node_ids);
+        INSERT INTO osf_nodeeffectivereadpermission (user_id, node_id, explicit)
+        SELECT R.user_id, R.node_id, R.explicit
+        FROM osf_node_read_permissions(user_ids, node_ids) AS R
+        ON CONFLICT (user_id, node_id) DO UPDATE SET explicit = EXCLUDED.explicit;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+drop_read_permissions_function = """
+    DROP FUNCTION IF EXISTS osf_refresh_node_read_permissions(integer[], integer[]);
+    DROP FUNCTION IF EXISTS osf_node_ancestors(integer[]);
+    DROP FUNCTION IF EXISTS osf_node_subtree(integer[]);
+    DROP FUNCTION IF EXISTS osf_node_read_permissions(integer[], integer[]);
+"""
+
+# Keep osf_nodeeffectivereadpermission up to date whenever any of its inputs change
+create_read_permissions_triggers = """
+    -- A user joined or left a group: refresh their permissions on the group's nodes and below
+    CREATE OR REPLACE FUNCTION osf_node_read_permissions_user_group_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            PERFORM osf_refresh_node_read_permissions(
+                ARRAY[OLD.osfuser_id],
+                osf_node_subtree(ARRAY(SELECT G.content_object_id FROM osf_nodegroupobjectpermission AS G WHERE G.group_id = OLD.group_id))
+            );
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM osf_refresh_node_read_permissions(
+                ARRAY[NEW.osfuser_id],
+                osf_node_subtree(ARRAY(SELECT G.content_object_id FROM osf_nodegroupobjectpermission AS G WHERE G.group_id = NEW.group_id))
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- A group gained or lost a permission on a node: refresh its members on the node and below
+    CREATE OR REPLACE FUNCTION osf_node_read_permissions_group_perm_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            PERFORM osf_refresh_node_read_permissions(
+                ARRAY(SELECT UG.osfuser_id FROM osf_osfuser_groups AS UG WHERE UG.group_id = OLD.group_id),
+                osf_node_subtree(ARRAY[OLD.content_object_id])
+            );
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM osf_refresh_node_read_permissions(
+                ARRAY(SELECT UG.osfuser_id FROM osf_osfuser_groups AS UG WHERE UG.group_id = NEW.group_id),
+                osf_node_subtree(ARRAY[NEW.content_object_id])
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- A user gained or lost a permission on a node directly
+    CREATE OR REPLACE FUNCTION osf_node_read_permissions_user_perm_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            PERFORM osf_refresh_node_read_permissions(ARRAY[OLD.user_id], ARRAY[OLD.content_object_id]);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM osf_refresh_node_read_permissions(ARRAY[NEW.user_id], ARRAY[NEW.content_object_id]);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- A component was attached or detached: refresh everyone with permissions above it on the
+    -- component and below
+    CREATE OR REPLACE FUNCTION osf_node_read_permissions_node_relation_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.is_node_link IS FALSE THEN
+            PERFORM osf_refresh_node_read_permissions(
+                ARRAY(
+                    SELECT DISTINCT UG.osfuser_id
+                    FROM osf_nodegroupobjectpermission AS G
+                    JOIN osf_osfuser_groups AS UG ON UG.group_id = G.group_id
+                    WHERE G.content_object_id = ANY(osf_node_ancestors(ARRAY[OLD.parent_id]))
+                ),
+                osf_node_subtree(ARRAY[OLD.child_id])
+            );
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_node_link IS FALSE THEN
+            PERFORM osf_refresh_node_read_permissions(
+                ARRAY(
+                    SELECT DISTINCT UG.osfuser_id
+                    FROM osf_nodegroupobjectpermission AS G
+                    JOIN osf_osfuser_groups AS UG ON UG.group_id = G.group_id
+                    WHERE G.content_object_id = ANY(osf_node_ancestors(ARRAY[NEW.parent_id]))
+                ),
+                osf_node_subtree(ARRAY[NEW.child_id])
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER osf_node_read_permissions_user_group
+    AFTER INSERT OR UPDATE OR DELETE ON osf_osfuser_groups
+    FOR EACH ROW EXECUTE PROCEDURE osf_node_read_permissions_user_group_trigger();
+
+    CREATE TRIGGER osf_node_read_permissions_group_perm
+    AFTER INSERT OR UPDATE OR DELETE ON osf_nodegroupobjectpermission
+    FOR EACH ROW EXECUTE PROCEDURE osf_node_read_permissions_group_perm_trigger();
+
+    CREATE TRIGGER osf_node_read_permissions_user_perm
+    AFTER INSERT OR UPDATE OR DELETE ON osf_nodeuserobjectpermission
+    FOR EACH ROW EXECUTE PROCEDURE osf_node_read_permissions_user_perm_trigger();
+
+    CREATE TRIGGER osf_node_read_permissions_node_relation
+    AFTER INSERT OR UPDATE OR DELETE ON osf_noderelation
+    FOR EACH ROW EXECUTE PROCEDURE osf_node_read_permissions_node_relation_trigger();
+"""
+
+drop_read_permissions_triggers = """
+    DROP TRIGGER IF EXISTS osf_node_read_permissions_node_relation ON osf_noderelation;
+    DROP TRIGGER IF EXISTS osf_node_read_permissions_user_perm ON osf_nodeuserobjectpermission;
+    DROP TRIGGER IF EXISTS osf_node_read_permissions_group_perm ON osf_nodegroupobjectpermission;
+    DROP TRIGGER IF EXISTS osf_node_read_permissions_user_group ON osf_osfuser_groups;
+    DROP FUNCTION IF EXISTS osf_node_read_permissions_node_relation_trigger();
+    DROP FUNCTION IF EXISTS osf_node_read_permissions_user_perm_trigger();
+    DROP FUNCTION IF EXISTS osf_node_read_permissions_group_perm_trigger();
+    DROP FUNCTION IF EXISTS osf_node_read_permissions_user_group_trigger();
+"""
+
+# The ids of the next nodes after the id given as the first parameter, as many as the second
+# parameter; the unit of the batches read permissions are populated in
+next_nodes = """
+    SELECT id FROM osf_abstractnode
+    WHERE id > %s
+    ORDER BY id
+    LIMIT %s;
+"""
+
+# Replace the stored read permissions of everyone on the nodes given as an array parameter with
+# freshly computed ones, taking the same per-node locks as osf_refresh_node_read_permissions
+refresh_node_read_permissions = """
+    SELECT pg_advisory_xact_lock(hashtext('osf_nodeeffectivereadpermission'), N.node_id)
+    FROM (SELECT DISTINCT unnest(%(node_ids)s) AS node_id ORDER BY 1) AS N;
+    DELETE FROM osf_nodeeffectivereadpermission AS E
+    WHERE E.node_id = ANY(%(node_ids)s);
+    INSERT INTO osf_nodeeffectivereadpermission (user_id, node_id, explicit)
+    SELECT R.user_id, R.node_id, R.explicit
+    FROM osf_node_read_permissions(NULL, %(node_ids)s) AS R;
+"""
+
+count_node_read_permissions = """
+    SELECT COUNT(*) FROM osf_node_read_permissions(NULL, %(node_ids)s);
+"""
+
+# Pairs that are stored but should not be, are missing, or have the wrong `explicit` flag,
+# optionally restricted to some users (%s is an array of user ids, or NULL for everyone)
+find_inconsistent_read_permissions = """
+    WITH expected AS (
+        SELECT R.user_id, R.node_id, R.explicit
+        FROM osf_node_read_permissions(%(user_ids)s, NULL) AS R
+    ), stored AS (
+        SELECT E.user_id, E.node_id, E.explicit
+        FROM osf_nodeeffectivereadpermission AS E
+        WHERE %(user_ids)s IS NULL OR E.user_id = ANY(%(user_ids)s)
+    )
+    SELECT
+        coalesce(expected.user_id, stored.user_id),
+        coalesce(expected.node_id, stored.node_id),
+        expected.explicit,
+        stored.explicit
+    FROM expected
+    FULL OUTER JOIN stored ON stored.user_id = expected.user_id AND stored.node_id = expected.node_id
+    WHERE expected.user_id IS NULL OR stored.user_id IS NULL OR expected.explicit <> stored.explicit;
+"""
@@ -0,0 +1,84 @@
+# Raw SQL for the materialized paths of OSF Storage files and folders (the _materialized_path
+# column of osf_basefilenode), shared by migration 0243, OsfStorageFileNode, the folder copy of
+# addons.osfstorage.utils and the update_osfstorage_materialized_paths management command.
+
+# The path of every active OSF Storage file and folder below the given ones, built from the stored
+# path of those and the names of the nodes in between. Folders end with a slash; the root folder
+# (which has no name) is '/'. Trashed nodes keep the path they had when they were deleted.
+_subtree_paths = """
+    WITH RECURSIVE subtree (id, path) AS (
+        SELECT T.id, {start}
+        FROM osf_basefilenode AS T
+        WHERE {where}
+    UNION ALL
+        SELECT T.id, S.path || T.name || CASE WHEN T.type = 'osf.osfstoragefile' THEN '' ELSE '/' END
+        FROM subtree AS S
+        JOIN osf_basefilenode AS T ON T.parent_id = S.id
+        WHERE T.type IN ('osf.osfstoragefile', 'osf.osfstoragefolder')
+    )
+"""
+
+# Everything below the folder with the id given as parameter, after its own path changed
+update_descendant_paths = _subtree_paths.format(
+    start='T._materialized_path',
+    where='T.id = %s',
+) + """
+    UPDATE osf_basefilenode AS T
+    SET _materialized_path = S.path
+    FROM subtree AS S
+    WHERE T.id = S.id AND T._materialized_path IS DISTINCT FROM S.path;
+"""
+
+# Every active file and folder below the folder with the id given as parameter, with its path
+# relative to that folder. Walks parent_id, so it does not depend on the stored paths being
+# up to date.
+subtree_nodes = _subtree_paths.format(
+    start="''::text",
+    where='T.id = %s',
+) + """
+    SELECT S.id, T.parent_id, T.type, S.path
+    FROM subtree AS S
+    JOIN osf_basefilenode AS T ON T.id = S.id
+    WHERE S.id <> %s;
+"""
+
+_root_paths = _subtree_paths.format(
+    start="T.name || CASE WHEN T.type = 'osf.osfstoragefile' THEN '' ELSE '/' END",
+    where="T.parent_id IS NULL AND T.type IN ('osf.osfstoragefile', 'osf.osfstoragefolder') AND T.id = ANY(%s)",
+)
+
+# Root folders (files and folders without a parent), the unit of the batches path updates run in
+next_roots = """
+    SELECT T.id
+    FROM osf_basefilenode AS T
+    WHERE T.parent_id IS NULL AND T.type IN ('osf.osfstoragefile', 'osf.osfstoragefolder') AND T.id > %s
+    ORDER BY T.id
+    LIMIT %s;
+"""
+
+# Active OSF Storage nodes below the root folders given as an array parameter whose stored path is
+# missing or out of date
+count_stale_paths = _root_paths + """
+    SELECT COUNT(*)
+    FROM subtree AS S
+    JOIN osf_basefilenode AS T ON T.id = S.id
+    WHERE T._materialized_path IS DISTINCT FROM S.path;
+"""
+
+update_paths = _root_paths + """
+    UPDATE osf_basefilenode AS T
+    SET _materialized_path = S.path
+    FROM subtree AS S
+    WHERE T.id = S.id AND T._materialized_path IS DISTINCT FROM S.path;
+"""
+
+# Subtree queries filter on the path prefix of a target's files, i.e. _materialized_path LIKE '/a/b/%'
+create_materialized_path_index = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS osfstorage_materialized_path_idx
+    ON osf_basefilenode (target_content_type_id, target_object_id, _materialized_path text_pattern_ops)
+    WHERE provider = 'osfstorage';
+"""
+
+drop_materialized_path_index = """
+    DROP INDEX IF EXISTS osfstorage_materialized_path_idx RESTRICT;
+"""
@@ -0,0 +1,49 @@
+# Raw SQL for the summary of the versions of OSF Storage files (the _latest_version_id,
+# _version_count and _size columns of osf_basefilenode), shared by
+# OsfStorageFile.update_version_summary, addons.osfstorage.utils.copy_children,
+# addons.osfstorage.views.osfstorage_get_children and the update_osfstorage_version_summaries
+# management command.
+
+# The latest version of every file with versions matching {where}, by creation date like
+# OsfStorageFile.versions, and how many versions it has
+latest_versions = """
+    SELECT DISTINCT ON (V.basefilenode_id)
+        V.basefilenode_id AS id,
+        V.fileversion_id AS latest_version_id,
+        FV.size,
+        COUNT(*) OVER (PARTITION BY V.basefilenode_id) AS version_count
+    FROM osf_basefileversionsthrough AS V
+    JOIN osf_fileversion AS FV ON FV.id = V.fileversion_id
+    WHERE {where}
+    ORDER BY V.basefilenode_id, FV.created DESC
+"""
+
+# The files with the ids given as an array parameter
+_summaries = 'WITH summary AS (' + latest_versions.format(where='V.basefilenode_id = ANY(%s)') + ')'
+
+update_version_summaries = _summaries + """
+    UPDATE osf_basefilenode AS F
+    SET _latest_version_id = S.latest_version_id, _version_count = S.version_count, _size = S.size
+    FROM summary AS S
+    WHERE F.id = S.id
+    AND F.type = 'osf.osfstoragefile'
+    AND (F._latest_version_id, F._version_count, F._size) IS DISTINCT FROM (S.latest_version_id, S.version_count, S.size);
+"""
+
+count_stale_summaries = _summaries + """
+    SELECT COUNT(*)
+    FROM summary AS S
+    JOIN osf_basefilenode AS F ON F.id = S.id
+    WHERE F.type = 'osf.osfstoragefile'
+    AND (F._latest_version_id, F._version_count, F._size) IS DISTINCT FROM (S.latest_version_id, S.version_count, S.size);
+"""
+
+# The ids of the next OSF Storage files after the id given as the first parameter, as many as the
+# second parameter
+next_files = """
+    SELECT id FROM osf_basefilenode
+    WHERE type = 'osf.osfstoragefile'
+    AND id > %s
+    ORDER BY id
+    LIMIT %s;
+"""
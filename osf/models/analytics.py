@@ -1,11 +1,14 @@
+import datetime
 import logging
+from collections import defaultdict
 
 from dateutil import parser
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.db.models import Sum
 from django.db.models.expressions import RawSQL
 from django.utils import timezone
 
+from framework.analytics import counters
 from framework.sessions import session
 from osf.models.base import BaseModel, Guid
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
@@ -13,7 +16,29 @@ from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 logger = logging.getLogger(__name__)
 
 
+UPSERT_USER_ACTIVITY_TOTALS_SQL = """
+    INSERT INTO osf_useractivitycounter (_id, action, date, total, created, modified)
+    VALUES {values}
+    ON CONFLICT (_id) DO UPDATE
+    SET total = osf_useractivitycounter.total + EXCLUDED.total,
+        modified = EXCLUDED.modified
+    RETURNING _id, id;
+"""
+
+UPSERT_USER_ACTIVITY_DAILY_SQL = """
+    INSERT INTO osf_useractivitydaily (counter_id, action, date, count)
+    VALUES {values}
+    ON CONFLICT (counter_id, action, date) DO UPDATE
+    SET count = osf_useractivitydaily.count + EXCLUDED.count;
+"""
+
+
 class UserActivityCounter(BaseModel):
+    """
+    The number of actions a user logged. Per action and day, the counts are kept as
+    UserActivityDaily rows; the action and date JSON only hold counts from before those existed,
+    until the migrate_user_activity_counters command moves them over.
+    """
     primary_identifier_name = '_id'
 
     _id = models.CharField(max_length=5, null=False, blank=False, db_index=True,
@@ -24,36 +49,57 @@ class UserActivityCounter(BaseModel):
 
     @classmethod
     def get_total_activity_count(cls, user_id):
-        try:
-            return cls.objects.get(_id=user_id).total
-        except cls.DoesNotExist:
-            return 0
+        return cls.objects.filter(_id=user_id).values_list('total', flat=True).first() or 0
 
     @classmethod
     def increment(cls, user_id, action, date_string):
-        date = parser.parse(date_string).strftime('%Y/%m/%d')
-        with transaction.atomic():
-            # select_for_update locks the row but only inside a transaction
-            uac, created = cls.objects.select_for_update().get_or_create(_id=user_id)
-            if uac.total > 0:
-                uac.total += 1
-            else:
-                uac.total = 1
-            if action in uac.action:
-                uac.action[action]['total'] += 1
-                if date in uac.action[action]['date']:
-                    uac.action[action]['date'][date] += 1
-                else:
-                    uac.action[action]['date'][date] = 1
-            else:
-                uac.action[action] = dict(total=1, date={date: 1})
-            if date in uac.date:
-                uac.date[date]['total'] += 1
-            else:
-                uac.date[date] = dict(total=1)
-            uac.save()
+        date = parser.parse(date_string).date()
+        cls.increment_many({(user_id, action, date): 1})
         return True
 
+    @classmethod
+    def increment_many(cls, counts):
+        """Add to the counts of many users, actions and days at once, with a statement for the
+        totals and one for the daily counts. Rows are only locked for as long as these run.
+
+        :param dict counts: (user _id, action, date) => number of actions to add
+        """
+        totals = defaultdict(int)
+        for (user_id, action, date), count in counts.items():
+            totals[user_id] += count
+        if not totals:
+            return
+        now = timezone.now()
+        # Sorted, so concurrent upserts lock rows in the same order and cannot deadlock
+        totals = sorted(totals.items())
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    UPSERT_USER_ACTIVITY_TOTALS_SQL.format(values=', '.join(["(%s, '{}', '{}', %s, %s, %s)"] * len(totals))),
+                    [value for user_id, total in totals for value in (user_id, total, now, now)],
+                )
+                ids = dict(cursor.fetchall())
+                rows = sorted((ids[user_id], action, date, count) for (user_id, action, date), count in counts.items())
+                cursor.execute(
+                    UPSERT_USER_ACTIVITY_DAILY_SQL.format(values=', '.join(['(%s, %s, %s, %s)'] * len(rows))),
+                    [value for row in rows for value in row],
+                )
+
+
+class UserActivityDaily(models.Model):
+    """
+    How many times a user logged an action on one day. Rows are only written by
+    UserActivityCounter.increment_many, never through the ORM.
+    """
+    id = models.BigAutoField(primary_key=True)
+    counter = models.ForeignKey(UserActivityCounter, related_name='daily_counts', on_delete=models.CASCADE)
+    action = models.CharField(max_length=255)
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('counter', 'action', 'date')
+
 
 class PageCounter(BaseModel):
     primary_identifier_name = '_id'
@@ -75,8 +121,8 @@ class PageCounter(BaseModel):
     def get_all_downloads_on_date(cls, date):
         """
         Queries the total number of downloads on a date
-        :param str date: must be formatted the same as a page counter key so 'yyyy/mm/dd'
-        :return: long sum:
+        :param datetime date: the day to count the downloads of
+        :return: long sum, or None if nothing was downloaded that day
         """
         formatted_date = date.strftime('%Y/%m/%d')
         # Get all PageCounters with data for the date made for all versions downloads - don't include specific versions
@@ -84,9 +130,18 @@ class PageCounter(BaseModel):
 
         # Get the total download numbers from the nested dict on the PageCounter by annotating it as daily_total then
         # aggregating the sum.
-        daily_total = page_counters.annotate(daily_total=RawSQL("((date->%s->>'total')::int)", (formatted_date,))).aggregate(sum=Sum('daily_total'))['sum']
+        legacy_total = page_counters.annotate(daily_total=RawSQL("((date->%s->>'total')::int)", (formatted_date,))).aggregate(sum=Sum('daily_total'))['sum']
 
-        return daily_total
+        # Days counted since the per-day counts moved to PageCounterDaily
+        daily_total = PageCounterDaily.objects.filter(
+            date=date.date() if isinstance(date, datetime.datetime) else date,
+            page_counter__version__isnull=True,
+            page_counter__action='download',
+        ).aggregate(sum=Sum('total'))['sum']
+
+        if legacy_total is None and daily_total is None:
+            return None
+        return (legacy_total or 0) + (daily_total or 0)
 
     @staticmethod
     def clean_page(page):
@@ -98,80 +153,39 @@ class PageCounter(BaseModel):
 
     @classmethod
     def update_counter(cls, resource, file, version, action, node_info):
+        """Count a download or view of the file by the current session.
+
+        The counts are only added to this process's buffer, which writes them to the database in
+        batches (see framework.analytics.counters), so no row is locked while the request waits.
+        """
         if version is not None:
             page = '{0}:{1}:{2}:{3}'.format(action, resource._id, file._id, version)
         else:
             page = '{0}:{1}:{2}'.format(action, resource._id, file._id)
 
         cleaned_page = cls.clean_page(page)
-        date = timezone.now()
-        date_string = date.strftime('%Y/%m/%d')
-        visited_by_date = session.data.get('visited_by_date', {'date': date_string, 'pages': []})
-        with transaction.atomic():
-            # Temporary backwards compat - when creating new PageCounters, temporarily keep writing to _id field.
-            # After we're sure this is stable, we can stop writing to the _id field, and query on
-            # resource/file/action/version
-            model_instance, created = cls.objects.select_for_update().get_or_create(
-                _id=cleaned_page,
-                resource=resource,
-                file=file,
-                action=action,
-                version=version
-            )
-
-            # if they visited something today
-            if date_string == visited_by_date['date']:
-                # if they haven't visited this page today
-                if cleaned_page not in visited_by_date['pages']:
-                    # if the model_instance has today in it
-                    if date_string in model_instance.date.keys():
-                        # increment the number of unique visitors for today
-                        model_instance.date[date_string]['unique'] += 1
-                    else:
-                        # set the number of unique visitors for today to 1
-                        model_instance.date[date_string] = dict(unique=1)
-            # if they haven't visited something today
-            else:
-                # set their visited by date to blank
-                visited_by_date['date'] = date_string
-                visited_by_date['pages'] = []
-                # if the model_instance has today in it
-                if date_string in model_instance.date.keys():
-                    # increment the number of unique visitors for today
-                    model_instance.date[date_string]['unique'] += 1
-                else:
-                    # set the number of unique visitors to 1
-                    model_instance.date[date_string] = dict(unique=1)
-
-            # update their sessions
-            visited_by_date['pages'].append(cleaned_page)
-            session.data['visited_by_date'] = visited_by_date
-
-            if date_string in model_instance.date.keys():
-                if 'total' not in model_instance.date[date_string].keys():
-                    model_instance.date[date_string].update(total=0)
-                model_instance.date[date_string]['total'] += 1
-            else:
-                model_instance.date[date_string] = dict(total=1)
-
-            # if a download counter is being updated, only perform the update
-            # if the user who is downloading isn't a contributor to the project
-            page_type = cleaned_page.split(':')[0]
-            if page_type in ('download', 'view') and node_info:
-                if node_info['contributors'].filter(guids___id__isnull=False, guids___id=session.data.get('auth_user_id')).exists():
-                    model_instance.save()
-                    return
-
-            visited = session.data.get('visited', [])
-            if page not in visited:
-                model_instance.unique += 1
-                visited.append(page)
-                session.data['visited'] = visited
-
-            session.save()
-            model_instance.total += 1
-
-            model_instance.save()
+        date = timezone.now().date()
+        daily_unique = counters.first_visit(session._id, cleaned_page, date=date)
+
+        # if a download counter is being updated, only count it towards the totals
+        # if the user who is downloading isn't a contributor to the project
+        is_contributor = False
+        page_type = cleaned_page.split(':')[0]
+        if page_type in ('download', 'view') and node_info:
+            is_contributor = node_info['contributors'].filter(guids___id__isnull=False, guids___id=session.data.get('auth_user_id')).exists()
+
+        total = unique = 0
+        if not is_contributor:
+            total = 1
+            unique = counters.first_visit(session._id, page)
+
+        counters.buffer.add(
+            counters.Counter(page=cleaned_page, resource_id=resource.id, file_id=file.id, action=action, version=version),
+            date,
+            total=total,
+            unique=int(unique),
+            daily_unique=int(daily_unique),
+        )
 
     @classmethod
     def get_basic_counters(cls, resource, file, version, action):
@@ -180,3 +194,20 @@ class PageCounter(BaseModel):
             return (counter.unique, counter.total)
         except cls.DoesNotExist:
             return (None, None)
+
+
+class PageCounterDaily(models.Model):
+    """
+    The downloads or views counted by a PageCounter on one day. Replaces the per-day counts kept
+    in PageCounter.date, which are moved here by the migrate_page_counter_dates command.
+
+    Rows are only written in batches by framework.analytics.counters, never through the ORM.
+    """
+    id = models.BigAutoField(primary_key=True)
+    page_counter = models.ForeignKey(PageCounter, related_name='daily_counts', on_delete=models.CASCADE)
+    date = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+    unique = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('page_counter', 'date')
@@ -862,6 +862,8 @@ class FileVersion(ObjectIDMixin, BaseModel):
 
         if save:
             self.save()
+            # Files whose latest version this is store its size
+            BaseFileNode.objects.filter(_latest_version=self).update(_size=self.size)
 
     def _find_matching_archive(self, save=True):
         """Find another version with the same sha256 as this file.
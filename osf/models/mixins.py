@@ -8,7 +8,7 @@ from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models, transaction
 from django.utils import timezone
 from django.utils.functional import cached_property
-from guardian.shortcuts import assign_perm, get_perms, remove_perm, get_group_perms
+from guardian.shortcuts import assign_perm, get_perms, remove_perm
 
 from include import IncludeQuerySet
 
@@ -35,6 +35,7 @@ from osf.models.tag import Tag
 from osf.utils import sanitize
 from osf.models.validators import validate_subject_hierarchy, validate_email, expand_subject_hierarchy
 from osf.utils.fields import NonNaiveDateTimeField
+from osf.utils.permission_cache import get_cached_group_perms
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.machines import (
     ReviewsMachine,
@@ -1872,7 +1873,7 @@ class ContributorMixin(models.Model):
         perm = '{}_{}'.format(permission, object_type)
         # Using get_group_perms to get permissions that are inferred through
         # group membership - not inherited from superuser status
-        has_permission = perm in get_group_perms(user, self)
+        has_permission = perm in get_cached_group_perms(user, self)
         if object_type == 'node':
             if not has_permission and permission == READ and check_parent:
                 return self.is_admin_parent(user)
@@ -1901,7 +1902,7 @@ class ContributorMixin(models.Model):
             return []
         # If base_perms not on model, will error
         perms = self.base_perms
-        user_perms = sorted(set(get_group_perms(user, self)).intersection(perms), key=perms.index)
+        user_perms = sorted(set(get_cached_group_perms(user, self)).intersection(perms), key=perms.index)
         return [perm.split('_')[0] for perm in user_perms]
 
     def set_permissions(self, user, permissions, validate=True, save=False):
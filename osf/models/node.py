@@ -1,5 +1,4 @@
 from past.builtins import basestring
-import functools
 import itertools
 import logging
 import re
@@ -57,6 +56,7 @@ from framework.auth.core import Auth
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from osf.utils.requests import get_request_and_user_id, string_type_request_headers
+from osf.utils.permission_cache import get_permission_cache
 from osf.utils import sanitize
 from website import language, settings
 from website.citations.utils import datetime_to_csl
@@ -154,6 +154,10 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
             return self.filter(private_links__is_deleted=False, private_links__key=private_link).filter(is_deleted=False)
 
         if user is not None and not isinstance(user, AnonymousUser):
+            if settings.USE_NODE_READ_PERMISSION_TABLE:
+                qs |= self.filter(id__in=NodeEffectiveReadPermission.objects.filter(user_id=user.id).values('node_id'))
+                return qs.filter(is_deleted=False)
+
             read_user_query = get_objects_for_user(user, READ_NODE, self, with_superuser=False)
             qs |= read_user_query
             qs |= self.extra(where=["""
@@ -216,6 +220,13 @@ class AbstractNodeManager(TypedModelManager, IncludeManager):
             raise ValueError('Permission must be one of {}, {}, or {}.'.format(PERMISSIONS[0], PERMISSIONS[1], PERMISSIONS[2]))
 
         nodes = base_queryset.filter(is_deleted=False)
+        if permission == READ_NODE and settings.USE_NODE_READ_PERMISSION_TABLE:
+            node_reads = NodeEffectiveReadPermission.objects.filter(user_id=user.id if user else None, explicit=True).values('node_id')
+            query = Q(id__in=node_reads)
+            if include_public:
+                query |= Q(is_public=True)
+            return nodes.filter(query)
+
         permission_object_id = Permission.objects.get(codename=permission).id
         user_groups = OSFUserGroup.objects.filter(osfuser_id=user.id if user else None).values_list('group_id', flat=True)
         node_groups = NodeGroupObjectPermission.objects.filter(group_id__in=user_groups, permission_id=permission_object_id).values_list('content_object_id', flat=True)
@@ -713,17 +724,16 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     def bulk_update_search(cls, nodes, index=None):
         from website import search
         try:
-            serialize = functools.partial(search.search.update_node, index=index, bulk=True, async_update=False)
-            search.search.bulk_update_nodes(serialize, nodes, index=index)
+            search.search.bulk_update_node_documents(nodes, index=index)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
 
-    def update_search(self):
+    def update_search(self, saved_fields=None):
         from website import search
 
         try:
-            search.search.update_node(self, bulk=False, async_update=True)
+            search.search.update_node(self, bulk=False, async_update=True, saved_fields=saved_fields)
             if self.is_collected and self.is_public:
                 search.search.update_collected_metadata(self._id)
         except search.exceptions.SearchUnavailableError as e:
@@ -853,6 +863,13 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
                                     Useful for checking parent permissions for non-group actions like registrations.
         :return: bool Does the user have admin permissions on this object or its parents?
         """
+        cache = get_permission_cache()
+        if cache is not None:
+            key = ('is_admin_parent', getattr(user, 'id', None), self.id, include_group_admin)
+            return cache.get_or_set(key, lambda: self._is_admin_parent(user, include_group_admin))
+        return self._is_admin_parent(user, include_group_admin)
+
+    def _is_admin_parent(self, user, include_group_admin):
         if self.has_permission(user, ADMIN, check_parent=False):
             ret = True
             if not include_group_admin and not self.is_contributor(user):
@@ -2419,6 +2436,29 @@ class NodeGroupObjectPermission(GroupObjectPermissionBase):
     content_object = models.ForeignKey(AbstractNode, on_delete=models.CASCADE)
 
 
+class NodeEffectiveReadPermission(models.Model):
+    """
+    Materialized (user, node) pairs where the user can read the node, through contributorship,
+    OSF group membership, a direct permission, or admin on a project above the node. Lets
+    AbstractNodeQuerySet.can_view and get_nodes_for_user use a single indexed join instead of
+    guardian queries and a recursive CTE.
+
+    Rows are maintained by database triggers on the permission, group membership and node relation
+    tables (see osf/migrations/sql/node_read_permissions.py), never by the ORM. The
+    populate_node_read_permissions management command stores them for every node, and
+    check_node_read_permissions verifies and repairs them.
+    """
+    id = models.BigAutoField(primary_key=True)
+    # Rows are removed by the triggers, so no constraints that would have Django collect them
+    user = models.ForeignKey(OSFUser, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    node = models.ForeignKey(AbstractNode, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    # Whether one of the user's groups has read permission, i.e. whether get_nodes_for_user includes the node
+    explicit = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('user', 'node')
+
+
 class Node(AbstractNode):
     """
     Concrete Node class: Instance of AbstractNode(TypedModel). All things that inherit
@@ -147,7 +147,8 @@ class ApiOAuth2PersonalToken(base.ObjectIDMixin, base.BaseModel):
             resp = client.revoke_tokens({'token': self.token_id})  # noqa
         except cas.CasHTTPError as e:
             if e.code == 400:
-                pass  # Token hasn't been used yet, so not created in cas
+                # Token hasn't been used yet, so not created in cas
+                cas.invalidate_cached_token(self.token_id)
             else:
                 raise e
 
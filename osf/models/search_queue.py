@@ -0,0 +1,50 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+from osf.models.base import BaseModel
+
+
+class PendingSearchUpdate(BaseModel):
+    """An object whose search document is out of date.
+
+    Saves only mark the object dirty here; ``website.search.elastic_search.flush_pending_updates``
+    periodically drains the table and reindexes every queued object with a single bulk request.
+    Repeated saves of the same object coalesce into one row, and ``modified`` is bumped on
+    each of them so that a burst of edits is indexed once the burst is over.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    referent = GenericForeignKey()
+    # The id of the object's search document, kept so that the document can still be deleted
+    # if the object itself is deleted before the queue is flushed
+    document_id = models.CharField(max_length=255, null=True, blank=True)
+    # Whether any of the coalesced saves changed a field that appears in the object's file documents
+    reindex_files = models.BooleanField(default=False)
+
+    @classmethod
+    def enqueue(cls, obj, reindex_files=True):
+        """Mark ``obj`` as needing reindexing.
+
+        :return bool: True if ``obj`` was not already queued
+        """
+        content_type = ContentType.objects.get_for_model(type(obj))
+        entry, created = cls.objects.get_or_create(
+            content_type=content_type,
+            object_id=obj.id,
+            defaults={'reindex_files': reindex_files, 'document_id': obj._id},
+        )
+        if not created:
+            # Use update to bump the debounce timer without a full_clean/save round trip
+            updates = {'modified': timezone.now(), 'document_id': obj._id}
+            if reindex_files:
+                updates['reindex_files'] = True
+            cls.objects.filter(id=entry.id).update(**updates)
+        return created
+
+    def __unicode__(self):
+        return '{}:{}'.format(self.content_type_id, self.object_id)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id')
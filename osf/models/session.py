@@ -12,3 +12,19 @@ class Session(ObjectIDMixin, BaseModel):
     @property
     def is_external_first_login(self):
         return 'auth_user_external_first_login' in self.data
+
+    @classmethod
+    def load(cls, q, select_for_update=False):
+        """Load a session from the configured session backend (see framework.sessions.backends)."""
+        from framework.sessions.backends import load_session
+        if select_for_update:
+            return super(Session, cls).load(q, select_for_update=select_for_update)
+        return load_session(q)
+
+    def save(self, *args, **kwargs):
+        from framework.sessions.backends import get_session_store, lru
+        lru.discard(self._id)
+        store = get_session_store()
+        if store.in_database:
+            return super(Session, self).save(*args, **kwargs)
+        store.save(self)
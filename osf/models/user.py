@@ -35,6 +35,7 @@ from framework.auth.exceptions import (ChangePasswordError, ExpiredTokenError,
                                        MergeConfirmedRequiredError,
                                        MergeConflictError)
 from framework.exceptions import PermissionsError
+from framework.sessions.backends import get_session_store
 from framework.sessions.utils import remove_sessions_for_user
 from osf.utils.requests import get_current_request
 from osf.exceptions import reraise_django_validation_errors, MaxRetriesError, UserStateError
@@ -1715,11 +1716,7 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
         :returns: The signed cookie
         """
         secret = secret or settings.SECRET_KEY
-        user_session = Session.objects.filter(
-            data__auth_user_id=self._id
-        ).order_by(
-            '-modified'
-        ).first()
+        user_session = get_session_store().load_latest_for_user(self._id)
 
         if not user_session:
             user_session = Session(data={
@@ -0,0 +1,108 @@
+"""
+A request-scoped cache of guardian group permissions.
+
+Permission classes, serializers and ``HideIf*`` fields ask ``has_permission``, ``can_view``
+and ``can_edit`` about the same (user, resource) pairs many times while one API request is
+served. The cache lives on the current Django request, so every caller shares it and it is
+thrown away with the request.
+
+Objects can be registered as a page (the list serializer does this for every page it
+renders). The first cache miss on any registered object then fetches the group permissions
+of the whole page for that user in a single query, instead of one query per object.
+
+Only safe (read-only) API requests are cached, because permissions are not expected to
+change while they are served. Flask requests are never cached: test request contexts
+outlive the permission changes made within a test.
+"""
+from collections import defaultdict
+
+from guardian.shortcuts import get_group_perms
+from guardian.utils import get_group_obj_perms_model
+from rest_framework.permissions import SAFE_METHODS
+
+from api.base.api_globals import api_globals
+
+REQUEST_ATTRIBUTE = '_osf_permission_cache'
+
+
+class PermissionCache(object):
+
+    def __init__(self):
+        # (user id, concrete model, object pk) => frozenset of permission codenames
+        self._group_perms = {}
+        # concrete model => {pk: object} of the registered pages
+        self._pages = defaultdict(dict)
+        self._values = {}
+
+    @staticmethod
+    def _model(obj):
+        return obj._meta.concrete_model
+
+    def _key(self, user, obj):
+        return user.id, self._model(obj), obj.pk
+
+    def add_objects(self, objs):
+        """Register a page of objects whose group permissions should be fetched together."""
+        for obj in objs:
+            if getattr(obj, 'pk', None) is not None and hasattr(obj, 'guardian_object_type'):
+                self._pages[self._model(obj)][obj.pk] = obj
+
+    def get_group_perms(self, user, obj):
+        """Cached equivalent of ``guardian.shortcuts.get_group_perms(user, obj)``."""
+        key = self._key(user, obj)
+        if key not in self._group_perms:
+            if obj.pk in self._pages.get(self._model(obj), {}):
+                self._prefetch_group_perms(user, obj)
+            else:
+                self._group_perms[key] = frozenset(get_group_perms(user, obj))
+        return self._group_perms[key]
+
+    def _prefetch_group_perms(self, user, obj):
+        model = self._model(obj)
+        group_model = get_group_obj_perms_model(obj)
+        if group_model.objects.is_generic():
+            self._group_perms[self._key(user, obj)] = frozenset(get_group_perms(user, obj))
+            return
+        pks = list(self._pages[model])
+        perms = defaultdict(set)
+        rows = group_model.objects.filter(
+            group__user=user,
+            content_object_id__in=pks,
+        ).values_list('content_object_id', 'permission__codename')
+        for pk, codename in rows:
+            perms[pk].add(codename)
+        for pk in pks:
+            self._group_perms[(user.id, model, pk)] = frozenset(perms[pk])
+
+    def get_or_set(self, key, compute):
+        """Memoize the result of other permission checks, e.g. ``is_admin_parent``."""
+        if key not in self._values:
+            self._values[key] = compute()
+        return self._values[key]
+
+    def clear(self):
+        self._group_perms.clear()
+        self._pages.clear()
+        self._values.clear()
+
+
+def get_permission_cache():
+    """Return the permission cache of the current API request, or None if permissions
+    should not be cached.
+    """
+    request = getattr(api_globals, 'request', None)
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    cache = getattr(request, REQUEST_ATTRIBUTE, None)
+    if cache is None:
+        cache = PermissionCache()
+        setattr(request, REQUEST_ATTRIBUTE, cache)
+    return cache
+
+
+def get_cached_group_perms(user, obj):
+    """``get_group_perms`` that goes through the request's permission cache when there is one."""
+    cache = get_permission_cache()
+    if cache is None:
+        return get_group_perms(user, obj)
+    return cache.get_group_perms(user, obj)
@@ -5,14 +5,19 @@ Unit tests for analytics logic in framework/analytics/__init__.py
 
 import mock
 import pytest
+import pytz
 from django.utils import timezone
 from nose.tools import *  # noqa: F403
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 from addons.osfstorage.models import OsfStorageFile
 from framework import analytics
-from osf.models import PageCounter, OSFGroup
+from framework.analytics import counters
+from osf.management.commands.migrate_page_counter_dates import migrate_page_counter_dates
+from osf.management.commands.migrate_user_activity_counters import migrate_user_activity_counters
+from osf.models import PageCounter, PageCounterDaily, OSFGroup, UserActivityCounter
+from website import settings
 
 from tests.base import OsfTestCase
 from osf_tests.factories import UserFactory, ProjectFactory
@@ -40,6 +45,51 @@ class TestAnalytics(OsfTestCase):
         analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
         assert_equal(user.get_activity_points(), 1)
 
+    def test_increment_user_activity_counters_daily(self):
+        user = UserFactory()
+        date = datetime(2020, 3, 1, 12, tzinfo=pytz.utc)
+
+        analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
+        analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
+        analytics.increment_user_activity_counters(user._id, 'project_created', (date + timedelta(days=1)).isoformat())
+        analytics.increment_user_activity_counters(user._id, 'wiki_updated', date.isoformat())
+
+        counter = UserActivityCounter.objects.get(_id=user._id)
+        assert_equal(counter.total, 4)
+        assert_equal(counter.action, {})
+        assert_equal(
+            set(counter.daily_counts.values_list('action', 'date', 'count')),
+            {
+                ('project_created', date.date(), 2),
+                ('project_created', date.date() + timedelta(days=1), 1),
+                ('wiki_updated', date.date(), 1),
+            }
+        )
+
+    def test_migrate_user_activity_counters(self):
+        user = UserFactory()
+        UserActivityCounter.objects.create(
+            _id=user._id,
+            total=3,
+            action={'project_created': {'total': 3, 'date': {'2018/02/04': 2, '2018/02/05': 1}}},
+            date={'2018/02/04': {'total': 2}, '2018/02/05': {'total': 1}},
+        )
+        analytics.increment_user_activity_counters(user._id, 'project_created', datetime(2018, 2, 4).isoformat())
+
+        assert_equal(migrate_user_activity_counters(dry_run=True), 1)
+        assert_equal(migrate_user_activity_counters(), 1)
+        assert_equal(migrate_user_activity_counters(), 0)
+
+        counter = UserActivityCounter.objects.get(_id=user._id)
+        assert_equal(counter.total, 4)
+        assert_equal(counter.action, {})
+        assert_equal(counter.date, {})
+        assert_equal(
+            set(counter.daily_counts.values_list('action', 'date', 'count')),
+            {('project_created', date(2018, 2, 4), 3), ('project_created', date(2018, 2, 5), 1)}
+        )
+        assert_equal(analytics.get_total_activity_count(user._id), 4)
+
 
 @pytest.fixture()
 def user():
@@ -144,6 +194,97 @@ class TestPageCounter:
         assert page_counter.total == 1
         assert page_counter.unique == 1
 
+    @mock.patch('osf.models.analytics.session')
+    def test_download_update_counter_daily(self, mock_session, user, project, file_node):
+        mock_session.data = {'auth_user_id': user._id}
+        resource = project.guids.first()
+        node_info = {'contributors': project.contributors}
+
+        PageCounter.update_counter(resource, file_node, version=None, action='download', node_info=node_info)
+        PageCounter.update_counter(resource, file_node, version=None, action='download', node_info=node_info)
+
+        # Contributors are left out of the totals, but not of the counts of the day
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 0
+        assert page_counter.date == {}
+        daily = page_counter.daily_counts.get()
+        assert daily.date == timezone.now().date()
+        assert daily.total == 2
+        assert daily.unique == 1
+        assert PageCounter.get_all_downloads_on_date(timezone.now()) == 2
+
+    @mock.patch('osf.models.analytics.session')
+    def test_update_counter_is_buffered(self, mock_session, project, file_node):
+        mock_session.data = {}
+        resource = project.guids.first()
+        counters.buffer.flush()
+
+        with mock.patch.object(settings, 'PAGE_COUNTER_FLUSH_INTERVAL', 3600):
+            PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={})
+            PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={})
+            assert not PageCounter.objects.filter(resource=resource, file=file_node).exists()
+
+            counters.buffer.flush()
+
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 2
+        assert page_counter.unique == 1
+        assert page_counter.daily_counts.get().total == 2
+
+    @mock.patch('osf.models.analytics.session')
+    def test_idle_buffer_is_flushed(self, mock_session, project, file_node):
+        mock_session.data = {}
+        resource = project.guids.first()
+        counters.buffer.flush()
+
+        with mock.patch.object(counters.PageCounterBuffer, '_start_flusher') as mock_start_flusher:
+            with mock.patch.object(settings, 'PAGE_COUNTER_FLUSH_INTERVAL', 3600):
+                PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={})
+                counters.buffer.flush_if_due()
+                assert not PageCounter.objects.filter(resource=resource, file=file_node).exists()
+            assert mock_start_flusher.called
+
+            # What the background thread does once the interval passed without further counts
+            with mock.patch.object(settings, 'PAGE_COUNTER_FLUSH_INTERVAL', 0):
+                counters.buffer.flush_if_due()
+
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 1
+
+    @mock.patch('osf.models.analytics.session')
+    def test_full_buffer_is_flushed_in_background(self, mock_session, project, file_node):
+        mock_session.data = {}
+        resource = project.guids.first()
+        counters.buffer.flush()
+
+        with mock.patch.object(counters.PageCounterBuffer, '_start_flusher'):
+            with mock.patch.object(settings, 'PAGE_COUNTER_FLUSH_INTERVAL', 3600):
+                with mock.patch.object(settings, 'PAGE_COUNTER_BUFFER_SIZE', 1):
+                    PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={})
+                    # The counting request only wakes the background thread up
+                    assert not PageCounter.objects.filter(resource=resource, file=file_node).exists()
+                    assert counters.buffer._full.is_set()
+                    counters.buffer.flush_if_due()
+
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 1
+
+    @mock.patch('osf.models.analytics.session')
+    def test_counts_kept_when_write_fails(self, mock_session, project, file_node):
+        mock_session.data = {}
+        resource = project.guids.first()
+        counters.buffer.flush()
+
+        with mock.patch.object(counters.PageCounterBuffer, '_start_flusher'):
+            with mock.patch.object(settings, 'PAGE_COUNTER_FLUSH_INTERVAL', 3600):
+                PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={})
+                with mock.patch('framework.analytics.counters.write_counts', side_effect=Exception):
+                    counters.buffer.flush()
+                counters.buffer.flush()
+
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 1
+
     def test_get_all_downloads_on_date(self, page_counter, page_counter2):
         """
         This method tests that multiple pagecounter objects have their download totals summed properly.
@@ -171,3 +312,25 @@ class TestPageCounter:
         total_downloads = PageCounter.get_all_downloads_on_date(date)
 
         assert total_downloads == 45
+
+    def test_get_all_downloads_on_date_daily_counts(self, page_counter, page_counter2):
+        PageCounterDaily.objects.create(page_counter=page_counter2, date=date(2018, 2, 4), total=10, unique=3)
+        PageCounterDaily.objects.create(page_counter=page_counter2, date=date(2018, 2, 5), total=7, unique=2)
+
+        assert PageCounter.get_all_downloads_on_date(datetime(2018, 2, 4)) == 55
+        assert PageCounter.get_all_downloads_on_date(datetime(2018, 2, 5)) == 7
+        assert PageCounter.get_all_downloads_on_date(datetime(2018, 2, 6)) is None
+
+    def test_migrate_page_counter_dates(self, page_counter, page_counter2, page_counter_for_individual_version):
+        PageCounterDaily.objects.create(page_counter=page_counter, date=date(2018, 2, 4), total=1, unique=1)
+
+        assert migrate_page_counter_dates(dry_run=True) == 3
+        page_counter.refresh_from_db()
+        assert page_counter.date == {u'2018/02/04': {u'total': 41, u'unique': 33}}
+
+        assert migrate_page_counter_dates(batch_size=2) == 3
+        assert not PageCounter.objects.exclude(date={}).exists()
+        daily = page_counter.daily_counts.get()
+        assert daily.total == 42
+        assert daily.unique == 34
+        assert PageCounter.get_all_downloads_on_date(datetime(2018, 2, 4)) == 46
@@ -2,6 +2,8 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import mock
+import shutil
+import tempfile
 import time
 import unittest
 import logging
@@ -10,20 +12,28 @@ import functools
 from nose.tools import *  # noqa: F403
 import pytest
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from framework import metrics
 from framework.auth.core import Auth
 
 from website import settings
 import website.search.search as search
 from website.search import elastic_search
 from website.search.util import build_query
+from website.search_migration import parallel
 from website.search_migration.migrate import migrate
+from website.search_migration.parallel import ParallelMigration
 from osf.models import (
+    AbstractNode,
     Retraction,
     NodeLicense,
     OSFGroup,
     Tag,
     Preprint,
     QuickFilesNode,
+    PendingSearchUpdate,
 )
 from addons.wiki.models import WikiPage
 from addons.osfstorage.models import OsfStorageFile
@@ -313,6 +323,35 @@ class TestUserUpdate(OsfTestCase):
         docs_current = query_user(user.fullname)['results']
         assert_equal(len(docs_current), 1)
 
+    def test_change_name_updates_contributor_lists(self):
+        user = factories.UserFactory(fullname='Ziggy Stardust')
+        node = factories.NodeFactory(creator=user, title='Hunky Dory', is_public=True)
+        preprint = factories.PreprintFactory(creator=user, title='Low')
+        collection = factories.CollectionFactory(creator=user, is_public=True, provider=factories.CollectionProviderFactory())
+        cgm = collection.collect_object(node, user)
+
+        user.fullname = 'Aladdin Sane'
+        user.save()
+
+        def contributor_names(doc_type, doc_id):
+            doc = elastic_search.client().get(index=elastic_search.INDEX, doc_type=doc_type, id=doc_id)
+            return [contrib['fullname'] for contrib in doc['_source']['contributors']]
+
+        assert_equal(contributor_names('project', node._id), ['Aladdin Sane'])
+        assert_equal(contributor_names('preprint', preprint._id), ['Aladdin Sane'])
+        assert_equal(contributor_names('collectionSubmission', cgm._id), ['Aladdin Sane'])
+
+    def test_propagate_contributor_update_in_chunks(self):
+        user = factories.UserFactory(fullname='Thin White Duke')
+        factories.NodeFactory(creator=user, is_public=True)
+        node_two = factories.NodeFactory(creator=user, is_public=True)
+        # Private nodes have no search document; the update still succeeds
+        node_private = factories.NodeFactory(creator=user, is_public=False)
+
+        assert_equal(elastic_search.propagate_contributor_update(user, 'node', chunk_size=2), (2, node_two.id))
+        assert_equal(elastic_search.propagate_contributor_update(user, 'node', after_id=node_two.id, chunk_size=2), (1, node_private.id))
+        assert_equal(elastic_search.propagate_contributor_update(user, 'node', after_id=node_private.id, chunk_size=2), (0, None))
+
     def test_disabled_user(self):
         # Test that disabled users are not in search index
 
@@ -701,6 +740,22 @@ class TestNodeSearch(OsfTestCase):
 
         self.query = 'category:project & category:component'
 
+    def test_format_results_loads_parents_in_one_query(self):
+        results = [hit['_source'] for hit in query(self.query, raw=True)['results']]
+        assert_true(any(result.get('parent_id') for result in results))
+        with CaptureQueriesContext(connection) as ctx:
+            formatted = elastic_search.format_results(results)
+        assert_equal(len(ctx.captured_queries), 1)
+
+        child = [result for result in formatted if result['title'] == self.public_child.title][0]
+        assert_true(child['is_component'])
+        assert_equal(child['parent_title'], self.node.title)
+        assert_equal(child['parent_url'], self.node.url)
+        # The parent of public_subchild is private, so it is not exposed
+        subchild = [result for result in formatted if result['title'] == self.public_subchild.title][0]
+        assert_false(subchild['is_component'])
+        assert_is_none(subchild['parent_url'])
+
     @retry_assertion()
     def test_node_license_added_to_search(self):
         docs = query(self.query)['results']
@@ -731,6 +786,70 @@ class TestNodeSearch(OsfTestCase):
             assert_equal(doc['license'].get('id'), new_license.license_id)
 
 
+@pytest.mark.enable_search
+class TestSerializeNodes(OsfTestCase):
+
+    def setUp(self):
+        super(TestSerializeNodes, self).setUp()
+        self.user = factories.UserFactory(fullname='Brian May')
+        self.consolidate_auth = Auth(user=self.user)
+        self.project = factories.ProjectFactory(title='Queen', creator=self.user, is_public=True)
+        self.project.node_license = factories.NodeLicenseRecordFactory()
+        self.project.save()
+        self.project.add_tag('rock', self.consolidate_auth)
+        self.project.add_tag('band', self.consolidate_auth)
+        self.project.add_contributor(factories.UserFactory(fullname='Roger Taylor'), auth=self.consolidate_auth, save=True)
+        self.component = factories.NodeFactory(parent=self.project, creator=self.user, is_public=True)
+        self.subcomponent = factories.NodeFactory(parent=self.component, creator=self.user, is_public=True)
+        WikiPage.objects.create_for_node(self.component, 'home', 'Bohemian Rhapsody', self.consolidate_auth)
+        self.registration = factories.RegistrationFactory(project=self.project, is_public=True)
+
+    def serialize(self, node):
+        return elastic_search.serialize_node(node, elastic_search.get_doctype_from_node(node))
+
+    def test_serialize_nodes_matches_serialize_node(self):
+        nodes = [self.project, self.component, self.subcomponent, self.registration]
+        documents = elastic_search.serialize_nodes(nodes)
+        for node in nodes:
+            assert documents[node.id] == self.serialize(node)
+
+    def test_serialize_nodes_orders_relations_like_serialize_node(self):
+        # Tags and institutions are added in an order that differs from name order
+        self.project.add_tag('zeppelin', self.consolidate_auth)
+        self.project.add_tag('anthem', self.consolidate_auth)
+        for name in ['Mercury Institute', 'Deacon Institute', 'Taylor Institute']:
+            self.project.affiliated_institutions.add(factories.InstitutionFactory(name=name))
+        for name in ['Opera', 'Night']:
+            self.project.add_osf_group(factories.OSFGroupFactory(name=name, creator=self.user))
+
+        document = elastic_search.serialize_nodes([self.project])[self.project.id]
+        assert document == self.serialize(self.project)
+        assert document['tags'] == ['anthem', 'band', 'rock', 'zeppelin']
+        assert document['affiliated_institutions'] == ['Deacon Institute', 'Mercury Institute', 'Taylor Institute']
+        assert [group['name'] for group in document['groups']] == ['Opera', 'Night']
+
+    def test_bulk_update_search_serializes_nodes_at_once(self):
+        search.delete_index(elastic_search.INDEX)
+        search.create_index(elastic_search.INDEX)
+        with mock.patch.object(elastic_search, 'serialize_nodes', wraps=elastic_search.serialize_nodes) as mock_serialize:
+            AbstractNode.bulk_update_search([self.project, self.component, self.subcomponent])
+        assert mock_serialize.call_count == 1
+        assert len(query('Queen')['results']) == 1
+
+    def test_serialize_nodes_inherits_license(self):
+        documents = elastic_search.serialize_nodes([self.subcomponent])
+        assert documents[self.subcomponent.id]['license']['id'] == self.project.node_license.license_id
+
+    def test_serialize_nodes_query_count_is_constant(self):
+        # Warm the wiki search text cache so both runs read it the same way
+        elastic_search.serialize_nodes([self.project, self.component, self.subcomponent, self.registration])
+        with CaptureQueriesContext(connection) as two_nodes:
+            elastic_search.serialize_nodes([self.project, self.component])
+        with CaptureQueriesContext(connection) as four_nodes:
+            elastic_search.serialize_nodes([self.project, self.component, self.subcomponent, self.registration])
+        assert len(four_nodes.captured_queries) == len(two_nodes.captured_queries)
+
+
 @pytest.mark.enable_search
 @pytest.mark.enable_enqueue_task
 class TestRegistrationRetractions(OsfTestCase):
@@ -1137,6 +1256,69 @@ class TestAddContributor(OsfTestCase):
         assert_equal(len(contribs['users'][0]['social']), 1)
         assert_equal(contribs['users'][0]['social']['orcid'], user.social_links['orcid'])
 
+    def test_search_exclude(self):
+        contribs = search.search_contributor(self.name1, exclude=[self.user])
+        assert_equal(len(contribs['users']), 0)
+
+    def test_search_projects_in_common(self):
+        current_user = factories.UserFactory(fullname='Freddie Mercury')
+        project = factories.ProjectFactory(creator=current_user)
+        project.add_contributor(self.user, save=True)
+        factories.ProjectFactory(creator=current_user)
+
+        contribs = search.search_contributor(self.name1, current_user=current_user)
+        assert_equal(contribs['users'][0]['n_projects_in_common'], 1)
+        assert_equal(contribs['users'][0]['n_projects_in_common'], current_user.n_projects_in_common(self.user))
+
+        contribs = search.search_contributor(self.name3, current_user=current_user)
+        assert_equal(contribs['users'][0]['n_projects_in_common'], 0)
+
+        contribs = search.search_contributor(current_user.fullname, current_user=current_user)
+        assert_equal(contribs['users'][0]['n_projects_in_common'], -1)
+
+    def test_search_enrichment_query_count(self):
+        for i in range(5):
+            factories.UserFactory(fullname='Roger{} Waters'.format(i))
+        current_user = factories.UserFactory()
+        with CaptureQueriesContext(connection) as ctx:
+            contribs = search.search_contributor('Roger', current_user=current_user)
+        assert_equal(len(contribs['users']), 6)
+        # One query loads the users; counting projects in common looks up the read permission,
+        # then counts for every user at once
+        assert_equal(len(ctx.captured_queries), 3)
+
+    @mock.patch('website.search.elastic_search.settings.SEARCH_CONTRIBUTOR_AUTOCOMPLETE', False)
+    def test_search_without_autocomplete(self):
+        contribs = search.search_contributor(self.name1.split(' ')[0][:-1])
+        assert_equal(len(contribs['users']), 1)
+        assert_equal(contribs['users'][0]['id'], self.user._id)
+
+    @mock.patch('website.search.elastic_search.settings.SEARCH_CONTRIBUTOR_AUTOCOMPLETE', True)
+    def test_search_with_autocomplete(self):
+        contribs = search.search_contributor(self.name1.split(' ')[0][:-1])
+        assert_equal(len(contribs['users']), 1)
+        assert_equal(contribs['users'][0]['id'], self.user._id)
+
+    @mock.patch('website.search.elastic_search.settings.SEARCH_CONTRIBUTOR_AUTOCOMPLETE', True)
+    @mock.patch('website.search.elastic_search.has_autocomplete_field', return_value=False)
+    def test_search_autocomplete_falls_back_without_field(self, mock_has_field):
+        with mock.patch('website.search.elastic_search.search', wraps=elastic_search.search) as mock_search:
+            contribs = search.search_contributor(self.name1.split(' ')[0][:-1])
+        assert_true(mock_search.called)
+        assert_equal(len(contribs['users']), 1)
+        assert_equal(contribs['users'][0]['id'], self.user._id)
+
+    def test_search_job_and_school(self):
+        with run_celery_tasks():
+            self.user.jobs = [{'institution': 'Mercury Records', 'department': '', 'title': ''}]
+            self.user.schools = [{'institution': 'Imperial College', 'department': '', 'degree': ''}]
+            self.user.save()
+        for autocomplete in (False, True):
+            with mock.patch('website.search.elastic_search.settings.SEARCH_CONTRIBUTOR_AUTOCOMPLETE', autocomplete):
+                for query in ('Mercury', 'Imperial'):
+                    contribs = search.search_contributor(query)
+                    assert_equal([user['id'] for user in contribs['users']], [self.user._id])
+
 
 @pytest.mark.enable_search
 @pytest.mark.enable_enqueue_task
@@ -1413,6 +1595,67 @@ class TestSearchMigration(OsfTestCase):
         res = self.es.search(index=settings.ELASTIC_INDEX, doc_type='collectionSubmission', search_type='count', body=count_query)
         assert res['hits']['total'] == 2
 
+@pytest.mark.enable_search
+class TestParallelSearchMigration(OsfTestCase):
+
+    def setUp(self):
+        super(TestParallelSearchMigration, self).setUp()
+        self.checkpoint_dir = tempfile.mkdtemp()
+        factories.ProjectFactory(is_public=True)
+
+    def tearDown(self):
+        super(TestParallelSearchMigration, self).tearDown()
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    @mock.patch('website.search_migration.migrate.set_up_index', return_value='test_v2')
+    def test_shards_cover_every_id(self, mock_set_up_index):
+        migration = ParallelMigration('test', delete=False, workers=2, checkpoint_dir=self.checkpoint_dir, increment=3)
+        for doc_type, (model, _, _) in parallel.SQL_MIGRATIONS.items():
+            shards = [shard for shard in migration.manifest['shards'] if shard['doc_type'] == doc_type]
+            assert shards[0]['start'] == 0
+            assert shards[-1]['end'] >= model.objects.order_by('id').last().id
+            for previous, shard in zip(shards, shards[1:]):
+                assert previous['end'] == shard['start']
+
+    @mock.patch('website.search_migration.migrate.set_up_index', return_value='test_v2')
+    def test_resume_reuses_manifest(self, mock_set_up_index):
+        first = ParallelMigration('test', delete=False, workers=2, checkpoint_dir=self.checkpoint_dir)
+        second = ParallelMigration('test', delete=False, workers=2, checkpoint_dir=self.checkpoint_dir)
+        assert mock_set_up_index.call_count == 1
+        assert first.manifest == second.manifest
+
+    @mock.patch('website.search_migration.migrate.sql_migrate_page', return_value=2)
+    def test_migrate_shard_resumes_from_checkpoint(self, mock_migrate_page):
+        shard = {
+            'doc_type': 'node',
+            'number': 0,
+            'start': 0,
+            'end': 30,
+            'increment': 10,
+            'index': 'test_v2',
+            'delete': False,
+            'checkpoint_dir': self.checkpoint_dir,
+        }
+        parallel.write_json(parallel.shard_checkpoint_path(self.checkpoint_dir, shard), {
+            'doc_type': 'node',
+            'number': 0,
+            'page_start': 20,
+            'indexed': 4,
+            'deleted': 0,
+            'seconds': 1.0,
+            'done': False,
+        })
+        checkpoint = parallel.migrate_shard(shard)
+        assert mock_migrate_page.call_count == 1
+        assert mock_migrate_page.call_args[0][2:4] == (20, 30)
+        assert checkpoint['done']
+        assert checkpoint['indexed'] == 6
+
+        # Finished shards are skipped entirely
+        parallel.migrate_shard(shard)
+        assert mock_migrate_page.call_count == 1
+
+
 @pytest.mark.enable_search
 @pytest.mark.enable_enqueue_task
 class TestSearchFiles(OsfTestCase):
@@ -1498,6 +1741,24 @@ class TestSearchFiles(OsfTestCase):
         find = query_file('The Dock of the Bay.mp3')['results']
         assert_equal(len(find), 0)
 
+    def test_description_change_does_not_reindex_files(self):
+        self.root.append_file('Mr. Pitiful.mp3')
+        with mock.patch('website.search.elastic_search.update_target_files') as mock_update_files:
+            self.node.description = 'Otis Blue'
+            with run_celery_tasks():
+                self.node.save()
+        assert not mock_update_files.called
+
+    def test_title_change_reindexes_files_in_bulk(self):
+        self.root.append_file('Mr. Pitiful.mp3')
+        self.root.append_file('Fa-Fa-Fa-Fa-Fa.mp3')
+        self.node.title = 'Dictionary of Soul'
+        with run_celery_tasks():
+            self.node.save()
+        find = query_file('Mr. Pitiful.mp3')['results']
+        assert_equal(find[0]['node_title'], 'Dictionary of Soul')
+        assert elastic_search.update_target_files(self.node) == 2
+
     def test_file_download_url_guid(self):
         file_ = self.root.append_file('Timber.mp3')
         file_guid = file_.get_guid(create=True)
@@ -1554,3 +1815,156 @@ class TestSearchFiles(OsfTestCase):
 
         find = query_file('GreenLight.mp3')['results']
         assert_equal(len(find), 0)
+
+
+@pytest.mark.enable_search
+@pytest.mark.enable_enqueue_task
+class TestSearchIndexQueue(OsfTestCase):
+
+    def setUp(self):
+        super(TestSearchIndexQueue, self).setUp()
+        search.delete_index(elastic_search.INDEX)
+        search.create_index(elastic_search.INDEX)
+        self.project = factories.ProjectFactory(title='Sitting On The Dock', is_public=True)
+        PendingSearchUpdate.objects.all().delete()
+
+    @mock.patch('website.search.elastic_search.flush_search_index_queue')
+    def test_saves_coalesce_into_one_queue_entry(self, mock_flush):
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            for title in ['Sitting', 'On The', 'Dock']:
+                self.project.title = title
+                self.project.save()
+        assert PendingSearchUpdate.objects.filter(object_id=self.project.id).count() == 1
+        # Only the first save schedules a flush
+        assert mock_flush.si.return_value.set.return_value.apply_async.call_count == 1
+
+    @mock.patch('website.search.elastic_search.enqueue_task')
+    @mock.patch('website.search.elastic_search.flush_search_index_queue')
+    def test_flush_scheduled_after_debounce(self, mock_flush, mock_enqueue):
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            self.project.title = 'Outside'
+            self.project.save()
+            # Outside a request, the flush is scheduled directly instead of being run right away
+            mock_flush.si.return_value.set.assert_called_once_with(
+                countdown=settings.SEARCH_INDEX_QUEUE_DEBOUNCE.total_seconds(),
+            )
+            assert mock_flush.si.return_value.set.return_value.apply_async.call_count == 1
+            assert mock_enqueue.call_count == 0
+
+            PendingSearchUpdate.objects.all().delete()
+            with mock.patch('website.search.elastic_search.in_request_context', return_value=True):
+                self.project.title = 'Inside'
+                self.project.save()
+            # Inside a request, the flush is scheduled once the request is over
+            mock_enqueue.assert_called_once_with(mock_flush.si.return_value.set.return_value)
+            assert mock_flush.si.return_value.set.return_value.apply_async.call_count == 1
+
+    @mock.patch('website.search.elastic_search.flush_search_index_queue')
+    def test_flush_deletes_documents_of_deleted_objects(self, mock_flush):
+        group = factories.OSFGroupFactory(name='Cornbread')
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            elastic_search.enqueue_update(group)
+        search.flush_pending_updates(debounce=0, refresh=True)
+        assert_equal(len(query('category:group AND Cornbread')['results']), 1)
+
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            elastic_search.enqueue_update(group)
+        OSFGroup.objects.filter(id=group.id).delete()
+        assert search.flush_pending_updates(debounce=0, refresh=True) == 1
+        assert PendingSearchUpdate.objects.count() == 0
+        assert_equal(len(query('category:group AND Cornbread')['results']), 0)
+
+    @mock.patch('website.search.elastic_search.flush_search_index_queue')
+    def test_flush_respects_debounce(self, mock_flush):
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            self.project.title = 'Of The Bay'
+            self.project.save()
+        assert search.flush_pending_updates() == 0
+        assert PendingSearchUpdate.objects.count() == 1
+        assert search.flush_pending_updates(debounce=0, refresh=True) == 1
+        assert PendingSearchUpdate.objects.count() == 0
+        docs = query('Of The Bay')['results']
+        assert_equal(len(docs), 1)
+
+    @mock.patch('website.search.elastic_search.flush_search_index_queue')
+    def test_flush_removes_private_node(self, mock_flush):
+        search.flush_pending_updates(debounce=0, refresh=True)
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            self.project.is_public = False
+            self.project.save()
+        search.flush_pending_updates(debounce=0, refresh=True)
+        docs = query('Sitting On The Dock')['results']
+        assert_equal(len(docs), 0)
+
+    def test_queue_flushed_immediately_without_celery(self):
+        self.project.title = 'Respect'
+        self.project.save()
+        assert PendingSearchUpdate.objects.count() == 0
+        docs = query('Respect')['results']
+        assert_equal(len(docs), 1)
+
+
+@pytest.mark.enable_search
+@pytest.mark.enable_enqueue_task
+@mock.patch('website.search.elastic_search.settings.SEARCH_RESULT_CACHE_TIMEOUT', 60)
+class TestSearchResultCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestSearchResultCache, self).setUp()
+        search.delete_index(elastic_search.INDEX)
+        search.create_index(elastic_search.INDEX)
+        metrics.reset()
+
+    def test_identical_queries_are_served_from_cache(self):
+        factories.ProjectFactory(title='Stairway to Heaven', is_public=True)
+        first = query('Stairway')
+        with mock.patch.object(elastic_search, '_search') as mock_search:
+            second = query('Stairway')
+        assert_false(mock_search.called)
+        assert_equal(first, second)
+        assert_equal(metrics.get_counter('search.result_cache.hit'), 1)
+        assert_equal(metrics.get_counter('search.result_cache.miss'), 1)
+
+    def test_index_changes_invalidate_cache(self):
+        assert_equal(len(query('Kashmir')['results']), 0)
+        factories.ProjectFactory(title='Kashmir', is_public=True)
+        assert_equal(len(query('Kashmir')['results']), 1)
+        assert_equal(metrics.get_counter('search.result_cache.hit'), 0)
+
+    def test_single_writes_keep_cache(self):
+        project = factories.ProjectFactory(title='Rain Song', is_public=True)
+        generation = elastic_search.get_search_generation()
+        elastic_search.update_node(project)
+        elastic_search.delete_doc(project._id, project)
+        assert_equal(elastic_search.get_search_generation(), generation)
+
+    def test_generation_bump(self):
+        generation = elastic_search.get_search_generation()
+        assert_equal(elastic_search.get_search_generation(), generation)
+        elastic_search.bump_search_generation()
+        assert_not_equal(elastic_search.get_search_generation(), generation)
+
+    @mock.patch('website.search.elastic_search.settings.SEARCH_RESULT_CACHE_TIMEOUT', 0)
+    def test_cache_disabled(self):
+        query('Black Dog')
+        query('Black Dog')
+        assert_equal(metrics.get_counter('search.result_cache.hit'), 0)
+        assert_equal(metrics.get_counter('search.result_cache.miss'), 0)
+
+
+@pytest.mark.enable_search
+@pytest.mark.enable_enqueue_task
+class TestSearchMetrics(OsfTestCase):
+
+    def setUp(self):
+        super(TestSearchMetrics, self).setUp()
+        metrics.reset()
+
+    def test_search_operations_are_timed(self):
+        user = factories.UserFactory()
+        metrics.reset()
+        elastic_search.update_user(user)
+        assert_equal(metrics.get_timer('search.update_user')['count'], 1)
+
+        query('Achilles')
+        assert_equal(metrics.get_timer('search.search')['count'], 1)
@@ -5,6 +5,10 @@ import pytest
 import pytz
 import responses
 
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from framework.celery_tasks import handlers
 from framework.exceptions import PermissionsError
@@ -15,6 +19,8 @@ from website.project.model import has_anonymous_link
 from website.project.signals import contributor_added, contributor_removed, after_create_registration
 from osf.exceptions import NodeStateError
 from osf.utils import permissions
+from osf.utils.permission_cache import get_permission_cache
+from api.base.api_globals import api_globals
 from website.util import api_url_for, web_url_for
 from api_tests.utils import disconnected_from_listeners
 from website.citations.utils import datetime_to_csl
@@ -42,7 +48,9 @@ from osf.models import (
 )
 
 from addons.wiki.models import WikiPage, WikiVersion
-from osf.models.node import AbstractNodeQuerySet
+from osf.models.node import AbstractNodeQuerySet, NodeEffectiveReadPermission
+from osf.management.commands.check_node_read_permissions import find_inconsistencies
+from osf.management.commands.populate_node_read_permissions import populate_read_permissions
 from osf.exceptions import ValidationError, ValidationValueError, UserStateError
 from osf.utils.workflows import DefaultStates
 from framework.auth.core import Auth
@@ -1864,6 +1872,62 @@ class TestPermissions:
         assert project.has_permission(project.creator, 'dance') is False
 
 
+class TestRequestPermissionCache:
+
+    @pytest.fixture()
+    def get_request(self):
+        api_globals.request = RequestFactory().get('/')
+        yield api_globals.request
+        api_globals.request = None
+
+    @pytest.fixture()
+    def user(self):
+        return UserFactory()
+
+    @pytest.fixture()
+    def projects(self, user):
+        return [ProjectFactory(creator=user) for _ in range(3)]
+
+    def test_not_cached_outside_of_api_requests(self):
+        assert get_permission_cache() is None
+
+    def test_not_cached_for_unsafe_methods(self):
+        api_globals.request = RequestFactory().post('/')
+        try:
+            assert get_permission_cache() is None
+        finally:
+            api_globals.request = None
+
+    def test_permission_checks_share_one_query(self, get_request, user, projects):
+        project = projects[0]
+        with CaptureQueriesContext(connection) as ctx:
+            assert project.has_permission(user, ADMIN) is True
+            assert project.has_permission(user, WRITE) is True
+            assert project.get_permissions(user) == [READ, WRITE, ADMIN]
+            assert project.is_contributor_or_group_member(user) is True
+        assert len(ctx.captured_queries) == 1
+
+    def test_page_is_fetched_at_once(self, get_request, user, projects):
+        get_permission_cache().add_objects(projects)
+        other = UserFactory()
+        with CaptureQueriesContext(connection) as ctx:
+            for project in projects:
+                assert project.has_permission(user, ADMIN) is True
+        assert len(ctx.captured_queries) == 1
+        with CaptureQueriesContext(connection) as ctx:
+            for project in projects:
+                assert project.get_permissions(other) == []
+        assert len(ctx.captured_queries) == 1
+
+    def test_is_admin_parent_cached(self, get_request, user, projects):
+        component = NodeFactory(parent=projects[0], creator=UserFactory())
+        assert component.is_admin_parent(user) is True
+        with CaptureQueriesContext(connection) as ctx:
+            assert component.is_admin_parent(user) is True
+            assert component.can_view(Auth(user)) is True
+        assert len(ctx.captured_queries) == 0
+
+
 class TestNodeSubjects:
 
     @pytest.fixture()
@@ -4522,6 +4586,100 @@ class TestAdminImplicitRead(object):
         assert len(qs) == 2
 
 
+class TestNodeEffectiveReadPermission:
+
+    @pytest.fixture()
+    def creator(self):
+        return UserFactory()
+
+    @pytest.fixture()
+    def project(self, creator):
+        return ProjectFactory(is_public=False, creator=creator)
+
+    def readable_ids(self, user):
+        return set(NodeEffectiveReadPermission.objects.filter(user=user).values_list('node_id', flat=True))
+
+    def test_contributors(self, creator, project):
+        contrib = UserFactory()
+        assert project.id in self.readable_ids(creator)
+        assert project.id not in self.readable_ids(contrib)
+
+        project.add_contributor(contrib, permissions=READ, auth=Auth(creator), save=True)
+        assert project.id in self.readable_ids(contrib)
+
+        project.remove_contributor(contrib, auth=Auth(creator))
+        assert project.id not in self.readable_ids(contrib)
+
+    def test_implicit_admin_read(self, creator, project):
+        admin = UserFactory()
+        project.add_contributor(admin, permissions=ADMIN, auth=Auth(creator), save=True)
+        child = NodeFactory(parent=project, creator=creator)
+        grandchild = NodeFactory(parent=child, creator=creator)
+        assert {project.id, child.id, grandchild.id} <= self.readable_ids(admin)
+        assert not NodeEffectiveReadPermission.objects.get(user=admin, node=child).explicit
+
+        project.update_contributor(admin, permission=WRITE, visible=True, auth=Auth(creator), save=True)
+        assert self.readable_ids(admin) == {project.id}
+
+    def test_osf_group_members(self, creator, project):
+        manager = UserFactory()
+        member = UserFactory()
+        osf_group = OSFGroupFactory(creator=manager)
+        project.add_osf_group(osf_group, READ)
+        assert project.id in self.readable_ids(manager)
+
+        osf_group.make_member(member)
+        assert project.id in self.readable_ids(member)
+
+        osf_group.remove_member(member)
+        assert project.id not in self.readable_ids(member)
+
+    def test_matches_permission_queries(self, creator, project):
+        admin = UserFactory()
+        project.add_contributor(admin, permissions=ADMIN, auth=Auth(creator), save=True)
+        child = NodeFactory(parent=project, creator=UserFactory())
+        NodeFactory(parent=child, creator=UserFactory())
+        osf_group = OSFGroupFactory(creator=admin)
+        ProjectFactory(creator=UserFactory()).add_osf_group(osf_group, WRITE)
+        ProjectFactory(is_public=True)
+
+        for user in [creator, admin, UserFactory()]:
+            with mock.patch('osf.models.node.settings.USE_NODE_READ_PERMISSION_TABLE', True):
+                from_table = set(Node.objects.can_view(user))
+                nodes_for_user = set(AbstractNode.objects.get_nodes_for_user(user))
+            with mock.patch('osf.models.node.settings.USE_NODE_READ_PERMISSION_TABLE', False):
+                assert from_table == set(Node.objects.can_view(user))
+                assert nodes_for_user == set(AbstractNode.objects.get_nodes_for_user(user))
+
+    def test_check_node_read_permissions_command(self, creator, project):
+        child = NodeFactory(parent=project, creator=creator)
+        assert find_inconsistencies() == []
+
+        NodeEffectiveReadPermission.objects.filter(node=child).delete()
+        NodeEffectiveReadPermission.objects.create(user=UserFactory(), node=project)
+        assert len(find_inconsistencies()) == 2
+        assert len(find_inconsistencies([creator.id])) == 1
+
+        call_command('check_node_read_permissions', '--fix')
+        assert find_inconsistencies() == []
+
+        NodeEffectiveReadPermission.objects.all().delete()
+        call_command('check_node_read_permissions', '--rebuild')
+        assert find_inconsistencies() == []
+        assert child.id in self.readable_ids(creator)
+
+    def test_populate_node_read_permissions(self, creator, project):
+        child = NodeFactory(parent=project, creator=creator)
+        NodeEffectiveReadPermission.objects.all().delete()
+
+        assert populate_read_permissions(batch_size=1, dry_run=True) > 0
+        assert not NodeEffectiveReadPermission.objects.exists()
+
+        populate_read_permissions(batch_size=1)
+        assert find_inconsistencies() == []
+        assert child.id in self.readable_ids(creator)
+
+
 class TestNodeProperties:
     def test_has_linked_published_preprints(self, project, preprint, user):
         # If no preprints, is False
@@ -1,9 +1,20 @@
+import datetime
+import time
+
+import mock
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
+from api.caching.utils import session_cache
 from framework.sessions import utils
+from framework.sessions.backends import lru
 from tests.base import DbTestCase
 from osf_tests.factories import SessionFactory, UserFactory
+from osf.management.commands.migrate_sessions_to_cache import migrate_sessions
 from osf.models import OSFUser, Session
+from website import settings
 
 @pytest.mark.django_db
 class TestSession:
@@ -74,3 +85,134 @@ class SessionUtilsTestCase(DbTestCase):
         assert Session.objects.all().count() == 1
         utils.remove_session(session)
         assert Session.objects.all().count() == 0
+
+
+@pytest.fixture()
+def cache_backend():
+    with mock.patch.object(settings, 'SESSION_BACKEND', 'cache'), \
+            mock.patch.object(settings, 'SESSION_BACKEND_DATABASE_FALLBACK', False):
+        yield session_cache
+    session_cache.clear()
+
+
+@pytest.mark.django_db
+class TestCacheSessionBackend:
+
+    def test_sessions_are_saved_to_the_cache(self, cache_backend):
+        session = Session(data={'auth_user_id': 'abc12'})
+        session.save()
+
+        assert Session.objects.count() == 0
+        loaded = Session.load(session._id)
+        assert loaded.data == {'auth_user_id': 'abc12'}
+        assert loaded.created == session.created
+
+        loaded.data['visited'] = ['page']
+        loaded.save()
+        assert Session.load(session._id).data['visited'] == ['page']
+
+    def test_remove_session(self, cache_backend):
+        session = SessionFactory()
+        utils.remove_session(session)
+        assert Session.load(session._id) is None
+
+    def test_remove_sessions_for_user(self, cache_backend):
+        user = UserFactory()
+        session = SessionFactory(user=user)
+        other_session = SessionFactory(user=UserFactory())
+
+        utils.remove_sessions_for_user(user)
+        assert Session.load(session._id) is None
+        assert Session.load(other_session._id) is not None
+
+        # Logging in again afterwards works
+        new_session = SessionFactory(user=user)
+        assert Session.load(new_session._id) is not None
+
+    def test_database_fallback(self, cache_backend):
+        with mock.patch.object(settings, 'SESSION_BACKEND', 'database'):
+            session = SessionFactory(user=UserFactory())
+
+        assert Session.load(session._id) is None
+
+        with mock.patch.object(settings, 'SESSION_BACKEND_DATABASE_FALLBACK', True):
+            assert Session.load(session._id).data == session.data
+            Session.objects.all().delete()
+            assert Session.load(session._id).data == session.data
+
+    def test_migrate_sessions_to_cache(self, cache_backend):
+        with mock.patch.object(settings, 'SESSION_BACKEND', 'database'):
+            session = SessionFactory(user=UserFactory())
+            expired = SessionFactory()
+        Session.objects.filter(id=expired.id).update(modified=timezone.now() - datetime.timedelta(seconds=settings.OSF_SESSION_TIMEOUT + 1))
+
+        assert migrate_sessions(dry_run=True) == 1
+        assert Session.load(session._id) is None
+
+        assert migrate_sessions() == 1
+        assert Session.load(session._id).data == session.data
+        assert Session.load(expired._id) is None
+        assert migrate_sessions() == 0
+
+    def test_cookie_login(self, cache_backend):
+        user = UserFactory()
+        cookie = user.get_or_create_cookie()
+        assert Session.objects.count() == 0
+        assert OSFUser.from_cookie(cookie) == user
+
+    def test_cookie_reuses_latest_session(self, cache_backend):
+        user = UserFactory()
+        cookie = user.get_or_create_cookie()
+        assert user.get_or_create_cookie() == cookie
+
+        utils.remove_sessions_for_user(user)
+        new_cookie = user.get_or_create_cookie()
+        assert new_cookie != cookie
+        assert OSFUser.from_cookie(new_cookie) == user
+
+
+@pytest.mark.django_db
+class TestSessionLRU:
+
+    @pytest.fixture(autouse=True)
+    def lru_enabled(self):
+        with mock.patch.object(settings, 'SESSION_LRU_TIMEOUT', 60):
+            yield
+        lru.clear()
+
+    def test_loaded_sessions_are_remembered(self):
+        session = SessionFactory(user=UserFactory())
+        Session.load(session._id)
+
+        with CaptureQueriesContext(connection) as ctx:
+            loaded = Session.load(session._id)
+        assert len(ctx.captured_queries) == 0
+        assert loaded.data == session.data
+
+        # Modifying the loaded copy neither leaks into the LRU nor creates another row
+        loaded.data['visited'] = ['page']
+        loaded.save()
+        assert Session.objects.count() == 1
+        assert Session.load(session._id).data['visited'] == ['page']
+
+    def test_removed_sessions_are_forgotten(self):
+        user = UserFactory()
+        session = SessionFactory(user=user)
+        other_session = SessionFactory(user=user)
+        Session.load(session._id)
+        Session.load(other_session._id)
+
+        utils.remove_session(session)
+        assert Session.load(session._id) is None
+
+        utils.remove_sessions_for_user(user)
+        assert Session.load(other_session._id) is None
+
+    def test_entries_expire(self):
+        session = SessionFactory()
+        Session.load(session._id)
+        Session.objects.filter(id=session.id).delete()
+
+        with mock.patch.object(settings, 'SESSION_LRU_TIMEOUT', 0.01):
+            time.sleep(0.02)
+            assert Session.load(session._id) is None
@@ -182,8 +182,12 @@ def celery_beat(ctx, level='debug', schedule=None):
     ctx.run(bin_prefix(cmd), pty=True)
 
 @task
-def migrate_search(ctx, delete=True, remove=False, index=settings.ELASTIC_INDEX):
-    """Migrate the search-enabled models."""
+def migrate_search(ctx, delete=True, remove=False, index=settings.ELASTIC_INDEX, workers=None, checkpoint_dir=None):
+    """Migrate the search-enabled models.
+
+    Pass --workers to migrate nodes, files and users in parallel; rerunning an interrupted
+    parallel migration with the same --checkpoint-dir resumes it.
+    """
     from website.app import init_app
     init_app(routes=False, set_backends=False)
     from website.search_migration.migrate import migrate
@@ -194,7 +198,7 @@ def migrate_search(ctx, delete=True, remove=False, index=settings.ELASTIC_INDEX)
     for logger in SILENT_LOGGERS:
         logging.getLogger(logger).setLevel(logging.ERROR)
 
-    migrate(delete, remove=remove, index=index)
+    migrate(delete, remove=remove, index=index, workers=int(workers) if workers else None, checkpoint_dir=checkpoint_dir)
 
 @task
 def rebuild_search(ctx):
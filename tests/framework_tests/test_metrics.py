@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+import mock
+from nose.tools import *  # noqa: F403
+
+from framework import metrics
+from website import settings
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        metrics.emit()
+
+    @mock.patch.object(settings, 'METRICS_LOG_INTERVAL', 3600)
+    @mock.patch.object(metrics, 'metrics_logger')
+    def test_summary_is_logged_once_due(self, mock_logger):
+        metrics.incr('cache.hit')
+        metrics.incr('cache.hit', 2)
+        metrics.timing('search', 10)
+        assert_false(mock_logger.info.called)
+
+        # An hour later
+        with mock.patch.object(metrics, '_window_start', metrics._window_start - 3600):
+            metrics.timing('search', 30)
+        summary = json.loads(mock_logger.info.call_args[0][0])
+        assert_equal(summary['counters'], {'cache.hit': 3})
+        assert_equal(summary['timers'], {'search': {'count': 2, 'total': 40.0, 'max': 30.0}})
+
+        # Nothing was recorded since, so there is nothing to log; the process totals keep everything
+        metrics.emit()
+        assert_equal(mock_logger.info.call_count, 1)
+        assert_equal(metrics.get_counter('cache.hit'), 3)
+        assert_equal(metrics.get_timer('search')['count'], 2)
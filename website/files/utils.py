@@ -43,8 +43,12 @@ def copy_files(src, target_node, parent=None, name=None):
                 record.save()
 
     if not src.is_file:
-        for child in src.children:
-            copy_files(child, target_node, parent=cloned)
+        if cloned.provider == 'osfstorage':
+            from addons.osfstorage.utils import copy_children
+            copy_children(src, cloned)
+        else:
+            for child in src.children:
+                copy_files(child, target_node, parent=cloned)
 
     return cloned
 
@@ -22,7 +22,7 @@ def on_preprint_updated(preprint_id, old_subjects=None, saved_fields=None):
     need_update = bool(preprint.SEARCH_UPDATE_FIELDS.intersection(saved_fields or {}))
 
     if need_update:
-        preprint.update_search()
+        preprint.update_search(saved_fields=saved_fields)
 
     if should_update_preprint_identifiers(preprint, old_subjects, saved_fields):
         update_or_create_preprint_identifiers(preprint)
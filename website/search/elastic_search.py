@@ -4,21 +4,29 @@ from __future__ import division
 
 import copy
 import functools
+import hashlib
+import json
 import logging
 import math
 import re
 import unicodedata
+import uuid
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+from framework import metrics
 from framework import sentry
 
 import six
 
 from django.apps import apps
-from django.core.paginator import Paginator
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import CharField, Count, F, Max, OuterRef, Q, Subquery
+from django.utils import timezone
 from elasticsearch2 import (ConnectionError, Elasticsearch, NotFoundError,
                            RequestError, TransportError, helpers)
 from framework.celery_tasks import app as celery_app
+from framework.celery_tasks.handlers import enqueue_task, in_request_context
 from framework.database import paginated
 from osf.models import AbstractNode
 from osf.models import OSFUser
@@ -30,6 +38,7 @@ from osf.models import Preprint
 from osf.models import SpamStatus
 from addons.wiki.models import WikiPage
 from osf.models import CollectionSubmission
+from osf.utils.permissions import READ_NODE
 from osf.utils.sanitize import unescape_entities
 from website import settings
 from website.filters import profile_image_url
@@ -72,10 +81,91 @@ NOT_ANALYZED_PROPERTY = {'type': 'string', 'index': 'not_analyzed'}
 # Perform stemming on the field it's applied to.
 ENGLISH_ANALYZER_PROPERTY = {'type': 'string', 'analyzer': 'english'}
 
+# Index prefixes of every word, so typeahead can use a plain match query instead of wildcards
+INDEX_SETTINGS = {
+    'analysis': {
+        'filter': {
+            'autocomplete_filter': {
+                'type': 'edge_ngram',
+                'min_gram': 1,
+                'max_gram': 20,
+            },
+        },
+        'analyzer': {
+            'autocomplete': {
+                'type': 'custom',
+                'tokenizer': 'standard',
+                'filter': ['lowercase', 'asciifolding', 'autocomplete_filter'],
+            },
+            'autocomplete_search': {
+                'type': 'custom',
+                'tokenizer': 'standard',
+                'filter': ['lowercase', 'asciifolding'],
+            },
+        },
+    },
+}
+
+# Users' names and social profile ids are copied here for the contributor typeahead
+AUTOCOMPLETE_PROPERTY = {
+    'type': 'string',
+    'analyzer': 'autocomplete',
+    'search_analyzer': 'autocomplete_search',
+    'include_in_all': False,
+}
+
 INDEX = settings.ELASTIC_INDEX
 
+# Node and preprint fields that appear in, or decide the visibility of, their files' search documents
+FILE_DOCUMENT_FIELDS = {
+    'title',
+    'is_public',
+    'is_deleted',
+    'deleted',
+    'spam_status',
+    'archiving',
+    'retraction',
+    'embargo',
+    'parent_node',
+    'primary_file',
+    'is_published',
+    'machine_state',
+}
+
+FILE_BULK_CHUNK_SIZE = 500
+
+SEARCH_GENERATION_KEY = 'search_generation:{}'
+SEARCH_RESULT_KEY = 'search_result:{name}:{index}:{generation}:{digest}'
+
 CLIENT = None
 
+# Bulk version of the recursive query behind AbstractNode.license: for each child node id,
+# the id of the closest ancestor's NodeLicenseRecord
+INHERITED_LICENSE_SQL = re.sub(r'\s+', ' ', """WITH RECURSIVE ascendants AS (
+        SELECT
+            R.child_id AS node_id,
+            N.node_license_id,
+            R.parent_id,
+            1 AS depth
+        FROM osf_noderelation AS R
+            JOIN osf_abstractnode AS N ON N.id = R.parent_id
+        WHERE R.is_node_link IS FALSE
+            AND R.child_id = ANY(%s)
+    UNION ALL
+        SELECT
+            D.node_id,
+            N.node_license_id,
+            R.parent_id,
+            D.depth + 1
+        FROM ascendants AS D
+            JOIN osf_noderelation AS R ON D.parent_id = R.child_id
+            JOIN osf_abstractnode AS N ON N.id = R.parent_id
+        WHERE R.is_node_link IS FALSE
+            AND D.node_license_id IS NULL
+) SELECT DISTINCT ON (node_id) node_id, node_license_id FROM ascendants
+WHERE node_license_id IS NOT NULL
+ORDER BY node_id, depth;""")
+
 
 def client():
     global CLIENT
@@ -111,10 +201,13 @@ def client():
 
 
 def requires_search(func):
+    # Every search operation reports its latency, e.g. as search.update_node
+    timed_func = metrics.timed('search.{}'.format(func.__name__))(func)
+
     def wrapped(*args, **kwargs):
         if client() is not None:
             try:
-                return func(*args, **kwargs)
+                return timed_func(*args, **kwargs)
             except ConnectionError as e:
                 raise exceptions.SearchUnavailableError(str(e))
             except NotFoundError as e:
@@ -141,8 +234,58 @@ def requires_search(func):
     return wrapped
 
 
+def get_search_generation(index=None):
+    """The current generation of ``index``. Cached search results are keyed on it, so that
+    bumping it invalidates all of them at once.
+    """
+    from api.caching.utils import search_result_cache
+    key = SEARCH_GENERATION_KEY.format(index or INDEX)
+    generation = search_result_cache.get(key)
+    if generation is None:
+        # A random value rather than a counter, so a lost key can never resurrect stale results
+        search_result_cache.add(key, uuid.uuid4().hex, None)
+        generation = search_result_cache.get(key)
+    return generation
+
+def bump_search_generation(index=None):
+    """Invalidate every cached search result for ``index``, after a bulk write or a flush of
+    the search index queue changed documents in it. Writes of single documents don't, so they
+    don't empty the cache on every save; their results may be ``SEARCH_RESULT_CACHE_TIMEOUT``
+    seconds stale.
+    """
+    from api.caching.utils import search_result_cache
+    search_result_cache.set(SEARCH_GENERATION_KEY.format(index or INDEX), uuid.uuid4().hex, None)
+
+def cached_search_result(name, index, query, compute, **params):
+    """Return ``compute()``, cached for ``SEARCH_RESULT_CACHE_TIMEOUT`` seconds under the
+    normalized ``query`` and ``params`` and the current generation of ``index``.
+    """
+    from api.caching.utils import search_result_cache
+    if not settings.SEARCH_RESULT_CACHE_TIMEOUT:
+        return compute()
+    # Serialize before computing, which may add aggregations to the query in place
+    body = json.dumps({'query': query, 'params': params}, sort_keys=True, default=str)
+    key = SEARCH_RESULT_KEY.format(
+        name=name,
+        index=index,
+        generation=get_search_generation(index),
+        digest=hashlib.sha1(body.encode('utf-8')).hexdigest(),
+    )
+    result = search_result_cache.get(key)
+    if result is not None:
+        metrics.incr('search.result_cache.hit')
+        return result
+    metrics.incr('search.result_cache.miss')
+    result = compute()
+    search_result_cache.set(key, result, settings.SEARCH_RESULT_CACHE_TIMEOUT)
+    return result
+
+
 @requires_search
 def get_aggregations(query, doc_type):
+    return cached_search_result('aggregations', INDEX, query, functools.partial(_get_aggregations, query, doc_type), doc_type=doc_type)
+
+def _get_aggregations(query, doc_type):
     query['aggregations'] = {
         'licenses': {
             'terms': {
@@ -165,6 +308,9 @@ def get_aggregations(query, doc_type):
 
 @requires_search
 def get_counts(count_query, clean=True):
+    return cached_search_result('counts', INDEX, count_query, functools.partial(_get_counts, count_query))
+
+def _get_counts(count_query):
     count_query['aggregations'] = {
         'counts': {
             'terms': {
@@ -209,6 +355,9 @@ def search(query, index=None, doc_type='_all', raw=False):
         typeAliases: the doc_types that exist in the search database
     """
     index = index or INDEX
+    return cached_search_result('search', index, query, functools.partial(_search, query, index, doc_type, raw), doc_type=doc_type, raw=raw)
+
+def _search(query, index, doc_type, raw):
     tag_query = copy.deepcopy(query)
     aggs_query = copy.deepcopy(query)
     count_query = copy.deepcopy(query)
@@ -227,8 +376,8 @@ def search(query, index=None, doc_type='_all', raw=False):
         del count_query['query']['filtered']['filter']
     except KeyError:
         pass
-    aggregations = get_aggregations(aggs_query, doc_type=doc_type)
-    counts = get_counts(count_query, index)
+    aggregations = _get_aggregations(aggs_query, doc_type=doc_type)
+    counts = _get_counts(count_query)
 
     # Run the real query and get the results
     raw_results = client().search(index=index, doc_type=doc_type, body=query)
@@ -244,16 +393,26 @@ def search(query, index=None, doc_type='_all', raw=False):
     return return_value
 
 def format_results(results):
-    ret = []
+    return list(iter_format_results(results))
+
+def iter_format_results(results):
+    """Format search hits lazily. The parents of every node and file hit are loaded up front
+    with a single query, so formatting a page costs the same number of queries at any size.
+    """
+    results = list(results)
+    parents = load_parents(
+        result.get('parent_id') for result in results
+        if result.get('category') in {'file', 'project', 'component', 'registration'}
+    )
     for result in results:
         if result.get('category') == 'user':
             result['url'] = '/profile/' + result['id']
         elif result.get('category') == 'file':
-            parent_info = load_parent(result.get('parent_id'))
+            parent_info = parents.get(result.get('parent_id'))
             result['parent_url'] = parent_info.get('url') if parent_info else None
             result['parent_title'] = parent_info.get('title') if parent_info else None
         elif result.get('category') in {'project', 'component', 'registration'}:
-            result = format_result(result, result.get('parent_id'))
+            result = format_result(result, result.get('parent_id'), parents=parents)
         elif result.get('category') in {'preprint'}:
             result = format_preprint_result(result)
         elif result.get('category') == 'collectionSubmission':
@@ -261,11 +420,10 @@ def format_results(results):
         elif not result.get('category'):
             continue
 
-        ret.append(result)
-    return ret
+        yield result
 
-def format_result(result, parent_id=None):
-    parent_info = load_parent(parent_id)
+def format_result(result, parent_id=None, parents=None):
+    parent_info = parents.get(parent_id) if parents is not None else load_parent(parent_id)
     formatted_result = {
         'contributors': result['contributors'],
         'groups': result.get('groups'),
@@ -324,15 +482,25 @@ def format_preprint_result(result):
 
 
 def load_parent(parent_id):
-    parent = AbstractNode.load(parent_id)
-    if parent and parent.is_public:
-        return {
+    return load_parents([parent_id]).get(parent_id)
+
+
+def load_parents(parent_ids):
+    """Load the parent info of each of ``parent_ids`` with one query. Parents that do not
+    exist or are not public are left out.
+    """
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id}
+    if not parent_ids:
+        return {}
+    return {
+        parent._id: {
             'title': parent.title,
             'url': parent.url,
             'id': parent._id,
             'is_registation': parent.is_registration,
         }
-    return None
+        for parent in AbstractNode.objects.filter(guids___id__in=parent_ids, is_public=True)
+    }
 
 
 COMPONENT_CATEGORIES = set(settings.NODE_CATEGORY_MAP.keys())
@@ -345,7 +513,7 @@ def get_doctype_from_node(node):
         return 'group'
     if node.is_registration:
         return 'registration'
-    elif node.parent_node is None:
+    elif node.parent_id is None:
         # ElasticSearch categorizes top-level projects differently than children
         return 'project'
     elif node.category in COMPONENT_CATEGORIES:
@@ -354,20 +522,20 @@ def get_doctype_from_node(node):
         return node.category
 
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_node_async(self, node_id, index=None, bulk=False):
+def update_node_async(self, node_id, index=None, bulk=False, reindex_files=True):
     AbstractNode = apps.get_model('osf.AbstractNode')
     node = AbstractNode.load(node_id)
     try:
-        update_node(node=node, index=index, bulk=bulk, async_update=True)
+        update_node(node=node, index=index, bulk=bulk, async_update=True, reindex_files=reindex_files)
     except Exception as exc:
         self.retry(exc=exc)
 
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_preprint_async(self, preprint_id, index=None, bulk=False):
+def update_preprint_async(self, preprint_id, index=None, bulk=False, reindex_files=True):
     Preprint = apps.get_model('osf.Preprint')
     preprint = Preprint.load(preprint_id)
     try:
-        update_preprint(preprint=preprint, index=index, bulk=bulk, async_update=True)
+        update_preprint(preprint=preprint, index=index, bulk=bulk, async_update=True, reindex_files=reindex_files)
     except Exception as exc:
         self.retry(exc=exc)
 
@@ -389,36 +557,33 @@ def update_user_async(self, user_id, index=None):
     except Exception as exc:
         self.retry(exc)
 
-def serialize_node(node, category):
-    parent_id = node.parent_id
-
+def _serialize_node_document(node, category, contributors, groups, tags, affiliated_institutions, license, wikis):
     try:
         normalized_title = six.u(node.title)
     except TypeError:
         normalized_title = node.title
     normalized_title = unicodedata.normalize('NFKD', normalized_title)
-    elastic_document = {
+    return {
         'id': node._id,
         'contributors': [
             {
                 'fullname': x['fullname'],
                 'url': '/{}/'.format(x['guids___id']) if x['is_active'] else None
             }
-            for x in node._contributors.filter(contributor__visible=True).order_by('contributor___order')
-            .values('fullname', 'guids___id', 'is_active')
+            for x in contributors
         ],
         'groups': [
             {
                 'name': x['name'],
                 'url': '/{}/'.format(x['_id'])
             }
-            for x in node.osf_groups.values('name', '_id')
+            for x in groups
         ],
         'title': node.title,
         'normalized_title': normalized_title,
         'category': category,
         'public': node.is_public,
-        'tags': list(node.tags.filter(system=False).values_list('name', flat=True)),
+        'tags': tags,
         'description': node.description,
         'url': node.url,
         'is_registration': node.is_registration,
@@ -428,20 +593,156 @@ def serialize_node(node, category):
         'embargo_end_date': node.embargo_end_date.strftime('%A, %b. %d, %Y') if node.embargo_end_date else False,
         'is_pending_embargo': node.is_pending_embargo,
         'registered_date': node.registered_date,
-        'wikis': {},
-        'parent_id': parent_id,
+        'wikis': wikis,
+        'parent_id': node.parent_id,
         'date_created': node.created,
-        'license': serialize_node_license_record(node.license),
-        'affiliated_institutions': list(node.affiliated_institutions.values_list('name', flat=True)),
+        'license': serialize_node_license_record(license),
+        'affiliated_institutions': affiliated_institutions,
         'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
         'extra_search_terms': clean_splitters(node.title),
     }
+
+def serialize_node(node, category):
+    wikis = {}
     if not node.is_retracted:
-        for wiki in WikiPage.objects.get_wiki_pages_latest(node):
+        from addons.wiki.models import WikiVersion
+        versions = list(WikiPage.objects.get_wiki_pages_latest(node).select_related('wiki_page'))
+        texts = WikiVersion.get_search_texts(versions, node=node)
+        for wiki in versions:
             # '.' is not allowed in field names in ES2
-            elastic_document['wikis'][wiki.wiki_page.page_name.replace('.', ' ')] = wiki.raw_text(node)
+            wikis[wiki.wiki_page.page_name.replace('.', ' ')] = texts[wiki.id]
+
+    return _serialize_node_document(
+        node,
+        category,
+        contributors=node._contributors.filter(contributor__visible=True).order_by('contributor___order').values('fullname', 'guids___id', 'is_active'),
+        groups=node.osf_groups.order_by('id').values('name', '_id'),
+        tags=list(node.tags.filter(system=False).order_by('name').values_list('name', flat=True)),
+        affiliated_institutions=list(node.affiliated_institutions.order_by('name').values_list('name', flat=True)),
+        license=node.license,
+        wikis=wikis,
+    )
 
-    return elastic_document
+def serialize_nodes(nodes):
+    """Bulk version of ``serialize_node``. Every relation of the given nodes is fetched with a
+    fixed number of queries, regardless of how many nodes are passed in.
+
+    :param nodes: Iterable or queryset of AbstractNodes
+    :return dict: Maps node ``id`` to the document ``serialize_node`` would produce for it
+    """
+    from osf.models import Contributor, NodeLicenseRecord, NodeRelation
+    from osf.models.node import NodeGroupObjectPermission
+    from osf.models.osf_group import OSFGroupGroupObjectPermission
+    from addons.wiki.models import WikiVersion
+
+    node_ids = [node.id for node in nodes]
+    if not node_ids:
+        return {}
+    parent_guid = NodeRelation.objects.filter(child=OuterRef('pk'), is_node_link=False).values('parent__guids___id')
+    nodes = list(
+        AbstractNode.objects.filter(id__in=node_ids)
+        .select_related('node_license__node_license', 'root__retraction', 'root__embargo', 'root__registration_approval')
+        .annotate(annotated_parent_id=Subquery(parent_guid[:1], output_field=CharField()))
+    )
+
+    contributors = defaultdict(list)
+    for contrib in (
+        Contributor.objects.filter(node_id__in=node_ids, visible=True)
+        .order_by('node_id', '_order')
+        .values('node_id', 'user__fullname', 'user__guids___id', 'user__is_active')
+    ):
+        contributors[contrib['node_id']].append({
+            'fullname': contrib['user__fullname'],
+            'guids___id': contrib['user__guids___id'],
+            'is_active': contrib['user__is_active'],
+        })
+
+    # Mirrors AbstractNode.osf_groups: the OSF groups whose member/manager auth groups have
+    # any permission to the node
+    auth_group_ids_by_node = defaultdict(set)
+    for node_id, group_id in (
+        NodeGroupObjectPermission.objects.filter(content_object_id__in=node_ids, group__name__icontains='osfgroup')
+        .values_list('content_object_id', 'group_id')
+    ):
+        auth_group_ids_by_node[node_id].add(group_id)
+    osf_groups_by_auth_group = defaultdict(list)
+    if auth_group_ids_by_node:
+        for osf_group in (
+            OSFGroupGroupObjectPermission.objects.filter(group_id__in=set().union(*auth_group_ids_by_node.values()))
+            .order_by('content_object_id')
+            .values('group_id', 'content_object_id', 'content_object__name', 'content_object___id')
+        ):
+            osf_groups_by_auth_group[osf_group['group_id']].append(osf_group)
+    groups = {}
+    for node_id, auth_group_ids in auth_group_ids_by_node.items():
+        node_groups = {}
+        for auth_group_id in auth_group_ids:
+            for osf_group in osf_groups_by_auth_group[auth_group_id]:
+                node_groups[osf_group['content_object_id']] = {
+                    'name': osf_group['content_object__name'],
+                    '_id': osf_group['content_object___id'],
+                }
+        groups[node_id] = [node_groups[group_id] for group_id in sorted(node_groups)]
+
+    tags = defaultdict(list)
+    for node_id, name in (
+        AbstractNode.tags.through.objects.filter(abstractnode_id__in=node_ids, tag__system=False)
+        .order_by('tag__name')
+        .values_list('abstractnode_id', 'tag__name')
+    ):
+        tags[node_id].append(name)
+
+    institutions = defaultdict(list)
+    for node_id, name in (
+        AbstractNode.affiliated_institutions.through.objects.filter(abstractnode_id__in=node_ids)
+        .order_by('institution__name')
+        .values_list('abstractnode_id', 'institution__name')
+    ):
+        institutions[node_id].append(name)
+
+    # Nodes without their own license inherit the closest ancestor's, see AbstractNode.license
+    inherited_license_ids = {}
+    unlicensed_ids = [node.id for node in nodes if not node.node_license_id]
+    if unlicensed_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(INHERITED_LICENSE_SQL, [unlicensed_ids])
+            inherited_license_ids = dict(cursor.fetchall())
+    inherited_licenses = NodeLicenseRecord.objects.select_related('node_license').in_bulk(set(inherited_license_ids.values()))
+
+    wikis = defaultdict(list)
+    wiki_texts = {}
+    unretracted_ids = [node.id for node in nodes if not node.is_retracted]
+    if unretracted_ids:
+        versions = list(
+            WikiVersion.objects.annotate(newest_version=Max('wiki_page__versions__identifier'))
+            .filter(identifier=F('newest_version'), wiki_page__node_id__in=unretracted_ids, wiki_page__deleted__isnull=True)
+            .select_related('wiki_page__node')
+        )
+        wiki_texts = WikiVersion.get_search_texts(versions)
+        for version in versions:
+            wikis[version.wiki_page.node_id].append(version)
+
+    documents = {}
+    for node in nodes:
+        if node.node_license_id:
+            license = node.node_license
+        else:
+            license = inherited_licenses.get(inherited_license_ids.get(node.id))
+        documents[node.id] = _serialize_node_document(
+            node,
+            get_doctype_from_node(node),
+            contributors=contributors[node.id],
+            groups=groups.get(node.id, []),
+            tags=tags[node.id],
+            affiliated_institutions=institutions[node.id],
+            license=license,
+            wikis={
+                # '.' is not allowed in field names in ES2
+                wiki.wiki_page.page_name.replace('.', ' '): wiki_texts[wiki.id]
+                for wiki in wikis[node.id]
+            },
+        )
+    return documents
 
 def serialize_preprint(preprint, category):
     try:
@@ -509,15 +810,62 @@ def serialize_group(group, category):
 
     return elastic_document
 
-@requires_search
-def update_node(node, index=None, bulk=False, async_update=False):
+def files_need_reindex(saved_fields):
+    """Whether saving ``saved_fields`` on a node or preprint can change the search documents of
+    its files. ``None`` means the saved fields are unknown, so the files are reindexed.
+    """
+    if saved_fields is None:
+        return True
+    return bool(FILE_DOCUMENT_FIELDS.intersection(saved_fields))
+
+def update_files(query, index=None):
+    """Reindex (or remove) the search documents of the osfstorage files matching ``query`` with
+    bulk requests.
+
+    :return int: Number of file documents touched
+    """
     from addons.osfstorage.models import OsfStorageFile
     index = index or INDEX
-    for file_ in paginated(OsfStorageFile, Q(target_content_type=ContentType.objects.get_for_model(type(node)), target_object_id=node.id)):
-        update_file(file_, index=index)
+    actions = (
+        serialize_file_action(file_, index=index)
+        for file_ in paginated(OsfStorageFile, query)
+    )
+    touched = 0
+    for ok, item in helpers.streaming_bulk(client(), actions, chunk_size=FILE_BULK_CHUNK_SIZE, raise_on_error=False):
+        touched += 1
+        # Deleting file documents that were never indexed 404s; that is expected
+        if not ok and item.get('delete', {}).get('status') != 404:
+            logger.error('Failed to update search document for file: {}'.format(item))
+    if touched:
+        bump_search_generation(index)
+    return touched
+
+def update_target_files(target, index=None):
+    """Reindex (or remove) the search documents of every osfstorage file of ``target`` with
+    bulk requests.
+
+    :return int: Number of file documents touched
+    """
+    touched = update_files(Q(target_content_type=ContentType.objects.get_for_model(type(target)), target_object_id=target.id), index=index)
+    metrics.incr('search.update_target_files.file_docs', touched)
+    logger.debug('Updated {} file search documents for {}'.format(touched, target._id))
+    return touched
 
+def node_is_indexable(node):
     is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if node.is_deleted or not node.is_public or node.archiving or node.is_spam or (node.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node:
+    return not (node.is_deleted or not node.is_public or node.archiving or node.is_spam or (node.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node)
+
+def preprint_is_indexable(preprint):
+    is_qa_preprint = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(preprint.tags.all().values_list('name', flat=True))) or any(substring in preprint.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
+    return not (not preprint.verified_publishable or preprint.is_spam or (preprint.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or is_qa_preprint)
+
+@requires_search
+def update_node(node, index=None, bulk=False, async_update=False, reindex_files=True):
+    index = index or INDEX
+    if reindex_files:
+        update_target_files(node, index=index)
+
+    if not node_is_indexable(node):
         delete_doc(node._id, node, index=index)
     else:
         category = get_doctype_from_node(node)
@@ -528,14 +876,12 @@ def update_node(node, index=None, bulk=False, async_update=False):
             client().index(index=index, doc_type=category, id=node._id, body=elastic_document, refresh=True)
 
 @requires_search
-def update_preprint(preprint, index=None, bulk=False, async_update=False):
-    from addons.osfstorage.models import OsfStorageFile
+def update_preprint(preprint, index=None, bulk=False, async_update=False, reindex_files=True):
     index = index or INDEX
-    for file_ in paginated(OsfStorageFile, Q(target_content_type=ContentType.objects.get_for_model(type(preprint)), target_object_id=preprint.id)):
-        update_file(file_, index=index)
+    if reindex_files:
+        update_target_files(preprint, index=index)
 
-    is_qa_preprint = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(preprint.tags.all().values_list('name', flat=True))) or any(substring in preprint.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if not preprint.verified_publishable or preprint.is_spam or (preprint.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or is_qa_preprint:
+    if not preprint_is_indexable(preprint):
         delete_doc(preprint._id, preprint, category='preprint', index=index)
     else:
         category = 'preprint'
@@ -581,7 +927,197 @@ def bulk_update_nodes(serialize, nodes, index=None, category=None):
                 'doc_as_upsert': True,
             })
     if actions:
-        return helpers.bulk(client(), actions)
+        result = helpers.bulk(client(), actions)
+        bump_search_generation(index)
+        return result
+
+def get_delete_doctype(node):
+    if isinstance(node, Preprint):
+        return 'preprint'
+    if isinstance(node, OSFGroup):
+        return 'group'
+    if node.is_registration:
+        return 'registration'
+    return node.project_or_component
+
+def get_queued_actions(obj, index=None, reindex_files=True, elastic_document=None):
+    """Build the bulk actions that bring the search document for a queued node,
+    preprint or group up to date. Files are reindexed separately, and only if
+    ``reindex_files`` is set. ``elastic_document`` may be passed in if the object
+    was already serialized in bulk.
+    """
+    index = index or INDEX
+    if isinstance(obj, OSFGroup):
+        return [{
+            '_op_type': 'index',
+            '_index': index,
+            '_id': obj._id,
+            '_type': 'group',
+            '_source': serialize_group(obj, 'group'),
+        }]
+
+    if reindex_files:
+        update_target_files(obj, index=index)
+    if isinstance(obj, Preprint):
+        indexable = preprint_is_indexable(obj)
+    else:
+        indexable = node_is_indexable(obj)
+
+    if not indexable:
+        return [{
+            '_op_type': 'delete',
+            '_index': index,
+            '_id': obj._id,
+            '_type': get_delete_doctype(obj),
+        }]
+    if isinstance(obj, Preprint):
+        category = 'preprint'
+        elastic_document = serialize_preprint(obj, category)
+    else:
+        category = get_doctype_from_node(obj)
+        elastic_document = elastic_document or serialize_node(obj, category)
+    return [{
+        '_op_type': 'index',
+        '_index': index,
+        '_id': obj._id,
+        '_type': category,
+        '_source': elastic_document,
+    }]
+
+def bulk_write(actions, index, refresh=False):
+    """Send ``actions`` to ``index`` with one bulk request."""
+    # Deleting documents that were never indexed 404s; that is expected, not an error
+    _, errors = helpers.bulk(client(), actions, refresh=refresh, raise_on_error=False)
+    errors = [error for error in errors if error.get('delete', {}).get('status') != 404]
+    if errors:
+        raise exceptions.BulkUpdateError(errors)
+    bump_search_generation(index)
+
+@requires_search
+def bulk_update_node_documents(nodes, index=None):
+    """Bring the search documents of ``nodes`` and their files up to date with one bulk request,
+    serializing every node at once with ``serialize_nodes``.
+    """
+    index = index or INDEX
+    nodes = list(nodes)
+    documents = serialize_nodes(nodes)
+    actions = []
+    for node in nodes:
+        actions.extend(get_queued_actions(node, index=index, elastic_document=documents.get(node.id)))
+    if actions:
+        bulk_write(actions, index, refresh=True)
+
+def get_deleted_actions(model, document_id, index=None):
+    """Build the bulk actions that delete the search document of a queued object that no longer
+    exists. Its doctype cannot be looked up anymore, so the document is deleted under every
+    doctype the model is indexed as.
+    """
+    index = index or INDEX
+    if issubclass(model, Preprint):
+        doctypes = ['preprint']
+    elif issubclass(model, OSFGroup):
+        doctypes = ['group']
+    else:
+        doctypes = ['project', 'component', 'registration']
+    return [{
+        '_op_type': 'delete',
+        '_index': index,
+        '_id': document_id,
+        '_type': doctype,
+    } for doctype in doctypes]
+
+def enqueue_update(obj, reindex_files=True, flush_countdown=None):
+    """Queue ``obj`` for bulk reindexing instead of indexing it right away.
+
+    With celery, the first save of an object schedules a flush once the debounce window has
+    passed; later saves only push that window back. Without celery, the queue is flushed
+    immediately, mirroring the synchronous behavior of ``update_node_async``.
+    """
+    PendingSearchUpdate = apps.get_model('osf.PendingSearchUpdate')
+    created = PendingSearchUpdate.enqueue(obj, reindex_files=reindex_files)
+    if settings.USE_CELERY:
+        if created:
+            countdown = settings.SEARCH_INDEX_QUEUE_DEBOUNCE.total_seconds() if flush_countdown is None else flush_countdown
+            signature = flush_search_index_queue.si().set(countdown=countdown)
+            if in_request_context():
+                enqueue_task(signature)
+            else:
+                # enqueue_task would run the flush right away, before the debounce window has
+                # passed, and the flush would skip the entry that was just queued
+                signature.apply_async()
+    else:
+        flush_pending_updates(debounce=0, refresh=True)
+
+@requires_search
+def flush_pending_updates(index=None, debounce=None, max_wait=None, batch_size=None, refresh=False):
+    """Reindex queued objects whose last save is older than ``debounce`` (or whose first save
+    is older than ``max_wait``) with one bulk request, and remove them from the queue.
+
+    :return int: Number of queued objects flushed
+    """
+    PendingSearchUpdate = apps.get_model('osf.PendingSearchUpdate')
+    index = index or INDEX
+    debounce = settings.SEARCH_INDEX_QUEUE_DEBOUNCE if debounce is None else debounce
+    max_wait = settings.SEARCH_INDEX_QUEUE_MAX_WAIT if max_wait is None else max_wait
+    batch_size = batch_size or settings.SEARCH_INDEX_QUEUE_BATCH_SIZE
+    if not isinstance(debounce, timedelta):
+        debounce = timedelta(seconds=debounce)
+    if not isinstance(max_wait, timedelta):
+        max_wait = timedelta(seconds=max_wait)
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Rows stay locked until the bulk request succeeds, so a failed flush leaves them queued
+        # and concurrent flushes skip them instead of indexing the same objects twice
+        entries = list(
+            PendingSearchUpdate.objects.select_for_update(skip_locked=True)
+            .filter(Q(modified__lte=now - debounce) | Q(created__lte=now - max_wait))
+            .order_by('created')
+            .values_list('id', 'content_type_id', 'object_id', 'reindex_files', 'document_id')[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        reindex_files_by_type = defaultdict(dict)
+        document_ids_by_type = defaultdict(dict)
+        for _, content_type_id, object_id, reindex_files, document_id in entries:
+            reindex_files_by_type[content_type_id][object_id] = reindex_files
+            document_ids_by_type[content_type_id][object_id] = document_id
+
+        actions = []
+        for content_type_id, reindex_files_by_id in reindex_files_by_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            objs = list(model.objects.filter(id__in=reindex_files_by_id.keys()))
+            documents = {}
+            if issubclass(model, AbstractNode):
+                documents = serialize_nodes(objs)
+            for obj in objs:
+                actions.extend(get_queued_actions(
+                    obj,
+                    index=index,
+                    reindex_files=reindex_files_by_id[obj.id],
+                    elastic_document=documents.get(obj.id),
+                ))
+            # Objects deleted from the database since they were queued
+            found = {obj.id for obj in objs}
+            for object_id, document_id in document_ids_by_type[content_type_id].items():
+                if object_id not in found and document_id:
+                    actions.extend(get_deleted_actions(model, document_id, index=index))
+
+        if actions:
+            bulk_write(actions, index, refresh=refresh)
+        PendingSearchUpdate.objects.filter(id__in=[entry[0] for entry in entries]).delete()
+    return len(entries)
+
+@celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
+def flush_search_index_queue(self, debounce=None, refresh=False):
+    try:
+        flushed = flush_pending_updates(debounce=debounce, refresh=refresh)
+    except Exception as exc:
+        self.retry(exc=exc)
+    # A full batch means more work is probably waiting; keep draining
+    if flushed >= settings.SEARCH_INDEX_QUEUE_BATCH_SIZE:
+        flush_search_index_queue.si(debounce=debounce, refresh=refresh).apply_async()
 
 def serialize_cgm_contributor(contrib):
     return {
@@ -636,6 +1172,7 @@ def bulk_update_cgm(cgms, actions=None, op='update', index=None):
         helpers.bulk(client(), actions or [], refresh=True, raise_on_error=False)
     except helpers.BulkIndexError as e:
         raise exceptions.BulkUpdateError(e.errors)
+    bump_search_generation(index)
 
 def serialize_contributors(node):
     return {
@@ -652,15 +1189,139 @@ def serialize_contributors(node):
 bulk_update_contributors = functools.partial(bulk_update_nodes, serialize_contributors)
 
 
+def get_contributor_update_querysets(user):
+    """The nodes and preprints whose search documents list ``user`` as a contributor, by
+    document type.
+    """
+    return OrderedDict([
+        # If search updated so group member names are displayed on project search results,
+        # then update nodes that the user has group membership as well
+        ('node', user.visible_contributor_to),
+        ('preprint', Preprint.objects.filter(preprintcontributor__user=user, preprintcontributor__visible=True, deleted__isnull=True)),
+    ])
+
+def get_contributor_update_actions(doc_type, ids, index=None):
+    """Build partial update actions that rewrite only the contributor lists of the search
+    documents for the nodes or preprints with primary keys ``ids``, and of the collection
+    submissions of those objects. Contributors are loaded with one query per document type.
+    """
+    from osf.models import Contributor, NodeRelation, PreprintContributor
+    index = index or INDEX
+    contributors = defaultdict(list)
+    if doc_type == 'preprint':
+        model = Preprint
+        contribs = (
+            PreprintContributor.objects.filter(preprint_id__in=ids, visible=True)
+            .order_by('preprint_id', '_order')
+            .values_list('preprint_id', 'user__fullname', 'user__guids___id', 'user__is_active')
+        )
+    else:
+        model = AbstractNode
+        contribs = (
+            Contributor.objects.filter(node_id__in=ids, visible=True)
+            .order_by('node_id', '_order')
+            .values_list('node_id', 'user__fullname', 'user__guids___id', 'user__is_active')
+        )
+    for obj_id, fullname, guid, is_active in contribs:
+        contributors[obj_id].append({'fullname': fullname, 'guids___id': guid, 'is_active': is_active})
+
+    actions = []
+    if doc_type == 'preprint':
+        for preprint_id, _id in Preprint.objects.filter(id__in=ids).values_list('id', 'guids___id'):
+            actions.append({
+                '_op_type': 'update',
+                '_index': index,
+                '_id': _id,
+                '_type': 'preprint',
+                'doc': {'contributors': [serialize_cgm_contributor(contrib) for contrib in contributors[preprint_id]]},
+            })
+    else:
+        parent_guid = NodeRelation.objects.filter(child=OuterRef('pk'), is_node_link=False).values('parent__guids___id')
+        nodes = AbstractNode.objects.filter(id__in=ids).annotate(annotated_parent_id=Subquery(parent_guid[:1], output_field=CharField()))
+        for node in nodes:
+            # Mirrors serialize_contributors: node documents only list active contributors
+            actions.append({
+                '_op_type': 'update',
+                '_index': index,
+                '_id': node._id,
+                '_type': get_doctype_from_node(node),
+                'doc': {'contributors': [
+                    {'fullname': contrib['fullname'], 'url': '/{}/'.format(contrib['guids___id'])}
+                    for contrib in contributors[node.id] if contrib['is_active']
+                ]},
+            })
+
+    cgms = CollectionSubmission.objects.filter(
+        guid__content_type=ContentType.objects.get_for_model(model),
+        guid__object_id__in=ids,
+        collection__provider__isnull=False,
+        collection__deleted__isnull=True,
+        collection__is_bookmark_collection=False,
+    ).values_list('guid__object_id', 'guid___id', 'collection__guids___id').distinct()
+    for obj_id, guid, collection_guid in cgms:
+        actions.append({
+            '_op_type': 'update',
+            '_index': index,
+            '_id': '{}-{}'.format(guid, collection_guid),
+            '_type': 'collectionSubmission',
+            'doc': {'contributors': [serialize_cgm_contributor(contrib) for contrib in contributors[obj_id]]},
+        })
+    return actions
+
+@requires_search
+def propagate_contributor_update(user, doc_type, after_id=0, chunk_size=None, index=None):
+    """Rewrite the contributor lists of the next ``chunk_size`` search documents of ``doc_type``
+    (plus their collection submissions) that ``user`` is a visible contributor to, starting
+    after primary key ``after_id``.
+
+    :return tuple: Number of documents touched, and the last primary key handled (``None`` once
+        every object of ``doc_type`` has been handled)
+    """
+    chunk_size = chunk_size or settings.SEARCH_CONTRIBUTOR_UPDATE_CHUNK_SIZE
+    queryset = get_contributor_update_querysets(user)[doc_type]
+    ids = list(queryset.filter(id__gt=after_id).order_by('id').values_list('id', flat=True).distinct()[:chunk_size])
+    if not ids:
+        return 0, None
+
+    actions = get_contributor_update_actions(doc_type, ids, index=index)
+    _, errors = helpers.bulk(client(), actions, chunk_size=FILE_BULK_CHUNK_SIZE, raise_on_error=False)
+    # Private, deleted or otherwise unindexed objects have no document to update; that is expected
+    errors = [error for error in errors if error.get('update', {}).get('status') != 404]
+    if errors:
+        raise exceptions.BulkUpdateError(errors)
+    bump_search_generation(index)
+    metrics.incr('search.update_contributors.docs', len(actions))
+    return len(actions), ids[-1]
+
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_contributors_async(self, user_id):
+def update_contributors_async(self, user_id, doc_type=None, after_id=0, updated=0):
+    """Propagate a user's name to the search documents they are listed on, one chunk at a
+    time. With celery, each chunk re-enqueues the task for the next one, so a prolific user
+    never ties up a worker for long and a failure only retries the chunk that failed.
+    """
     OSFUser = apps.get_model('osf.OSFUser')
     user = OSFUser.objects.get(id=user_id)
-    # If search updated so group member names are displayed on project search results,
-    # then update nodes that the user has group membership as well
-    p = Paginator(user.visible_contributor_to.order_by('id'), 100)
-    for page_num in p.page_range:
-        bulk_update_contributors(p.page(page_num).object_list)
+    doc_types = list(get_contributor_update_querysets(user))
+    doc_type = doc_type or doc_types[0]
+    while doc_type:
+        try:
+            count, after_id = propagate_contributor_update(user, doc_type, after_id=after_id) or (0, None)
+        except Exception as exc:
+            self.retry(exc=exc)
+        updated += count
+        if after_id is None:
+            next_index = doc_types.index(doc_type) + 1
+            doc_type = doc_types[next_index] if next_index < len(doc_types) else None
+            after_id = 0
+
+        progress = {'user': user._id, 'doc_type': doc_type, 'after_id': after_id, 'updated': updated}
+        logger.info('Contributor search update progress: {}'.format(progress))
+        if self.request.id:
+            self.update_state(state='PROGRESS', meta=progress)
+        if doc_type and settings.USE_CELERY:
+            update_contributors_async.si(user_id, doc_type=doc_type, after_id=after_id, updated=updated).apply_async()
+            return
+    return updated
 
 @requires_search
 def update_user(user, index=None):
@@ -720,10 +1381,18 @@ def update_user(user, index=None):
 
     client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
 
-@requires_search
-def update_file(file_, index=None, delete=False):
+def serialize_file_action(file_, index=None, delete=False):
+    """Return the bulk action (index or delete) that brings the search document for ``file_``
+    up to date.
+    """
     index = index or INDEX
     target = file_.target
+    delete_action = {
+        '_op_type': 'delete',
+        '_index': index,
+        '_type': 'file',
+        '_id': file_._id,
+    }
 
     # TODO: Can remove 'not file_.name' if we remove all base file nodes with name=None
     file_node_is_qa = bool(
@@ -733,26 +1402,12 @@ def update_file(file_, index=None, delete=False):
     ) or any(substring in target.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
     if not file_.name or not target.is_public or delete or file_node_is_qa or getattr(target, 'is_deleted', False) or getattr(target, 'archiving', False) or target.is_spam or (
             target.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH):
-        client().delete(
-            index=index,
-            doc_type='file',
-            id=file_._id,
-            refresh=True,
-            ignore=[404]
-        )
-        return
+        return delete_action
 
     if isinstance(target, Preprint):
         if not getattr(target, 'verified_publishable', False) or target.primary_file != file_ or target.is_spam or (
                 target.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH):
-            client().delete(
-                index=index,
-                doc_type='file',
-                id=file_._id,
-                refresh=True,
-                ignore=[404]
-            )
-            return
+            return delete_action
 
     # We build URLs manually here so that this function can be
     # run outside of a Flask request context (e.g. in a celery task)
@@ -787,13 +1442,33 @@ def update_file(file_, index=None, delete=False):
         'extra_search_terms': clean_splitters(file_.name),
     }
 
-    client().index(
-        index=index,
-        doc_type='file',
-        body=file_doc,
-        id=file_._id,
-        refresh=True
-    )
+    return {
+        '_op_type': 'index',
+        '_index': index,
+        '_type': 'file',
+        '_id': file_._id,
+        '_source': file_doc,
+    }
+
+@requires_search
+def update_file(file_, index=None, delete=False):
+    action = serialize_file_action(file_, index=index, delete=delete)
+    if action['_op_type'] == 'delete':
+        client().delete(
+            index=action['_index'],
+            doc_type='file',
+            id=action['_id'],
+            refresh=True,
+            ignore=[404]
+        )
+    else:
+        client().index(
+            index=action['_index'],
+            doc_type='file',
+            body=action['_source'],
+            id=action['_id'],
+            refresh=True
+        )
 
 @requires_search
 def update_institution(institution, index=None):
@@ -841,9 +1516,9 @@ def update_cgm(cgm, op='update', index=None):
     index = index or INDEX
     if op == 'delete':
         client().delete(index=index, doc_type='collectionSubmission', id=cgm._id, refresh=True, ignore=[404])
-        return
-    collection_submission_doc = serialize_cgm(cgm)
-    client().index(index=index, doc_type='collectionSubmission', body=collection_submission_doc, id=cgm._id, refresh=True)
+    else:
+        collection_submission_doc = serialize_cgm(cgm)
+        client().index(index=index, doc_type='collectionSubmission', body=collection_submission_doc, id=cgm._id, refresh=True)
 
 @requires_search
 def delete_all():
@@ -853,6 +1528,7 @@ def delete_all():
 @requires_search
 def delete_index(index):
     client().indices.delete(index, ignore=[404])
+    bump_search_generation(index)
 
 
 @requires_search
@@ -865,7 +1541,7 @@ def create_index(index=None):
     project_like_types = ['project', 'component', 'registration', 'preprint']
     analyzed_fields = ['title', 'description']
 
-    client().indices.create(index, ignore=[400])  # HTTP 400 if index already exists
+    client().indices.create(index, body={'settings': INDEX_SETTINGS}, ignore=[400])  # HTTP 400 if index already exists
     for type_ in document_types:
         if type_ == 'collectionSubmission':
             mapping = {
@@ -908,6 +1584,7 @@ def create_index(index=None):
                     'job': {
                         'type': 'string',
                         'boost': '1',
+                        'copy_to': 'autocomplete',
                     },
                     'all_jobs': {
                         'type': 'string',
@@ -916,25 +1593,36 @@ def create_index(index=None):
                     'school': {
                         'type': 'string',
                         'boost': '1',
+                        'copy_to': 'autocomplete',
                     },
                     'all_schools': {
                         'type': 'string',
                         'boost': '0.01'
                     },
+                    'user': {
+                        'type': 'string',
+                        'copy_to': 'autocomplete',
+                    },
+                    'autocomplete': AUTOCOMPLETE_PROPERTY,
                 }
                 mapping['properties'].update(fields)
+                mapping['dynamic_templates'] = [
+                    {
+                        'autocomplete_{}'.format(field): {
+                            'path_match': '{}.*'.format(field),
+                            'match_mapping_type': 'string',
+                            'mapping': {'type': 'string', 'copy_to': 'autocomplete'},
+                        },
+                    }
+                    for field in ['names', 'social']
+                ]
         client().indices.put_mapping(index=index, doc_type=type_, body=mapping, ignore=[400, 404])
 
 @requires_search
 def delete_doc(elastic_document_id, node, index=None, category=None):
     index = index or INDEX
     if not category:
-        if isinstance(node, Preprint):
-            category = 'preprint'
-        elif node.is_registration:
-            category = 'registration'
-        else:
-            category = node.project_or_component
+        category = get_delete_doctype(node)
     client().delete(index=index, doc_type=category, id=elastic_document_id, refresh=True, ignore=[404])
 
 @requires_search
@@ -942,6 +1630,43 @@ def delete_group_doc(deleted_id, index=None):
     index = index or INDEX
     client().delete(index=index, doc_type='group', id=deleted_id, refresh=True, ignore=[404])
 
+def get_projects_in_common_counts(current_user, users):
+    """Batched ``current_user.n_projects_in_common(user)`` for each of ``users``, with one
+    query.
+
+    :return dict: Number of projects in common, by user primary key (users with none are omitted)
+    """
+    from osf.models.node import NodeGroupObjectPermission
+    counts = (
+        NodeGroupObjectPermission.objects.filter(
+            permission__codename=READ_NODE,
+            content_object_id__in=current_user.contributor_or_group_member_to.values('id'),
+            group__user__in=[user.id for user in users],
+        )
+        .values('group__user')
+        .annotate(count=Count('content_object_id', distinct=True))
+        .values_list('group__user', 'count')
+    )
+    return dict(counts)
+
+# Indices known to map the autocomplete field of user documents
+_autocomplete_indices = set()
+
+def has_autocomplete_field(index):
+    """Whether the user documents of the index have the autocomplete field, which indices created
+    before it existed lack until they are migrated.
+    """
+    if index in _autocomplete_indices:
+        return True
+    mappings = client().indices.get_field_mapping(index=index, doc_type='user', fields='autocomplete', ignore=[404])
+    if any(
+        'autocomplete' in index_mappings.get('mappings', {}).get('user', {})
+        for index_mappings in mappings.values() if isinstance(index_mappings, dict)
+    ):
+        _autocomplete_indices.add(index)
+        return True
+    return False
+
 @requires_search
 def search_contributor(query, page=0, size=10, exclude=None, current_user=None):
     """Search for contributors to add to a project using elastic search. Request must
@@ -970,29 +1695,50 @@ def search_contributor(query, page=0, size=10, exclude=None, current_user=None):
         normalized_items.append(normalized_item)
     items = normalized_items
 
-    query = '  AND '.join('{}*~'.format(re.escape(item)) for item in items) + \
-            ''.join(' NOT id:"{}"'.format(excluded._id) for excluded in exclude)
+    if settings.SEARCH_CONTRIBUTOR_AUTOCOMPLETE and has_autocomplete_field(INDEX):
+        # Typeahead fast path: a single request against the edge n-gram autocomplete field
+        must_not = [{'ids': {'values': [excluded._id for excluded in exclude]}}] if exclude else []
+        raw_results = client().search(index=INDEX, doc_type='user', body={
+            'query': {
+                'bool': {
+                    'must': {'match': {'autocomplete': {'query': ' '.join(items), 'operator': 'and'}}},
+                    'must_not': must_not,
+                },
+            },
+            'from': start,
+            'size': size,
+            '_source': ['id', 'user'],
+        })
+        docs = [hit['_source'] for hit in raw_results['hits']['hits']]
+        total = raw_results['hits']['total']
+        pages = math.ceil(total / size)
+    else:
+        query = '  AND '.join('{}*~'.format(re.escape(item)) for item in items) + \
+                ''.join(' NOT id:"{}"'.format(excluded._id) for excluded in exclude)
 
-    results = search(build_query(query, start=start, size=size), index=INDEX, doc_type='user')
-    docs = results['results']
-    pages = math.ceil(results['counts'].get('user', 0) / size)
+        results = search(build_query(query, start=start, size=size), index=INDEX, doc_type='user')
+        docs = results['results']
+        total = results['counts']['total']
+        pages = math.ceil(results['counts'].get('user', 0) / size)
     validate_page_num(page, pages)
 
+    users_by_id = {user._id: user for user in OSFUser.objects.filter(guids___id__in=[doc['id'] for doc in docs])}
+    projects_in_common = get_projects_in_common_counts(current_user, users_by_id.values()) if current_user else {}
+
     users = []
     for doc in docs:
         # TODO: use utils.serialize_user
-        user = OSFUser.load(doc['id'])
+        user = users_by_id.get(doc['id'])
+
+        if user is None:
+            logger.error('Could not load user {0}'.format(doc['id']))
+            continue
 
         if current_user and current_user._id == user._id:
             n_projects_in_common = -1
-        elif current_user:
-            n_projects_in_common = current_user.n_projects_in_common(user)
         else:
-            n_projects_in_common = 0
+            n_projects_in_common = projects_in_common.get(user.id, 0)
 
-        if user is None:
-            logger.error('Could not load user {0}'.format(doc['id']))
-            continue
         if user.is_active:  # exclude merged, unregistered, etc.
             current_employment = None
             education = None
@@ -1021,7 +1767,7 @@ def search_contributor(query, page=0, size=10, exclude=None, current_user=None):
 
     return {
         'users': users,
-        'total': results['counts']['total'],
+        'total': total,
         'pages': pages,
         'page': page,
     }
@@ -28,9 +28,12 @@ def search(query, index=None, doc_type=None, raw=None):
 def update_node(node, index=None, bulk=False, async_update=True, saved_fields=None):
     kwargs = {
         'index': index,
-        'bulk': bulk
+        'bulk': bulk,
+        'reindex_files': search_engine.files_need_reindex(saved_fields),
     }
-    if async_update:
+    if async_update and settings.SEARCH_INDEX_QUEUE_ENABLED and not index:
+        search_engine.enqueue_update(node, reindex_files=kwargs['reindex_files'])
+    elif async_update:
         node_id = node._id
         # We need the transaction to be committed before trying to run celery tasks.
         # For example, when updating a Node's privacy, is_public must be True in the
@@ -48,9 +51,12 @@ def update_node(node, index=None, bulk=False, async_update=True, saved_fields=No
 def update_preprint(preprint, index=None, bulk=False, async_update=True, saved_fields=None):
     kwargs = {
         'index': index,
-        'bulk': bulk
+        'bulk': bulk,
+        'reindex_files': search_engine.files_need_reindex(saved_fields),
     }
-    if async_update:
+    if async_update and settings.SEARCH_INDEX_QUEUE_ENABLED and not index:
+        search_engine.enqueue_update(preprint, reindex_files=kwargs['reindex_files'])
+    elif async_update:
         preprint_id = preprint._id
         # We need the transaction to be committed before trying to run celery tasks.
         if settings.USE_CELERY:
@@ -68,7 +74,9 @@ def update_group(group, index=None, bulk=False, async_update=True, saved_fields=
         'bulk': bulk,
         'deleted_id': deleted_id
     }
-    if async_update:
+    if async_update and settings.SEARCH_INDEX_QUEUE_ENABLED and not index and not deleted_id:
+        search_engine.enqueue_update(group)
+    elif async_update:
         # We need the transaction to be committed before trying to run celery tasks.
         if settings.USE_CELERY:
             enqueue_task(search_engine.update_group_async.s(group_id=group._id, **kwargs))
@@ -78,11 +86,21 @@ def update_group(group, index=None, bulk=False, async_update=True, saved_fields=
         index = index or settings.ELASTIC_INDEX
         return search_engine.update_group(group, **kwargs)
 
+@requires_search
+def flush_pending_updates(index=None, debounce=None, refresh=False):
+    index = index or settings.ELASTIC_INDEX
+    return search_engine.flush_pending_updates(index=index, debounce=debounce, refresh=refresh)
+
 @requires_search
 def bulk_update_nodes(serialize, nodes, index=None, category=None):
     index = index or settings.ELASTIC_INDEX
     search_engine.bulk_update_nodes(serialize, nodes, index=index, category=category)
 
+@requires_search
+def bulk_update_node_documents(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    search_engine.bulk_update_node_documents(nodes, index=index)
+
 @requires_search
 def delete_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -116,6 +134,11 @@ def update_file(file_, index=None, delete=False):
     index = index or settings.ELASTIC_INDEX
     search_engine.update_file(file_, index=index, delete=delete)
 
+@requires_search
+def update_files(query, index=None):
+    index = index or settings.ELASTIC_INDEX
+    return search_engine.update_files(query, index=index)
+
 @requires_search
 def update_institution(institution, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -39,8 +39,6 @@ def sql_migrate(index, sql, max_id, increment, es_args=None, **kwargs):
 
     :return int: Number of migrated objects
     """
-    if es_args is None:
-        es_args = {}
     total_pages = int(ceil(max_id / float(increment)))
     total_objs = 0
     page_start = 0
@@ -56,19 +54,29 @@ def sql_migrate(index, sql, max_id, increment, es_args=None, **kwargs):
             #       max_id == (total_pages * increment) - 1
             # and two additional objects are created during runtime.
             logger.info('Cleaning up...')
-        with connection.cursor() as cursor:
-            cursor.execute(sql.format(
-                index=index,
-                page_start=page_start,
-                page_end=page_end,
-                **kwargs))
-            ser_objs = cursor.fetchone()[0]
-            if ser_objs:
-                total_objs += len(ser_objs)
-                helpers.bulk(client(), ser_objs, **es_args)
+        total_objs += sql_migrate_page(index, sql, page_start, page_end, es_args=es_args, **kwargs)
         page_start = page_end
     return total_objs
 
+def sql_migrate_page(index, sql, page_start, page_end, es_args=None, **kwargs):
+    """ Run provided SQL for objects with page_start < id <= page_end and send output to elastic.
+
+    :return int: Number of migrated objects
+    """
+    if es_args is None:
+        es_args = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(
+            index=index,
+            page_start=page_start,
+            page_end=page_end,
+            **kwargs))
+        ser_objs = cursor.fetchone()[0]
+        if ser_objs:
+            helpers.bulk(client(), ser_objs, **es_args)
+            return len(ser_objs)
+    return 0
+
 def migrate_nodes(index, delete, increment=10000):
     logger.info('Migrating nodes to index: {}'.format(index))
     max_nid = AbstractNode.objects.last().id
@@ -190,13 +198,16 @@ def migrate_institutions(index):
     for inst in Institution.objects.filter(is_deleted=False):
         update_institution(inst, index)
 
-def migrate(delete, remove=False, index=None, app=None):
+def migrate(delete, remove=False, index=None, app=None, workers=None, checkpoint_dir=None):
     """Reindexes relevant documents in ES
 
     :param bool delete: Delete documents that should not be indexed
     :param bool remove: Removes old index after migrating
     :param str index: index alias to version and migrate
     :param App app: Flask app for context
+    :param int workers: If set, migrate nodes, files and users in parallel with this many processes
+    :param str checkpoint_dir: Directory for parallel migration checkpoints. If it holds the
+        checkpoints of an interrupted run, that run is resumed
     """
     index = index or settings.ELASTIC_INDEX
     app = app or init_app('website.settings', set_backends=True, routes=True)
@@ -208,13 +219,22 @@ def migrate(delete, remove=False, index=None, app=None):
     ctx = app.test_request_context()
     ctx.push()
 
-    new_index = set_up_index(index)
+    if workers:
+        from website.search_migration.parallel import ParallelMigration
+        parallel_migration = ParallelMigration(index, delete, workers=workers, checkpoint_dir=checkpoint_dir)
+        new_index = parallel_migration.new_index
+    else:
+        parallel_migration = None
+        new_index = set_up_index(index)
 
     if settings.ENABLE_INSTITUTIONS:
         migrate_institutions(new_index)
-    migrate_nodes(new_index, delete=delete)
-    migrate_files(new_index, delete=delete)
-    migrate_users(new_index, delete=delete)
+    if parallel_migration:
+        parallel_migration.run()
+    else:
+        migrate_nodes(new_index, delete=delete)
+        migrate_files(new_index, delete=delete)
+        migrate_users(new_index, delete=delete)
     migrate_preprints(new_index, delete=delete)
     migrate_preprint_files(new_index, delete=delete)
     migrate_collected_metadata(new_index, delete=delete)
@@ -224,6 +244,8 @@ def migrate(delete, remove=False, index=None, app=None):
 
     if remove:
         remove_old_index(new_index)
+    if parallel_migration:
+        parallel_migration.finish()
 
     ctx.pop()
 
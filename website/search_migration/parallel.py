@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Parallel, resumable variant of the SQL-based node, file and user migrations.
+
+Each document type is split into primary-key range shards that are migrated by a pool of
+worker processes. Every shard records the last id it finished in its own checkpoint file,
+so an interrupted migration can be resumed by running it again with the same checkpoint
+directory: finished shards are skipped and unfinished ones continue where they stopped.
+"""
+from __future__ import absolute_import, division
+from collections import OrderedDict
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.db import connections
+
+from osf.models import AbstractNode, BaseFileNode, OSFUser
+from website import settings
+from website.search import elastic_search
+from website.search_migration import (
+    JSON_UPDATE_NODES_SQL, JSON_DELETE_NODES_SQL,
+    JSON_UPDATE_FILES_SQL, JSON_DELETE_FILES_SQL,
+    JSON_UPDATE_USERS_SQL, JSON_DELETE_USERS_SQL)
+
+logger = logging.getLogger(__name__)
+
+# Document type => (model, update SQL, delete SQL)
+SQL_MIGRATIONS = OrderedDict([
+    ('node', (AbstractNode, JSON_UPDATE_NODES_SQL, JSON_DELETE_NODES_SQL)),
+    ('file', (BaseFileNode, JSON_UPDATE_FILES_SQL, JSON_DELETE_FILES_SQL)),
+    ('user', (OSFUser, JSON_UPDATE_USERS_SQL, JSON_DELETE_USERS_SQL)),
+])
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def read_json(path, default=None):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (IOError, OSError, ValueError):
+        return default
+
+
+def write_json(path, data):
+    # Write then rename, so a crash never leaves a truncated checkpoint behind
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as fp:
+        json.dump(data, fp)
+    os.rename(tmp_path, path)
+
+
+def shard_checkpoint_path(checkpoint_dir, shard):
+    return os.path.join(checkpoint_dir, '{doc_type}-{number}.json'.format(**shard))
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be shared across processes
+    elastic_search.CLIENT = None
+    connections.close_all()
+
+
+def migrate_shard(shard):
+    """Migrate the objects of one shard (``start < id <= end``) page by page, checkpointing
+    after every page.
+
+    :return dict: The shard's final checkpoint
+    """
+    from website.search_migration.migrate import sql_migrate_page
+
+    _, update_sql, delete_sql = SQL_MIGRATIONS[shard['doc_type']]
+    checkpoint_path = shard_checkpoint_path(shard['checkpoint_dir'], shard)
+    checkpoint = read_json(checkpoint_path) or {
+        'doc_type': shard['doc_type'],
+        'number': shard['number'],
+        'page_start': shard['start'],
+        'indexed': 0,
+        'deleted': 0,
+        'seconds': 0.0,
+        'done': False,
+    }
+    if checkpoint['done']:
+        return checkpoint
+
+    while checkpoint['page_start'] < shard['end']:
+        started = time.time()
+        page_end = min(checkpoint['page_start'] + shard['increment'], shard['end'])
+        checkpoint['indexed'] += sql_migrate_page(
+            shard['index'],
+            update_sql,
+            checkpoint['page_start'],
+            page_end,
+            spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
+        if shard['delete']:
+            checkpoint['deleted'] += sql_migrate_page(
+                shard['index'],
+                delete_sql,
+                checkpoint['page_start'],
+                page_end,
+                es_args={'raise_on_error': False},  # ignore 404s
+                spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
+        checkpoint['page_start'] = page_end
+        checkpoint['seconds'] += time.time() - started
+        write_json(checkpoint_path, checkpoint)
+
+    checkpoint['done'] = True
+    write_json(checkpoint_path, checkpoint)
+    logger.info('Finished {doc_type} shard {number}: {indexed} indexed, {deleted} deleted'.format(**checkpoint))
+    return checkpoint
+
+
+class ParallelMigration(object):
+    """Plans (or, given the checkpoint directory of an interrupted run, reloads) a sharded
+    migration of nodes, files and users into a new versioned index.
+    """
+
+    def __init__(self, index, delete, workers, checkpoint_dir=None, increment=10000, shards_per_worker=4):
+        self.index = index
+        self.delete = delete
+        self.workers = workers
+        self.checkpoint_dir = checkpoint_dir or os.path.join(settings.LOG_PATH, 'search_migration_{}'.format(index))
+        if not os.path.isdir(self.checkpoint_dir):
+            os.makedirs(self.checkpoint_dir)
+
+        manifest_path = os.path.join(self.checkpoint_dir, MANIFEST_NAME)
+        manifest = read_json(manifest_path)
+        if manifest and manifest['index'] == index:
+            logger.info('Resuming migration into {} from {}'.format(manifest['new_index'], self.checkpoint_dir))
+        else:
+            from website.search_migration.migrate import set_up_index
+            manifest = {
+                'index': index,
+                'new_index': set_up_index(index),
+                'delete': delete,
+                'shards': self.plan_shards(increment, shards_per_worker * workers),
+            }
+            write_json(manifest_path, manifest)
+        self.manifest = manifest
+
+    @property
+    def new_index(self):
+        return self.manifest['new_index']
+
+    def plan_shards(self, increment, shard_count):
+        shards = []
+        for doc_type, (model, _, _) in SQL_MIGRATIONS.items():
+            last = model.objects.order_by('id').last()
+            # One extra page covers objects created while the migration runs, like sql_migrate does
+            max_id = (last.id if last else 0) + increment
+            # Shards are whole pages, so shard boundaries line up with page boundaries
+            pages = -(-max_id // increment)
+            pages_per_shard = max(1, -(-pages // shard_count))
+            start = 0
+            number = 0
+            while start < max_id:
+                end = min(start + pages_per_shard * increment, max_id)
+                shards.append({
+                    'doc_type': doc_type,
+                    'number': number,
+                    'start': start,
+                    'end': end,
+                    'increment': increment,
+                })
+                start = end
+                number += 1
+        return shards
+
+    def run(self):
+        shards = [
+            dict(shard, index=self.new_index, delete=self.manifest['delete'], checkpoint_dir=self.checkpoint_dir)
+            for shard in self.manifest['shards']
+        ]
+        remaining = [shard for shard in shards if not (read_json(shard_checkpoint_path(self.checkpoint_dir, shard)) or {}).get('done')]
+        logger.info('Migrating {} of {} shards with {} workers'.format(len(remaining), len(shards), self.workers))
+
+        # Forked workers must not reuse the parent's database connection
+        connections.close_all()
+        pool = multiprocessing.Pool(self.workers, initializer=_init_worker)
+        try:
+            started = time.time()
+            for checkpoint in pool.imap_unordered(migrate_shard, remaining):
+                logger.info('{doc_type} shard {number} done after {seconds:.1f}s'.format(**checkpoint))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+        logger.info('Parallel migration finished in {:.1f}s'.format(time.time() - started))
+        self.report(shards)
+
+    def report(self, shards):
+        """Log documents migrated and throughput for each document type, across all runs."""
+        totals = OrderedDict()
+        for shard in shards:
+            checkpoint = read_json(shard_checkpoint_path(self.checkpoint_dir, shard)) or {}
+            total = totals.setdefault(shard['doc_type'], {'indexed': 0, 'deleted': 0, 'seconds': 0.0})
+            for key in total:
+                total[key] += checkpoint.get(key, 0)
+        for doc_type, total in totals.items():
+            # Shards of a type run concurrently, so divide their summed time by the pool size
+            wall_seconds = total['seconds'] / self.workers
+            logger.info('{}: {} indexed, {} deleted, ~{:.1f} docs/sec'.format(
+                doc_type,
+                total['indexed'],
+                total['deleted'],
+                (total['indexed'] + total['deleted']) / wall_seconds if wall_seconds else 0,
+            ))
+        return totals
+
+    def finish(self):
+        """Remove checkpoints once the migration has been fully aliased."""
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
@@ -114,6 +114,28 @@ ELASTIC_KWARGS = {
     # 'client_cert': None,
     # 'client_key': None
 }
+# Coalesce node/preprint/group search updates into a durable queue that is
+# flushed in bulk instead of indexing each save individually
+SEARCH_INDEX_QUEUE_ENABLED = True
+# Wait this long after the last save of an object before indexing it...
+SEARCH_INDEX_QUEUE_DEBOUNCE = timedelta(seconds=10)
+# ...but never delay an object that keeps being edited for longer than this
+SEARCH_INDEX_QUEUE_MAX_WAIT = timedelta(minutes=2)
+# Maximum number of queued objects indexed per flush
+SEARCH_INDEX_QUEUE_BATCH_SIZE = 500
+# Number of nodes (or preprints) whose contributor lists are rewritten per task when a user
+# changes their name
+SEARCH_CONTRIBUTOR_UPDATE_CHUNK_SIZE = 1000
+# Serve the add-contributor typeahead from the edge n-gram autocomplete field of user documents.
+# Indices created before that field existed need `invoke migrate_search` first; until then the
+# typeahead falls back to the full search query.
+SEARCH_CONTRIBUTOR_AUTOCOMPLETE = False
+
+# Answer node read permission checks (AbstractNode.objects.can_view and get_nodes_for_user) from
+# the trigger-maintained osf_nodeeffectivereadpermission table. Only turn on once
+# `manage.py populate_node_read_permissions` has filled the table and
+# `manage.py check_node_read_permissions` finds it consistent with the permission tables.
+USE_NODE_READ_PERMISSION_TABLE = False
 
 # Sessions
 COOKIE_NAME = 'osf'
@@ -126,6 +148,17 @@ SECRET_KEY = 'CHANGEME'
 SESSION_COOKIE_SECURE = SECURE_MODE
 SESSION_COOKIE_SAMESITE = 'None'
 SESSION_COOKIE_HTTPONLY = True
+# Where session data is kept: 'database' (the osf_session table) or 'cache' (the cache named
+# SESSION_CACHE_NAME in api/base/settings, which should be shared by every process, e.g. Redis)
+SESSION_BACKEND = 'database'
+# With the cache backend, load sessions that are not cached yet from osf_session and copy them
+# over, so existing cookies keep working while migrating. Turn off once the table is retired.
+SESSION_BACKEND_DATABASE_FALLBACK = True
+# Sessions each process keeps in memory after loading them, and for how many seconds (0 disables).
+# Sessions removed by another process (e.g. on logout) stay valid here for up to that long, so
+# only turn this on if that is acceptable.
+SESSION_LRU_SIZE = 10000
+SESSION_LRU_TIMEOUT = 0
 
 # local path to private key and cert for local development using https, overwrite in local.py
 OSF_SERVER_KEY = None
@@ -642,6 +675,10 @@ class CeleryConfig:
                 'task': 'scripts.generate_sitemap',
                 'schedule': crontab(minute=0, hour=5),  # Daily 12:00 a.m.
             },
+            'flush_search_index_queue': {
+                'task': 'website.search.elastic_search.flush_search_index_queue',
+                'schedule': crontab(minute='*'),  # Every minute, picks up anything missed by the debounced flush
+            },
             'deactivate_requested_accounts': {
                 'task': 'management.commands.deactivate_requested_accounts',
                 'schedule': crontab(minute=0, hour=5),  # Daily 12:00 a.m.
@@ -2060,6 +2097,22 @@ class StorageLimits(enum.IntEnum):
             return cls.DEFAULT
 
 STORAGE_USAGE_CACHE_TIMEOUT = 3600 * 24  # seconds in hour times hour (one day)
+# Wiki versions never change once written, so their search text can be cached for a long time
+WIKI_SEARCH_TEXT_CACHE_TIMEOUT = 3600 * 24 * 30  # thirty days
+# Operational counters and timers (framework.metrics) are summed by each process and logged at
+# INFO to the osf.metrics logger once per this many seconds (0 only logs them at exit)
+METRICS_LOG_INTERVAL = 60
+# Identical search queries are answered from cache for this long, unless a bulk write or a flush
+# of the search index queue changes the index first (0 disables the cache)
+SEARCH_RESULT_CACHE_TIMEOUT = 60
+# Bearer tokens CAS authenticated are trusted for this long without asking CAS again, unless
+# they are revoked first (0 disables the cache)
+CAS_TOKEN_CACHE_TIMEOUT = 60
+# Download and view counts are buffered by each process and written to the database about every
+# this many seconds (0 writes them right away), or as soon as this many counter days are pending.
+# Counts buffered by a process that is killed outright are lost. See framework/analytics/counters.py
+PAGE_COUNTER_FLUSH_INTERVAL = 10
+PAGE_COUNTER_BUFFER_SIZE = 1000
 IA_ARCHIVE_ENABLED = True
 OSF_PIGEON_URL = os.environ.get('OSF_PIGEON_URL', None)
 ID_VERSION = 'staging_v2'